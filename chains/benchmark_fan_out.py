@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.fake_chat_model import FakeLatencyChatModel
+
+from fan_out import DEFAULT_MAX_CONCURRENCY, afan_out, fan_out_sequential, fan_out_threaded
+
+
+# ---------------------------------------------------------
+# Benchmark Configuration
+# ---------------------------------------------------------
+
+PRODUCT_CATEGORY = "Car"
+PRODUCTS = ["Tesla", "BYD", "Toyota", "Volkswagen", "Hyundai", "Ford"]
+CONSIDERATIONS = ["pros", "cons", "running costs"]
+PRODUCTS_FEATURES = "Electric and hybrid drivetrains, driver assistance, infotainment."
+
+
+def run_strategy(strategy, model, products, considerations, max_concurrency):
+    """
+    Runs one fan-out with the given dispatch strategy.
+
+    Returns:
+        Wall-clock seconds
+    """
+    args = (model, PRODUCTS_FEATURES, PRODUCT_CATEGORY, products, considerations)
+
+    start = time.perf_counter()
+    if strategy == "sequential":
+        answers = fan_out_sequential(*args)
+    elif strategy == "threaded":
+        answers = fan_out_threaded(*args, max_concurrency=max_concurrency)
+    else:
+        answers = asyncio.run(afan_out(*args, max_concurrency=max_concurrency))
+    elapsed = time.perf_counter() - start
+
+    assert sum(len(arguments) for arguments in answers.values()) == len(products) * len(considerations)
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare sequential, threaded and async fan-out against a local stub model."
+    )
+    parser.add_argument("--products", type=int, default=2, choices=range(1, len(PRODUCTS) + 1))
+    parser.add_argument("--considerations", type=int, default=2, choices=range(1, len(CONSIDERATIONS) + 1))
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Stub model latency per call (s)")
+    args = parser.parse_args()
+
+    model = FakeLatencyChatModel(first_token_seconds=args.llm_latency)
+    products = PRODUCTS[:args.products]
+    considerations = CONSIDERATIONS[:args.considerations]
+
+    print(
+        f"Branches: {len(products)} products x {len(considerations)} considerations, "
+        f"max concurrency: {args.max_concurrency}, stub latency: {args.llm_latency}s\n"
+    )
+
+    print(f"{'strategy':>10} | {'wall time':>9} | {'speedup':>7}")
+    baseline = None
+    for strategy in ("sequential", "threaded", "async"):
+        elapsed = run_strategy(strategy, model, products, considerations, args.max_concurrency)
+        baseline = baseline or elapsed
+        print(f"{strategy:>10} | {elapsed * 1000:>7.0f}ms | {baseline / elapsed:>6.2f}x")
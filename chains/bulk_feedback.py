@@ -0,0 +1,170 @@
+import json
+import os
+import time
+from itertools import islice
+
+
+# ---------------------------------------------------------
+# Bulk Processing Configuration
+# ---------------------------------------------------------
+
+# Records classified and answered per round
+DEFAULT_BATCH_SIZE = 64
+
+# Maximum number of LLM requests in flight within one batched call
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+# ---------------------------------------------------------
+# Input / Checkpoint Helpers
+# ---------------------------------------------------------
+
+def iter_records(input_path, text_field="feedback"):
+    """
+    Streams feedback records from a JSONL file, one line at a time.
+
+    Every record gets an "id": its own "id" field, or its line number.
+    Blank lines are skipped.
+
+    Yields:
+        (id, record) pairs
+    """
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if text_field not in record:
+                raise ValueError(
+                    f"Line {line_number} of {input_path} has no {text_field!r} field."
+                )
+            yield record.get("id", line_number), record
+
+
+def load_checkpoint(output_path):
+    """
+    Reads the IDs already written to the output file, so a resumed run
+    can skip them. A trailing partial line (a run killed mid-write) is
+    truncated away.
+
+    Returns:
+        Set of processed record IDs
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    done = set()
+    valid_size = 0
+    with open(output_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            done.add(json.loads(line)["id"])
+            valid_size += len(line)
+
+    if valid_size != os.path.getsize(output_path):
+        with open(output_path, "rb+") as f:
+            f.truncate(valid_size)
+    return done
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+# ---------------------------------------------------------
+# Bulk Runner
+# ---------------------------------------------------------
+
+def process_feedback_file(
+    input_path,
+    output_path,
+    router,
+    branch_chains,
+    default_label,
+    text_field="feedback",
+    batch_size=DEFAULT_BATCH_SIZE,
+    max_concurrency=DEFAULT_MAX_CONCURRENCY,
+):
+    """
+    Classifies and answers every record of a JSONL file, in batches.
+
+    Per batch, all records are routed at once (local classifiers, then one
+    batched LLM call for the uncertain ones), grouped by route, and each
+    route's chain answers its group with a single batched call. Results
+    are appended to `output_path` in input order and flushed after every
+    batch; the output file doubles as the checkpoint, so rerunning the
+    same command resumes after the last completed batch.
+
+    Inputs:
+        router        -> SentimentRouter (uses route_batch)
+        branch_chains -> {label: runnable taking {"feedback": ...}, returning text}
+        default_label -> chain used for labels without an entry
+
+    Returns:
+        Dict with processing statistics
+    """
+    done = load_checkpoint(output_path)
+    stats = {"skipped": 0, "processed": 0, "batches": 0, "by_route": {}}
+    start = time.perf_counter()
+
+    def pending_records():
+        for record_id, record in iter_records(input_path, text_field):
+            if record_id in done:
+                stats["skipped"] += 1
+                continue
+            yield record_id, record
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        for batch in _batched(pending_records(), batch_size):
+            feedbacks = [record[text_field] for _, record in batch]
+            labels = router.route_batch(feedbacks, max_concurrency=max_concurrency)
+
+            # One batched call per route
+            groups = {}
+            for i, label in enumerate(labels):
+                route = label if label in branch_chains else default_label
+                groups.setdefault(route, []).append(i)
+
+            responses = [None] * len(batch)
+            for route, positions in groups.items():
+                answers = branch_chains[route].batch(
+                    [{"feedback": feedbacks[i]} for i in positions],
+                    config={"max_concurrency": max_concurrency}
+                )
+                for i, answer in zip(positions, answers):
+                    responses[i] = answer
+                stats["by_route"][route] = stats["by_route"].get(route, 0) + len(positions)
+
+            for (record_id, _), feedback, label, response in zip(batch, feedbacks, labels, responses):
+                out.write(json.dumps({
+                    "id": record_id,
+                    "feedback": feedback,
+                    "sentiment": label,
+                    "response": response,
+                }) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+
+            stats["processed"] += len(batch)
+            stats["batches"] += 1
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def print_bulk_report(stats):
+    """
+    Prints a short summary of a bulk run.
+    """
+    routes = ", ".join(f"{route}: {count}" for route, count in sorted(stats["by_route"].items()))
+    rate = stats["processed"] / stats["seconds"] if stats["seconds"] else 0.0
+    print("\n--- Bulk Feedback Report ---")
+    print(
+        f"Processed: {stats['processed']} in {stats['batches']} batches "
+        f"({rate:.1f} records/sec), skipped (checkpoint): {stats['skipped']}"
+    )
+    if routes:
+        print(f"Routes: {routes}")
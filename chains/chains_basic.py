@@ -1,19 +1,23 @@
 from dotenv import load_dotenv
 import os
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
+import sys
 from langchain_core.runnables import RunnableLambda, RunnableSequence
 
+# shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.prompt_registry import compile_messages
+from common.models import get_chat_model
+from common.llm_cache import enable_response_cache, print_response_cache_stats
+from common.tracing import trace_config
+
 load_dotenv()
-api_key = os.getenv("GROQ_API_KEY")
-
-# Use the updated model
-model = ChatGroq(
-    api_key=api_key,
-    model="llama-3.1-8b-instant", 
-    temperature=0.7 # temperature controls the randomness or creativity of the model’s responses
-)
-prompt_template = ChatPromptTemplate.from_messages([
+
+# Use the updated model (llama-3.1-8b-instant, temperature 0.7; shared ChatGroq built by common/models.py)
+model = get_chat_model()
+# responses are cached (memory + SQLite) for temperature-0 models; LLM_CACHE=1 also replays sampled answers
+model = enable_response_cache(model, cacheable=os.getenv("LLM_CACHE") == "1")
+# compiled once by the prompt registry, formatting skips re-parsing the placeholders
+prompt_template = compile_messages([
     ("system", "You are a comedian who tells jokes about {topic}."), # System message defines the assistant’s role or behavior
     ("human", "Tell me {joke_count} jokes."), # Human message gives the user’s instruction
 ])
@@ -27,8 +31,11 @@ parse_output = RunnableLambda(lambda x : x.content)
 # middle = [] -> this will add all the chains in between (if any)
 chain = RunnableSequence(first=format_prompt, middle=[invoke_model], last=parse_output)
 
-# Run the chain
-response = chain.invoke({"topic": "lawyers", "joke_count": 3})
+# Run the chain (STAGE_TRACE=<file> records the time of every step)
+response = chain.invoke({"topic": "lawyers", "joke_count": 3}, config=trace_config())
 
 # print output
-print(response)
\ No newline at end of file
+print(response)
+
+# cache hits/misses and the latency they saved (printed only when the cache is enabled)
+print_response_cache_stats(model)
@@ -1,23 +1,32 @@
 from dotenv import load_dotenv
+import argparse
 import os
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableBranch
-from langchain_groq import ChatGroq
+import sys
+from langchain_core.runnables import RunnableBranch, RunnableLambda
 from langchain_core.output_parsers.string import StrOutputParser
 
+# shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.prompt_registry import compile_messages
+from common.models import get_chat_model
+from common.llm_cache import enable_response_cache, print_response_cache_stats
+from common.tracing import trace_config
+from sentiment_router import LexiconClassifier, SentimentRouter, load_embedding_classifier
+from bulk_feedback import DEFAULT_BATCH_SIZE, DEFAULT_MAX_CONCURRENCY, print_bulk_report, process_feedback_file
+
 load_dotenv()
-api_key = os.getenv("GROQ_API_KEY")
 
-# Use the updated model
-model = ChatGroq(
-    api_key=api_key,
-    model="llama-3.1-8b-instant", 
-    temperature=0.7 # temperature controls the randomness or creativity of the model’s responses
-)
+# set ROUTER_EMBEDDINGS=0 to skip the embedding classifier (and the model load) in the local fast path
+ROUTER_EMBEDDINGS = os.getenv("ROUTER_EMBEDDINGS", "1") == "1"
+
+# Use the updated model (llama-3.1-8b-instant, temperature 0.7; shared ChatGroq built by common/models.py)
+model = get_chat_model()
+# responses are cached (memory + SQLite) for temperature-0 models; LLM_CACHE=1 also replays sampled answers
+model = enable_response_cache(model, cacheable=os.getenv("LLM_CACHE") == "1")
 
-# Define prompt templates for different feedback types:
+# Define prompt templates for different feedback types (each compiled once by the prompt registry):
 # Positive Feedback:
-positive_feedback_template = ChatPromptTemplate.from_messages(
+positive_feedback_template = compile_messages(
     [
         ('system', "You are a helpful assistant."),
         ("human", "Generate a thank you note for this positive feedback: {feedback}.")
@@ -25,7 +34,7 @@ positive_feedback_template = ChatPromptTemplate.from_messages(
 )
 
 # Negative Feedback:
-negative_feedback_template = ChatPromptTemplate.from_messages(
+negative_feedback_template = compile_messages(
     [
         ("system", "You are a helpful assistant."),
         ("human", "Generate a response addressing this negative feedback: {feedback}."),
@@ -33,7 +42,7 @@ negative_feedback_template = ChatPromptTemplate.from_messages(
 )
 
 # Neutral Feedback:
-neutral_feedback_template = ChatPromptTemplate.from_messages(
+neutral_feedback_template = compile_messages(
     [
         ("system", "You are a helpful assistant."),
         ("Generate a request for more details for this neutral feedback: {feedback}."),
@@ -41,7 +50,7 @@ neutral_feedback_template = ChatPromptTemplate.from_messages(
 )
 
 # Escalate Feedback:
-escalate_feedback_template = ChatPromptTemplate.from_messages(
+escalate_feedback_template = compile_messages(
     [
         ("system", "You are a helpful assistant."),
         ("Generate a request for more details for this neutral feedback: {feedback}."),
@@ -49,41 +58,87 @@ escalate_feedback_template = ChatPromptTemplate.from_messages(
 )
 
 # Define the feedback classification template
-classification_template_feedback = ChatPromptTemplate.from_messages(
+classification_template_feedback = compile_messages(
     [
         ("system", "You are a helpful assistent."),
-        ("human", "Classify the sentiment of this feedback as positive, negative, neutral, or escalate: {feedback}.")
+        ("human", "Classify the sentiment of this feedback as positive, negative, neutral, or escalate. "
+                  "Answer with the label only: {feedback}.")
     ]
 )
 
+# Response chain of every route (the bulk mode batches each of them separately)
+branch_chains = {
+    "positive": positive_feedback_template | model | StrOutputParser(),
+    "negative": negative_feedback_template | model | StrOutputParser(),
+    "neutral": neutral_feedback_template | model | StrOutputParser(),
+    "escalate": escalate_feedback_template | model | StrOutputParser(),
+}
+
 # Define the runnable branches for handling feedbacks - positive, negative, neutral and escalate
+# (the router adds the chosen route as x["sentiment"], the branch prompts still get the original feedback)
 branches = RunnableBranch(
     (
-        lambda x: 'positive' in x,
-        positive_feedback_template | model | StrOutputParser()
+        lambda x: x["sentiment"] == "positive",
+        branch_chains["positive"]
     ),
     (
-        lambda x: 'negative' in x,
-        negative_feedback_template | model | StrOutputParser()
+        lambda x: x["sentiment"] == "negative",
+        branch_chains["negative"]
     ),
     (
-        lambda x: 'neutral' in x,
-        neutral_feedback_template | model | StrOutputParser()
+        lambda x: x["sentiment"] == "neutral",
+        branch_chains["neutral"]
     ),
-    escalate_feedback_template | model | StrOutputParser()
+    branch_chains["escalate"]
 )
 
-# Create the classification chain
+# Create the classification chain (only used when the local classifiers are not confident)
 classification_chain = classification_template_feedback | model | StrOutputParser()
 
-# Combine classification and response generation into one chain
-chain = classification_chain | branches
+# Local classifiers tried before the LLM: keyword lexicon first, then similarity to labelled
+# exemplars with the same bge-small embeddings used in rag/
+local_classifiers = [LexiconClassifier()]
+if ROUTER_EMBEDDINGS:
+    local_classifiers.append(load_embedding_classifier())
+
+router = SentimentRouter(local_classifiers, classification_chain)
+
+# Combine routing and response generation into one chain
+chain = RunnableLambda(router) | branches
+
+# without arguments one example review is handled, with --input a whole JSONL file of reviews
+parser = argparse.ArgumentParser(description="Classify feedback and generate a response for it.")
+parser.add_argument("--input", help="JSONL file with one {\"feedback\": ...} record per line (bulk mode)")
+parser.add_argument("--output", help="JSONL file the results are appended to, also used to resume (bulk mode)")
+parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY)
+args = parser.parse_args()
+
+if args.input:
+    # bulk mode: records are streamed, routed in batches and answered with one batched call per route
+    stats = process_feedback_file(
+        args.input,
+        args.output or os.path.splitext(args.input)[0] + ".responses.jsonl",
+        router,
+        branch_chains,
+        default_label="escalate",
+        batch_size=args.batch_size,
+        max_concurrency=args.max_concurrency,
+    )
+    print_bulk_report(stats)
+else:
+    review = "The product is terrible. It broke after just one use and the quality is very poor."
+    # STAGE_TRACE=<file> records the time of the routing and the chosen branch
+    result = chain.invoke({"feedback": review}, config=trace_config())
+
+    # Output the result
+    print(result)
 
-review = "The product is terrible. It broke after just one use and the quality is very poor."
-result = chain.invoke({"feedback": review})
+# how many requests were routed without a network call and the latency saved
+router.print_stats()
 
-# Output the result
-print(result)
+# cache hits/misses and the latency they saved (printed only when the cache is enabled)
+print_response_cache_stats(model)
 
 # Run the chain with an example review
 # Positive review - "The product is excellent. I really enjoyed using it and found it very helpful."
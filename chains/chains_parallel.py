@@ -1,23 +1,29 @@
 from dotenv import load_dotenv
+import asyncio
 import os
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableLambda, RunnableParallel
-from langchain_groq import ChatGroq
+import sys
+from langchain_core.runnables import RunnableLambda
 from langchain_core.output_parsers.string import StrOutputParser
+from fan_out import DEFAULT_MAX_CONCURRENCY, afan_out
+
+# shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.prompt_registry import compile_messages
+from common.models import get_chat_model
+from common.llm_cache import enable_response_cache, print_response_cache_stats
+from common.tracing import trace_config
 
 
 load_dotenv()
-api_key = os.getenv("GROQ_API_KEY")
 
-# Use the updated model
-model = ChatGroq(
-    api_key=api_key,
-    model="llama-3.1-8b-instant", 
-    temperature=0.7 # temperature controls the randomness or creativity of the model’s responses
-)
+# Use the updated model (llama-3.1-8b-instant, temperature 0.7; shared ChatGroq built by common/models.py)
+model = get_chat_model()
+# responses are cached (memory + SQLite) for temperature-0 models; LLM_CACHE=1 also replays sampled answers
+model = enable_response_cache(model, cacheable=os.getenv("LLM_CACHE") == "1")
 
 # Template for the first LLM call. It has two messages: a system and a human message with placeholders
-prompt_template = ChatPromptTemplate.from_messages(
+# (compiled once by the prompt registry, formatting skips re-parsing the placeholders)
+prompt_template = compile_messages(
     [
         ("system", "You are an expert {product_category} viewer."),
         ("human", "List me the features of {first_product} and {second_product}."),
@@ -34,131 +40,56 @@ variables = {
 # injecting the configs in the first chain so that we'll be able to use them in later stages without prop drilling
 inject_config = RunnableLambda(lambda x: {**variables})
 
-# extracting the pros or cons of the products from the content that is LLM generated by using first call.
-def extract_products_arguments(products_features, consideration, product_category, product_name):
-    # defining the prompt template for the pros case
-    pros_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", "You are an expert {product_category} reviewer"),
-            (
-                "human",
-                "Given these products features: {products_features}, give me 3 {consideration} of buying {product_name}.",
-            ),
-        ]
-    )
-
-    return pros_template.format_prompt(
-        products_features = products_features,
-        consideration = consideration,
-        product_category = product_category,
-        product_name = product_name,
+# the fan-out is N products x M considerations, every pair is one LLM call
+products = [variables["first_product"], variables["second_product"]]
+considerations = ["pros", "cons"]
+
+# maximum number of pros/cons requests sent to the LLM at the same time
+MAX_CONCURRENCY = int(os.getenv("FAN_OUT_MAX_CONCURRENCY", str(DEFAULT_MAX_CONCURRENCY)))
+
+# extracting the pros and cons of every product from the content that is LLM generated by using first call.
+# prompts are built from one precompiled template and all branches are dispatched together with abatch
+async def extract_products_arguments(products_features):
+    # here 'products_features' is the features response form LLM first call
+    return await afan_out(
+        model,
+        products_features,
+        variables["product_category"],
+        products,
+        considerations,
+        max_concurrency=MAX_CONCURRENCY,
     )
 
 # returning each product pros and cons
-def combine_pros_and_cons_of_product(product_name, pros, cons):
-    return f"\n\n\nPros of {product_name}:\n\n\n {pros}\n\n\nCons of {product_name}\n\n\n {cons}"
-
-# returning pros and cons for both products
-def get_products_pros_and_cons(product_1_pros_and_cons, product_2_pros_and_cons):
-    return f"\n\n\n\t\t\t-------------- Product 1 Pros & Cons are -------------- \n{product_1_pros_and_cons}\n\n\n\n\n\t\t\t-------------- Product 2 Pros & Cons are -------------- \n{product_2_pros_and_cons}\n\n"
-
-
-# adding the Runnables for generating the prompt_template for product 1 pros and passing it to the LLM
-product_1_pros_chain = (
-        RunnableLambda(
-            lambda x: extract_products_arguments(
-                x, "pros", variables["product_category"], variables["first_product"]
-                # here 'x' is the features response form LLM first call
-            )
-        )
-    | model
-    | StrOutputParser()
-)
-
-# adding the Runnables for generating the prompt_template for product 1 cons and passing it to the LLM
-product_1_cons_chain = (
-        RunnableLambda(
-            lambda x: extract_products_arguments(
-                x, "cons", variables["product_category"], variables["first_product"]
-                # here 'x' is the features response form LLM first call
-            )
-        )
-    | model
-    | StrOutputParser()
-)
-
-# adding the Runnables for generating the prompt_template for product 2 pros and passing it to the LLM
-product_2_pros_chain = (
-        RunnableLambda(
-            lambda x: extract_products_arguments(
-                x, "pros", variables["product_category"], variables["second_product"]
-                # here 'x' is the features response form LLM first call
-            )
-        )
-    | model
-    | StrOutputParser()
-)
-
-# adding the Runnables for generating the prompt_template for product 1 cons and passing it to the LLM
-product_2_cons_chain = (
-        RunnableLambda(
-            lambda x: extract_products_arguments(
-                x, "cons", variables["product_category"], variables["second_product"]
-                # here 'x' is the features response form LLM first call
-            )
-        )
-    | model
-    | StrOutputParser()
-)
-
-pros_and_cons_for_product_1 = (
-    RunnableLambda(
-        lambda x: combine_pros_and_cons_of_product(
-            variables["first_product"],
-            x["branches"]["product_1_pros"],
-            x["branches"]["product_1_cons"],
-        )
+def combine_pros_and_cons_of_product(product_name, arguments):
+    return "".join(
+        f"\n\n\n{consideration.capitalize()} of {product_name}:\n\n\n {text}"
+        for consideration, text in arguments.items()
     )
-)
 
-pros_and_cons_for_product_2 = (
-    RunnableLambda(
-        lambda x: combine_pros_and_cons_of_product(
-            variables["second_product"],
-            x["branches"]["product_2_pros"],
-            x["branches"]["product_2_cons"],
-        )
+# returning pros and cons for all products
+def get_products_pros_and_cons(products_arguments):
+    return "".join(
+        f"\n\n\n\t\t\t-------------- Product {i} Pros & Cons are -------------- \n"
+        f"{combine_pros_and_cons_of_product(product_name, arguments)}\n\n"
+        for i, (product_name, arguments) in enumerate(products_arguments.items(), start=1)
     )
-)
+
 
 # Create the combined chain using LangChain Expression Language (LCEL)
 chains = (
     prompt_template
     | model
     | StrOutputParser()
-    | RunnableParallel(
-        branches = {
-            "product_1_pros": product_1_pros_chain,
-            "product_1_cons": product_1_cons_chain,
-            "product_2_pros": product_2_pros_chain,
-            "product_2_cons": product_2_cons_chain,
-        }
-    )
-    | RunnableParallel(
-        branches = {
-            "pros_and_cons_for_product_1": pros_and_cons_for_product_1,
-            "pros_and_cons_for_product_2": pros_and_cons_for_product_2        
-            }
-    )
-    | RunnableLambda(
-        lambda x: get_products_pros_and_cons(
-            x["branches"]["pros_and_cons_for_product_1"],
-            x["branches"]["pros_and_cons_for_product_2"],
-        )
-    )
+    | RunnableLambda(extract_products_arguments)
+    | RunnableLambda(get_products_pros_and_cons)
 )
 
-result = chains.invoke(variables)
+# the fan-out step is async, so the chain is run with ainvoke (STAGE_TRACE=<file> records every step)
+result = asyncio.run(chains.ainvoke(variables, config=trace_config()))
 
 # Output
-print(result)
\ No newline at end of file
+print(result)
+
+# cache hits/misses and the latency they saved (printed only when the cache is enabled)
+print_response_cache_stats(model)
@@ -0,0 +1,109 @@
+import os
+import sys
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.prompt_registry import compile_messages
+
+
+# ---------------------------------------------------------
+# Fan-Out Configuration
+# ---------------------------------------------------------
+
+# Maximum number of branch requests in flight at once
+DEFAULT_MAX_CONCURRENCY = 8
+
+# Parsed once (prompt registry) and reused for every branch
+argument_template = compile_messages(
+    [
+        ("system", "You are an expert {product_category} reviewer"),
+        (
+            "human",
+            "Given these products features: {products_features}, give me 3 {consideration} of buying {product_name}.",
+        ),
+    ]
+)
+
+
+# ---------------------------------------------------------
+# Prompt Building
+# ---------------------------------------------------------
+
+def build_branch_prompts(products_features, product_category, products, considerations):
+    """
+    Builds one prompt per (product, consideration) pair, N products x M
+    considerations, from the precompiled argument_template.
+
+    Returns:
+        (list of (product, consideration) keys, list of prompt values),
+        aligned by position
+    """
+    keys, prompts = [], []
+    for product_name in products:
+        for consideration in considerations:
+            keys.append((product_name, consideration))
+            prompts.append(
+                argument_template.format_prompt(
+                    products_features=products_features,
+                    consideration=consideration,
+                    product_category=product_category,
+                    product_name=product_name,
+                )
+            )
+    return keys, prompts
+
+
+def _group_answers(keys, messages):
+    # {product: {consideration: answer text}}, in product order
+    answers = {}
+    for (product_name, consideration), message in zip(keys, messages):
+        answers.setdefault(product_name, {})[consideration] = message.content
+    return answers
+
+
+# ---------------------------------------------------------
+# Dispatch Strategies
+# ---------------------------------------------------------
+
+def fan_out_sequential(model, products_features, product_category, products, considerations):
+    """
+    One branch after the other (baseline for the benchmark).
+    """
+    keys, prompts = build_branch_prompts(products_features, product_category, products, considerations)
+    return _group_answers(keys, [model.invoke(prompt) for prompt in prompts])
+
+
+def fan_out_threaded(
+    model,
+    products_features,
+    product_category,
+    products,
+    considerations,
+    max_concurrency=DEFAULT_MAX_CONCURRENCY,
+):
+    """
+    All branches through model.batch (a thread pool of `max_concurrency`).
+    """
+    keys, prompts = build_branch_prompts(products_features, product_category, products, considerations)
+    messages = model.batch(prompts, config={"max_concurrency": max_concurrency})
+    return _group_answers(keys, messages)
+
+
+async def afan_out(
+    model,
+    products_features,
+    product_category,
+    products,
+    considerations,
+    max_concurrency=DEFAULT_MAX_CONCURRENCY,
+):
+    """
+    All branches through model.abatch on the event loop, with at most
+    `max_concurrency` requests in flight.
+
+    Returns:
+        {product: {consideration: answer text}}
+    """
+    keys, prompts = build_branch_prompts(products_features, product_category, products, considerations)
+    messages = await model.abatch(prompts, config={"max_concurrency": max_concurrency})
+    return _group_answers(keys, messages)
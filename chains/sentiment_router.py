@@ -0,0 +1,349 @@
+import re
+import time
+
+import numpy as np
+
+
+# ---------------------------------------------------------
+# Routing Configuration
+# ---------------------------------------------------------
+
+# Routes of chains_branching.py; the last one is the default branch
+LABELS = ["positive", "negative", "neutral", "escalate"]
+
+# Keyword lexicon for the cheapest classifier (matched on whole words)
+LEXICON = {
+    "positive": [
+        "excellent", "great", "love", "loved", "enjoyed", "amazing", "helpful",
+        "perfect", "fantastic", "awesome", "recommend", "happy", "best", "wonderful",
+    ],
+    "negative": [
+        "terrible", "broke", "broken", "poor", "awful", "worst", "bad", "useless",
+        "disappointed", "disappointing", "refund", "waste", "hate", "defective",
+    ],
+    "neutral": [
+        "okay", "ok", "fine", "average", "expected", "decent", "nothing exceptional",
+        "mediocre", "alright",
+    ],
+    "escalate": [
+        "not sure", "tell me more", "can you", "could you", "more details",
+        "speak to", "manager", "contact", "how do i", "question",
+    ],
+}
+
+# A sentiment keyword preceded by one of these within NEGATION_WINDOW
+# tokens ("not happy", "would not recommend", "never helped") is negated
+NEGATORS = {"not", "no", "never", "without", "nor", "cannot", "hardly"}
+NEGATION_WINDOW = 3
+
+# Labels whose keywords can be negated ("not sure" is an escalate keyword itself)
+NEGATABLE_LABELS = {"positive", "negative", "neutral"}
+
+# Keyword hits the winning label needs before the lexicon alone can be
+# fully confident; with fewer, confidence is scaled down proportionally
+MIN_LEXICON_HITS = 2
+
+# Labelled exemplars for the embedding classifier
+EXEMPLARS = {
+    "positive": [
+        "The product is excellent. I really enjoyed using it and found it very helpful.",
+        "Great quality, works perfectly, I would recommend it to my friends.",
+        "I love it, best purchase I have made this year.",
+    ],
+    "negative": [
+        "The product is terrible. It broke after just one use and the quality is very poor.",
+        "Very disappointed, it stopped working and support never answered.",
+        "Waste of money, the item arrived damaged and does not work.",
+    ],
+    "neutral": [
+        "The product is okay. It works as expected but nothing exceptional.",
+        "It is fine for the price, neither good nor bad.",
+        "Average product, does the job.",
+    ],
+    "escalate": [
+        "I'm not sure about the product yet. Can you tell me more about its features and benefits?",
+        "I need to speak to someone about my order, please contact me.",
+        "Before I decide, could you give me more details on the warranty?",
+    ],
+}
+
+
+def _is_negated(text, position):
+    """
+    Whether one of the NEGATION_WINDOW tokens before `position` in the
+    lower-cased `text` is a negator ("not", "never", "isn't", ...). A
+    negation does not reach past clause punctuation ("not x, but y").
+    """
+    clause = re.split(r"[,.;:!?]", text[:position])[-1]
+    preceding = re.findall(r"[a-z']+", clause)[-NEGATION_WINDOW:]
+    return any(token in NEGATORS or token.endswith("n't") for token in preceding)
+
+
+def parse_label(text):
+    """
+    Picks the route from an LLM classification answer.
+
+    The prompt asks for the bare label, so an answer that is exactly one
+    label (ignoring case, whitespace and punctuation) is taken as is.
+    Otherwise the first label mention that is not negated wins, so "not
+    positive, rather negative" is routed as negative. Defaults to
+    "escalate" when no label is left.
+    """
+    text = text.lower().replace("’", "'")
+    bare = text.strip(" \t\n.!\"'*`")
+    if bare in LABELS:
+        return bare
+
+    positions = {}
+    for label in LABELS:
+        for match in re.finditer(rf"\b{label}\b", text):
+            if not _is_negated(text, match.start()):
+                positions[label] = match.start()
+                break
+    if not positions:
+        return LABELS[-1]
+    return min(positions, key=positions.get)
+
+
+# ---------------------------------------------------------
+# Local Classifiers
+# ---------------------------------------------------------
+
+class LexiconClassifier:
+    """
+    Counts lexicon keyword hits per label.
+
+    Confidence is the share of hits that went to the winning label, scaled
+    down when it has fewer than MIN_LEXICON_HITS hits, and 0.0 when no
+    keyword matched or two labels tie. A negated sentiment keyword ("not
+    happy", "not bad") also gives 0.0: flipping it is unreliable ("not
+    bad" is not "good"), so the feedback goes to the next classifier.
+    """
+
+    name = "lexicon"
+
+    def __init__(self, lexicon=None, min_confidence=0.75):
+        self.min_confidence = min_confidence
+        lexicon = lexicon or LEXICON
+        self._patterns = {
+            label: re.compile(r"\b(" + "|".join(re.escape(word) for word in words) + r")\b")
+            for label, words in lexicon.items()
+        }
+
+    def classify(self, text):
+        text = text.lower().replace("’", "'")
+        hits = {}
+        for label, pattern in self._patterns.items():
+            matches = list(pattern.finditer(text))
+            if label in NEGATABLE_LABELS and any(_is_negated(text, m.start()) for m in matches):
+                return label, 0.0
+            hits[label] = len(matches)
+
+        ranked = sorted(hits.items(), key=lambda item: item[1], reverse=True)
+        (label, best), (_, second) = ranked[0], ranked[1]
+        if best == 0 or best == second:
+            return label, 0.0
+        return label, best / sum(hits.values()) * min(1.0, best / MIN_LEXICON_HITS)
+
+    def classify_batch(self, texts):
+        return [self.classify(text) for text in texts]
+
+
+class EmbeddingClassifier:
+    """
+    Nearest-exemplar classifier on sentence embeddings.
+
+    Exemplars are embedded once, on the first classification (so the
+    embedding model is not loaded while the lexicon decides everything);
+    a feedback is assigned the label of its most similar exemplar.
+    Confidence is the cosine-similarity margin between the best label and
+    the runner-up.
+    """
+
+    name = "embedding"
+
+    def __init__(self, embeddings, exemplars=None, min_confidence=0.05):
+        self.embeddings = embeddings
+        self.min_confidence = min_confidence
+
+        exemplars = exemplars or EXEMPLARS
+        self._labels = []
+        self._texts = []
+        for label, examples in exemplars.items():
+            self._labels.extend([label] * len(examples))
+            self._texts.extend(examples)
+        self._vectors = None
+
+    def _exemplar_vectors(self):
+        if self._vectors is None:
+            vectors = np.asarray(self.embeddings.embed_documents(self._texts), dtype=np.float32)
+            self._vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        return self._vectors
+
+    def _decide(self, similarities):
+        # Best similarity per label
+        best = {}
+        for label, similarity in zip(self._labels, similarities):
+            best[label] = max(best.get(label, -1.0), float(similarity))
+
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        (label, top), (_, second) = ranked[0], ranked[1]
+        return label, top - second
+
+    def classify(self, text):
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        return self._decide(self._exemplar_vectors() @ (vector / np.linalg.norm(vector)))
+
+    def classify_batch(self, texts):
+        """
+        Classifies many feedbacks with one embed_documents call and one
+        matrix product against the exemplars.
+        """
+        if not texts:
+            return []
+        vectors = np.asarray(self.embeddings.embed_documents(list(texts)), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return [self._decide(row) for row in vectors @ self._exemplar_vectors().T]
+
+
+def load_embedding_classifier(**kwargs):
+    """
+    Builds an EmbeddingClassifier on the shared bge-small model used in
+    rag/ (common/models.py). The model is imported and loaded on the first
+    feedback the lexicon is not sure about.
+    """
+    from common.models import get_embeddings
+
+    return EmbeddingClassifier(get_embeddings(), **kwargs)
+
+
+# ---------------------------------------------------------
+# Router
+# ---------------------------------------------------------
+
+class SentimentRouter:
+    """
+    Chooses the feedback route with local classifiers first.
+
+    Classifiers are tried in order; the first whose confidence reaches its
+    `min_confidence` decides. Only when none is confident is
+    `llm_classifier` (a runnable taking {"feedback": ...} and returning
+    text) called, and its answer parsed with parse_label.
+
+    Call it with {"feedback": ...}; it returns the same dict with a
+    "sentiment" key added, ready for a RunnableBranch. `stats` counts the
+    requests decided locally vs. by the LLM; the latency saved is estimated
+    from the measured LLM calls (or `llm_latency_estimate` before the
+    first one).
+    """
+
+    def __init__(self, classifiers, llm_classifier, llm_latency_estimate=None):
+        self.classifiers = classifiers
+        self.llm_classifier = llm_classifier
+        self.llm_latency_estimate = llm_latency_estimate
+
+        self.stats = {"local": 0, "llm": 0, "local_seconds": 0.0, "llm_seconds": 0.0}
+        self.decided_by = {classifier.name: 0 for classifier in classifiers}
+
+    def _llm_latency(self):
+        if self.stats["llm"]:
+            return self.stats["llm_seconds"] / self.stats["llm"]
+        return self.llm_latency_estimate
+
+    def _classify_locally(self, feedback):
+        """
+        Returns the label of the first confident local classifier, or None.
+        """
+        start = time.perf_counter()
+        for classifier in self.classifiers:
+            label, confidence = classifier.classify(feedback)
+            if confidence >= classifier.min_confidence:
+                self.stats["local"] += 1
+                self.stats["local_seconds"] += time.perf_counter() - start
+                self.decided_by[classifier.name] += 1
+                return label
+        return None
+
+    def route(self, feedback):
+        """
+        Returns the route label for one feedback.
+        """
+        label = self._classify_locally(feedback)
+        if label is not None:
+            return label
+
+        llm_start = time.perf_counter()
+        label = parse_label(self.llm_classifier.invoke({"feedback": feedback}))
+        self.stats["llm"] += 1
+        self.stats["llm_seconds"] += time.perf_counter() - llm_start
+        return label
+
+    def route_batch(self, feedbacks, max_concurrency=None):
+        """
+        Routes many feedbacks at once: each local classifier on the whole
+        batch (classify_batch), then a single batched LLM call for all items
+        none of them was sure about.
+
+        Returns:
+            List of labels aligned with `feedbacks`
+        """
+        labels = [None] * len(feedbacks)
+        undecided = list(range(len(feedbacks)))
+
+        # Each classifier sees all items the previous ones were unsure about
+        # at once (one embedding call for the whole batch)
+        for classifier in self.classifiers:
+            if not undecided:
+                break
+            start = time.perf_counter()
+            results = classifier.classify_batch([feedbacks[i] for i in undecided])
+            elapsed = time.perf_counter() - start
+
+            remaining = []
+            for i, (label, confidence) in zip(undecided, results):
+                if confidence >= classifier.min_confidence:
+                    labels[i] = label
+                    self.stats["local"] += 1
+                    self.decided_by[classifier.name] += 1
+                else:
+                    remaining.append(i)
+            self.stats["local_seconds"] += elapsed
+            undecided = remaining
+
+        if undecided:
+            llm_start = time.perf_counter()
+            answers = self.llm_classifier.batch(
+                [{"feedback": feedbacks[i]} for i in undecided],
+                config={"max_concurrency": max_concurrency}
+            )
+            # Wall time of the batch, attributed evenly to its items
+            self.stats["llm"] += len(undecided)
+            self.stats["llm_seconds"] += time.perf_counter() - llm_start
+            for i, answer in zip(undecided, answers):
+                labels[i] = parse_label(answer)
+        return labels
+
+    def __call__(self, inputs):
+        return {**inputs, "sentiment": self.route(inputs["feedback"])}
+
+    def print_stats(self):
+        """
+        Prints how many requests were routed without a network call.
+        """
+        total = self.stats["local"] + self.stats["llm"]
+        if not total:
+            return
+
+        local = self.stats["local"]
+        by_classifier = ", ".join(f"{name}: {count}" for name, count in self.decided_by.items())
+        llm_latency = self._llm_latency()
+        if llm_latency is None:
+            saved = "n/a (no LLM classification measured)"
+        else:
+            saved = f"~{(local * llm_latency - self.stats['local_seconds']) * 1000:.0f} ms"
+
+        print("\n--- Sentiment Routing ---")
+        print(
+            f"Routed locally: {local}/{total} ({local / total:.0%}; {by_classifier}), "
+            f"LLM classifications: {self.stats['llm']}, latency saved: {saved}"
+        )
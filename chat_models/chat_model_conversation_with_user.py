@@ -1,47 +1,83 @@
 
 from dotenv import load_dotenv
 import os
-from langchain_groq import ChatGroq
+import sys
+import time
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+
+# shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.chat_history import DEFAULT_MAX_HISTORY_TOKENS, TokenBudgetHistory
+from common.models import get_chat_model
+
 load_dotenv()
-api_key = os.getenv("GROQ_API_KEY")
 
-# Use the updated model
-model = ChatGroq(
-    api_key=api_key,
-    model="llama-3.1-8b-instant", 
-    temperature=0.7 # temperature controls the randomness or creativity of the model’s responses
-)
+# print the reply token by token as it arrives (set STREAM_ANSWERS=0 to wait for the full reply)
+STREAM_ANSWERS = os.getenv("STREAM_ANSWERS", "1") == "1"
+
+# token budget for the chat history sent with every prompt
+MAX_HISTORY_TOKENS = int(os.getenv("MAX_HISTORY_TOKENS", str(DEFAULT_MAX_HISTORY_TOKENS)))
 
-# Initialize the chat history
-chat_history = []
+# Use the updated model (llama-3.1-8b-instant, temperature 0.7; shared ChatGroq built by common/models.py)
+model = get_chat_model()
 
-# write system message for giving the context to the LLM and store it in a chat history as a first message
+# write system message for giving the context to the LLM, it stays pinned at the start of every prompt
 system_Message = SystemMessage(content="You are an helpfull AI assitence.")
-chat_history.append(system_Message)
+
+# Initialize the chat history: recent turns are kept within the token budget,
+# older turns are folded into a running summary by the model in the background
+chat_history = TokenBudgetHistory(model, system_message=system_Message, max_tokens=MAX_HISTORY_TOKENS)
 
 while True:
     # taking input form user
     query = input("User: ")
-    if query.lower == "exit":
+    if query.lower() == "exit":
         break
 
-    # adding the user question to the chat history
+    # the prompt is the managed chat history followed by the user question
     humanMessage = HumanMessage(content=query)
-    chat_history.append(humanMessage)
+    prompt = chat_history.messages() + [humanMessage]
+
+    # start the clock for time-to-first-token and total time of this turn
+    start = time.perf_counter()
+    first_token_time = None
 
-    # providing the entire chat history to the model for better context
-    result = model.invoke(chat_history)
+    if STREAM_ANSWERS:
+        # providing the entire chat history to the model and printing each token as soon as it arrives
+        print("\nAI: ", end="", flush=True)
+        result = None
+        for chunk in model.stream(prompt):
+            if first_token_time is None and chunk.content:
+                first_token_time = time.perf_counter() - start
+            print(chunk.content, end="", flush=True)
+
+            # adding the chunks together assembles the complete reply message
+            result = chunk if result is None else result + chunk
+        print()
+    else:
+        # providing the chat history to the model for better context
+        result = model.invoke(prompt)
+
+    total_time = time.perf_counter() - start
 
     # Extracts the textual content from the returned model object
-    response = result.content
+    response = result.content if result is not None else ""
+
+    # Appends the question and the assistant’s reply to chat_history so they will be included in future turns.
+    chat_history.add_messages(humanMessage, AIMessage(content=response))
+
+    # Prints the assistant’s reply to the console (already printed while streaming).
+    if not STREAM_ANSWERS:
+        print(f"\nAI: {response}")
 
-    # Appends the assistant’s reply to chat_history so it will be included in future turns.
-    chat_history.append(AIMessage(content=response))
+    # Prints how long the user waited for the first token and for the whole reply
+    first_token = "n/a" if first_token_time is None else f"{first_token_time * 1000:.0f} ms"
+    print(f"[timing] first token: {first_token}, total: {total_time * 1000:.0f} ms")
 
-    # Prints the assistant’s reply to the console.
-    print(f"\nAI: {response}")
+    # Prints how many prompt tokens the managed history saved compared to the full history
+    chat_history.print_report()
 
 print("\n\n----------Chat History----------\n\n")
 # printing the entire chat history between the LLM and user
-print(f"{chat_history}")
\ No newline at end of file
+print(f"{chat_history.messages()}")
+chat_history.close()
\ No newline at end of file
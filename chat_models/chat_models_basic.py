@@ -1,16 +1,15 @@
 
 from dotenv import load_dotenv
 import os
-from langchain_groq import ChatGroq
+import sys
+
+# shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.models import get_chat_model
 load_dotenv()
-api_key = os.getenv("GROQ_API_KEY")
 
-# Use the updated model
-model = ChatGroq(
-    api_key=api_key,
-    model="llama-3.1-8b-instant", 
-    temperature=0.7 # temperature controls the randomness or creativity of the model’s responses
-)
+# Use the updated model (llama-3.1-8b-instant, temperature 0.7; shared ChatGroq built by common/models.py)
+model = get_chat_model()
 # invoke the model by using invoke function
 result = model.invoke("What is square root of 46.4?")
 
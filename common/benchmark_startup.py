@@ -0,0 +1,285 @@
+import argparse
+import json
+import os
+import platform
+import re
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime, timezone
+
+# Shared helpers live in common/ at the repository root
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_DIR)
+
+
+# ---------------------------------------------------------
+# Benchmark Configuration
+# ---------------------------------------------------------
+
+# Entry points, relative to the repository root. Ingestion-only scripts
+# (basic_rag_1a.py) are left out: their run time is embedding, not startup.
+SCRIPTS = [
+    "rag/basic_rag_1b.py",
+    "rag/rag_with_metadata.py",
+    "rag/rag_with_contectualMemory.py",
+    "chains/chains_basic.py",
+    "chains/chains_extended.py",
+    "chains/chains_branching.py",
+    "chains/chains_parallel.py",
+    "chat_models/chat_models_basic.py",
+    "chat_models/chat_model_conversation_with_user.py",
+    "prompt_templates/prompt_template_with_chat_model.py",
+]
+
+# Typed into the interactive scripts: one question, then exit
+STDIN = {
+    "rag/rag_with_contectualMemory.py": "How did Juliet die?\nexit\n",
+    "chat_models/chat_model_conversation_with_user.py": "What is LangChain?\nexit\n",
+}
+
+# Local run history, one JSON object per line (git-ignored)
+DEFAULT_HISTORY_PATH = os.path.join(REPO_DIR, "benchmarks", "startup_history.jsonl")
+
+# Stages recorded by common/models.py (and the vector store patch below)
+# that count as model / embedding loading
+MODEL_STAGE = re.compile(
+    r"^(import langchain_groq|import langchain_community\.embeddings|import sentence_transformers|construct |load )"
+)
+VECTOR_STORE_STAGE = "open vector store (Chroma)"
+
+# "import time:      self |   cumulative | <indent>module" (python -X importtime)
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+# Written to stderr by the child right before the script runs; imports
+# above it belong to the interpreter and this harness
+SCRIPT_START_MARKER = "--- startup benchmark: script starts ---"
+
+
+# ---------------------------------------------------------
+# Child Process: Run One Script, Record Its Stages
+# ---------------------------------------------------------
+
+def _patch_vector_store():
+    """
+    Times every Chroma(...) construction (opening the persisted DB).
+    """
+    from langchain_community.vectorstores import Chroma
+    from common.models import timed
+
+    original_init = Chroma.__init__
+
+    def timed_init(self, *args, **kwargs):
+        with timed(VECTOR_STORE_STAGE):
+            original_init(self, *args, **kwargs)
+
+    Chroma.__init__ = timed_init
+
+
+def run_child(script_path, result_path):
+    """
+    Runs `script_path` as __main__ in this process and writes its status,
+    run time and the stages recorded by common/models.py to `result_path`.
+    """
+    start = time.perf_counter()
+    status = "ok"
+    error = None
+    try:
+        with open(script_path, "r", encoding="utf-8") as f:
+            uses_chroma = "Chroma(" in f.read()
+
+        # Everything imported from here on counts towards the script, including
+        # the Chroma and common.models imports done by the patch below
+        print(SCRIPT_START_MARKER, file=sys.stderr, flush=True)
+        # Only imported for scripts that open a vector store, so the import
+        # profile of the other scripts is not inflated
+        if uses_chroma:
+            _patch_vector_store()
+
+        sys.argv = [script_path]
+        # The script directory replaces common/ as sys.path[0], as if run directly
+        sys.path[0] = os.path.dirname(script_path)
+        runpy.run_path(script_path, run_name="__main__")
+    except SystemExit as exc:
+        if exc.code not in (None, 0):
+            status = f"exit {exc.code}"
+    except BaseException as exc:
+        status = f"{type(exc).__name__}: {exc}"
+        error = traceback.format_exc()
+    finally:
+        from common.models import startup_timings
+
+        with open(result_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "status": status,
+                "run_seconds": time.perf_counter() - start,
+                "stages": startup_timings(),
+                "error": error,
+            }, f)
+
+
+# ---------------------------------------------------------
+# Parent Process: Measure Every Script
+# ---------------------------------------------------------
+
+def parse_import_times(stderr):
+    """
+    Sums the import time of the script's modules (everything after
+    SCRIPT_START_MARKER in the output of `python -X importtime`) per
+    top-level package. Self times are summed, so a package is charged only
+    for its own modules, not for the packages it imports.
+
+    Returns:
+        ({package: seconds} sorted slowest first, remaining stderr text)
+    """
+    imports = {}
+    other_lines = []
+    started = False
+    for line in stderr.splitlines():
+        if line == SCRIPT_START_MARKER:
+            started = True
+            continue
+        match = IMPORT_LINE.match(line)
+        if not match:
+            if not line.startswith("import time:"):
+                other_lines.append(line)
+            continue
+        if not started:
+            continue
+        self_us, _, _, module = match.groups()
+        root = module.split(".")[0]
+        imports[root] = imports.get(root, 0.0) + int(self_us) / 1e6
+
+    ranked = dict(sorted(imports.items(), key=lambda item: item[1], reverse=True))
+    return ranked, "\n".join(other_lines)
+
+
+def measure_script(script, llm_latency, timeout):
+    """
+    Runs one entry point in a fresh interpreter with the stub LLM.
+
+    Returns:
+        Dict with wall time, per-package import times, model and vector
+        store timings, and the recorded stages
+    """
+    script_path = os.path.join(REPO_DIR, script)
+    env = {**os.environ, "STUB_LLM": "1", "STUB_LLM_LATENCY": str(llm_latency)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result_path = os.path.join(tmp, "result.json")
+        start = time.perf_counter()
+        try:
+            completed = subprocess.run(
+                [sys.executable, "-X", "importtime", os.path.abspath(__file__),
+                 "--child", script_path, "--result", result_path],
+                input=STDIN.get(script, "exit\n"),
+                capture_output=True,
+                text=True,
+                cwd=REPO_DIR,
+                env=env,
+                timeout=timeout,
+            )
+            stderr = completed.stderr
+        except subprocess.TimeoutExpired as exc:
+            stderr = exc.stderr.decode() if isinstance(exc.stderr, bytes) else (exc.stderr or "")
+        wall_seconds = time.perf_counter() - start
+
+        child = {"status": f"timeout after {timeout} s", "run_seconds": None, "stages": {}, "error": None}
+        if os.path.exists(result_path):
+            with open(result_path, "r", encoding="utf-8") as f:
+                child = json.load(f)
+
+    imports, other_stderr = parse_import_times(stderr)
+    stages = child["stages"]
+    result = {
+        "status": child["status"],
+        "wall_seconds": wall_seconds,
+        "run_seconds": child["run_seconds"],
+        "import_seconds": sum(imports.values()),
+        "model_load_seconds": sum(s for stage, s in stages.items() if MODEL_STAGE.match(stage)),
+        "vector_store_seconds": stages.get(VECTOR_STORE_STAGE, 0.0),
+        "imports": imports,
+        "stages": stages,
+    }
+    if child["status"] != "ok":
+        result["stderr_tail"] = (child["error"] or other_stderr)[-2000:]
+    return result
+
+
+def load_previous_run(history_path):
+    if not os.path.exists(history_path):
+        return None
+    last = None
+    with open(history_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                last = json.loads(line)
+    return last
+
+
+def print_report(results, previous, top):
+    print(
+        f"\n{'script':>52} | {'wall s':>6} | {'imports s':>9} | {'models s':>8} | "
+        f"{'chroma s':>8} | {'vs last':>7} | status"
+    )
+    for script, result in results.items():
+        change = "-"
+        if previous and script in previous["scripts"]:
+            last = previous["scripts"][script]["wall_seconds"]
+            change = f"{(result['wall_seconds'] - last) / last:+.0%}"
+        print(
+            f"{script:>52} | {result['wall_seconds']:>6.2f} | {result['import_seconds']:>9.2f} | "
+            f"{result['model_load_seconds']:>8.2f} | {result['vector_store_seconds']:>8.2f} | "
+            f"{change:>7} | {result['status']}"
+        )
+
+    print(f"\nSlowest top-level imports (top {top}) and recorded stages:")
+    for script, result in results.items():
+        imports = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in list(result["imports"].items())[:top])
+        stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result["stages"].items())
+        print(f"  {script}\n    imports: {imports or 'n/a'}\n    stages:  {stages or 'n/a'}")
+        if "stderr_tail" in result:
+            print("    stderr:  " + result["stderr_tail"].strip().replace("\n", "\n             "))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure cold-start time of every entry-point script with a local stub LLM."
+    )
+    parser.add_argument("scripts", nargs="*", default=SCRIPTS, help="scripts relative to the repository root")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per script, the fastest is kept")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="stub LLM time to first token (seconds)")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--top", type=int, default=5, help="slowest imports listed per script")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH, help="JSONL file the run is appended to")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.result)
+        sys.exit(0)
+
+    previous = load_previous_run(args.history)
+    results = {}
+    for script in args.scripts:
+        runs = [measure_script(script, args.llm_latency, args.timeout) for _ in range(args.repeat)]
+        results[script] = min(runs, key=lambda run: run["wall_seconds"])
+        print(f"{script}: {results[script]['wall_seconds']:.2f} s ({results[script]['status']})")
+
+    print_report(results, previous, args.top)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "llm_latency": args.llm_latency,
+            "scripts": results,
+        }) + "\n")
+    print(f"\nResults appended to {args.history}")
@@ -0,0 +1,195 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+
+# ---------------------------------------------------------
+# History Budget Configuration
+# ---------------------------------------------------------
+
+# Token budget for the conversation part of the prompt (summary + recent turns)
+DEFAULT_MAX_HISTORY_TOKENS = 1500
+
+# The most recent messages are never folded into the summary
+DEFAULT_MIN_RECENT_MESSAGES = 2
+
+# Rough per-message overhead of chat formats (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def approximate_tokens(text):
+    """
+    Cheap token estimate (~4 characters per token for English text).
+
+    Good enough for budgeting and needs no tokenizer download; pass an
+    exact `count_tokens` to TokenBudgetHistory when one is available.
+    """
+    return math.ceil(len(text) / 4)
+
+
+# Prompt used to fold older turns into the rolling summary
+summarize_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You maintain a running summary of a conversation. "
+            "Extend the current summary with the new messages below. "
+            "Keep names, facts and open questions; drop small talk. "
+            "Answer with the updated summary only, in at most 120 words.\n\n"
+            "Current summary:\n{summary}"
+        ),
+        MessagesPlaceholder("messages"),
+    ]
+)
+
+
+# ---------------------------------------------------------
+# Token-Budgeted, Summarizing History
+# ---------------------------------------------------------
+
+class TokenBudgetHistory:
+    """
+    Chat history that keeps the prompt within a token budget.
+
+    `messages()` returns, in order: the pinned system message (if any), a
+    rolling summary of older turns (once there is one) and the most recent
+    messages. When the recent messages exceed `max_tokens`, the oldest ones
+    are moved out and folded into the summary by `summarizer_llm` on a
+    background thread, so the user never waits for it. Until a fold has
+    finished, the messages it covers are still sent verbatim.
+
+    After each turn `last_report` compares the prompt tokens of the
+    managed history with what the untrimmed history would have cost.
+
+    Pass `executor` to share one summary thread pool between many
+    histories (e.g. one per session of a server); it is then left
+    running by close().
+    """
+
+    def __init__(
+        self,
+        summarizer_llm,
+        system_message=None,
+        max_tokens=DEFAULT_MAX_HISTORY_TOKENS,
+        min_recent_messages=DEFAULT_MIN_RECENT_MESSAGES,
+        count_tokens=approximate_tokens,
+        executor=None,
+    ):
+        self.summarizer_llm = summarizer_llm
+        self.system_message = system_message
+        self.max_tokens = max_tokens
+        self.min_recent_messages = min_recent_messages
+        self.count_tokens = count_tokens
+
+        self.summary = ""
+        self._recent = []
+        # Moved out of the budget, waiting to be folded into the summary
+        self._pending = []
+        self._fold = None  # (future, number of pending messages it covers)
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+
+        # Tokens the untrimmed history would use (summary never applies)
+        self._full_tokens = 0
+        self.last_report = None
+
+    def message_tokens(self, message):
+        return self.count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+    def _tokens(self, messages):
+        return sum(self.message_tokens(message) for message in messages)
+
+    def _summary_message(self):
+        if not self.summary:
+            return []
+        return [SystemMessage(content=f"Summary of the earlier conversation:\n{self.summary}")]
+
+    def _collect_fold(self):
+        """
+        Applies a finished summary update and starts the next one if needed.
+        """
+        if self._fold is not None:
+            future, folded = self._fold
+            if not future.done():
+                return
+            self._fold = None
+            try:
+                self.summary = future.result()
+                del self._pending[:folded]
+            except Exception as error:
+                # The messages stay in the prompt verbatim and are retried
+                print(f"[history] summary update failed: {error}")
+
+        if self._pending:
+            messages = list(self._pending)
+            future = self._executor.submit(self._summarize, self.summary, messages)
+            self._fold = (future, len(messages))
+
+    def _summarize(self, summary, messages):
+        prompt = summarize_prompt.format_messages(
+            summary=summary or "(empty)",
+            messages=messages
+        )
+        return self.summarizer_llm.invoke(prompt).content.strip()
+
+    def messages(self):
+        """
+        Messages to send with the next prompt.
+        """
+        self._collect_fold()
+        pinned = [self.system_message] if self.system_message is not None else []
+        return pinned + self._summary_message() + self._pending + self._recent
+
+    def add_messages(self, *messages):
+        """
+        Appends the messages of one turn and enforces the token budget.
+        """
+        for message in messages:
+            self._recent.append(message)
+            self._full_tokens += self.message_tokens(message)
+
+        # Move the oldest messages out until the recent ones fit the budget
+        budget = self.max_tokens - self._tokens(self._summary_message())
+        while (
+            len(self._recent) > self.min_recent_messages
+            and self._tokens(self._recent) > budget
+        ):
+            self._pending.append(self._recent.pop(0))
+
+        self._collect_fold()
+        self._report()
+
+    def _report(self):
+        pinned_tokens = self._tokens([self.system_message]) if self.system_message is not None else 0
+        history_tokens = self._tokens(self.messages())
+        full_tokens = pinned_tokens + self._full_tokens
+        self.last_report = {
+            "history_tokens": history_tokens,
+            "full_tokens": full_tokens,
+            "saved_tokens": full_tokens - history_tokens,
+            "summarizing": self._fold is not None,
+        }
+
+    def print_report(self):
+        """
+        Prints prompt tokens used by the history vs. the untrimmed history.
+        """
+        if self.last_report is None:
+            return
+        report = self.last_report
+        status = " (summary update running)" if report["summarizing"] else ""
+        print(
+            f"[history] prompt tokens: ~{report['history_tokens']} "
+            f"(untrimmed: ~{report['full_tokens']}, "
+            f"saved: ~{report['saved_tokens']}){status}"
+        )
+
+    def close(self):
+        """
+        Waits for a running summary update and stops the background thread
+        (unless the executor was passed in).
+        """
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+# ---------------------------------------------------------
+# Local Stub Chat Model (benchmarks, no network)
+# ---------------------------------------------------------
+
+class FakeLatencyChatModel(BaseChatModel):
+    """
+    Chat model that waits like a remote API (time to first token, then a
+    fixed delay per token) and always returns `response`.
+
+    Sync calls block with time.sleep, async calls await asyncio.sleep, so
+    sequential, threaded and asyncio dispatch can be compared fairly.
+    """
+
+    response: str = "This is a canned answer from the local stub model."
+    first_token_seconds: float = 0.2
+    token_seconds: float = 0.005
+
+    @property
+    def _llm_type(self):
+        return "fake-latency-chat"
+
+    def _result(self):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    def _tokens(self):
+        words = self.response.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.first_token_seconds)
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.first_token_seconds)
+        return self._result()
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.first_token_seconds)
+        for token in self._tokens():
+            time.sleep(self.token_seconds)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.first_token_seconds)
+        for token in self._tokens():
+            await asyncio.sleep(self.token_seconds)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
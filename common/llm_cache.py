@@ -0,0 +1,191 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from collections import OrderedDict
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+
+# ---------------------------------------------------------
+# Cache Configuration
+# ---------------------------------------------------------
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# SQLite file shared by every script (*.sqlite3 is git-ignored)
+DEFAULT_CACHE_PATH = os.path.join(REPO_DIR, "cache", "llm_responses.sqlite3")
+
+# Responses kept in the in-memory tier (least recently used are evicted first)
+DEFAULT_MAX_MEMORY_ITEMS = 512
+
+
+def cache_key(prompt, llm_string):
+    """
+    Key of one response: SHA-256 over the model parameters (LangChain's
+    llm_string: model name, temperature, ...) and the serialized messages.
+    """
+    digest = hashlib.sha256()
+    digest.update(llm_string.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+# ---------------------------------------------------------
+# Two-Tier Response Cache
+# ---------------------------------------------------------
+
+class ResponseCache(BaseCache):
+    """
+    LangChain LLM cache with an in-memory LRU in front of a SQLite table.
+
+    Plugged into a chat model through its `cache` field (see
+    enable_response_cache), so every invoke/batch of that model checks the
+    cache before calling the API. The latency of each cache miss is
+    measured (from the lookup to the update) and stored with the response;
+    every later hit counts that latency as saved, per key and in total.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_memory_items=DEFAULT_MAX_MEMORY_ITEMS):
+        self.path = path
+        self.max_memory_items = max_memory_items
+
+        # key -> (generations, cost in seconds)
+        self._memory = OrderedDict()
+        # key -> lookup time of a miss, to measure the call it triggers
+        self._started = {}
+        self._conn = None
+        self._lock = threading.Lock()
+
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "saved_seconds": 0.0}
+        # key -> {"hits": int, "saved_seconds": float}
+        self.key_stats = {}
+
+    def _connection(self):
+        # Opened on first use, so a disabled cache never creates the file
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, llm_string TEXT, generations TEXT, "
+                "cost_seconds REAL, created_at REAL)"
+            )
+        return self._conn
+
+    def _remember(self, key, generations, cost_seconds):
+        self._memory[key] = (generations, cost_seconds)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _record_hit(self, key, tier, cost_seconds):
+        self.stats[tier] += 1
+        self.stats["saved_seconds"] += cost_seconds
+        entry = self.key_stats.setdefault(key, {"hits": 0, "saved_seconds": 0.0})
+        entry["hits"] += 1
+        entry["saved_seconds"] += cost_seconds
+
+    def lookup(self, prompt, llm_string):
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._record_hit(key, "memory_hits", entry[1])
+                return entry[0]
+
+            row = self._connection().execute(
+                "SELECT generations, cost_seconds FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                with warnings.catch_warnings():
+                    # loads() is marked beta; the rows are our own dumps() output
+                    warnings.simplefilter("ignore", LangChainBetaWarning)
+                    generations = loads(row[0], allowed_objects="core")
+                self._remember(key, generations, row[1])
+                self._record_hit(key, "disk_hits", row[1])
+                return generations
+
+            self.stats["misses"] += 1
+            self._started[key] = time.perf_counter()
+            return None
+
+    def update(self, prompt, llm_string, return_val):
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            started = self._started.pop(key, None)
+            cost_seconds = time.perf_counter() - started if started is not None else 0.0
+
+            self._remember(key, return_val, cost_seconds)
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, llm_string, dumps(return_val), cost_seconds, time.time())
+            )
+            conn.commit()
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._memory.clear()
+            self._connection().execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def print_stats(self, top=3):
+        """
+        Prints hit/miss counters, the total latency saved and the keys
+        that saved the most.
+        """
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        print("\n--- LLM Response Cache ---")
+        print(
+            f"Hits: {hits} (memory: {self.stats['memory_hits']}, "
+            f"disk: {self.stats['disk_hits']}), misses: {self.stats['misses']}, "
+            f"latency saved: ~{self.stats['saved_seconds']:.2f} s"
+        )
+        ranked = sorted(self.key_stats.items(), key=lambda item: item[1]["saved_seconds"], reverse=True)
+        for key, entry in ranked[:top]:
+            print(f"  {key[:12]}: {entry['hits']} hits, ~{entry['saved_seconds']:.2f} s saved")
+
+
+# ---------------------------------------------------------
+# Opt-In Helpers
+# ---------------------------------------------------------
+
+_shared_cache = None
+
+
+def shared_response_cache():
+    """
+    The process-wide ResponseCache backed by DEFAULT_CACHE_PATH.
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ResponseCache()
+    return _shared_cache
+
+
+def enable_response_cache(model, cacheable=False, cache=None):
+    """
+    Returns `model` with the response cache attached when its calls are
+    deterministic (temperature 0) or the caller marks them `cacheable`
+    (accepting that a sampled answer is replayed). Otherwise the model is
+    returned unchanged and never touches the cache.
+    """
+    if getattr(model, "temperature", None) != 0 and not cacheable:
+        return model
+    return model.model_copy(update={"cache": cache or shared_response_cache()})
+
+
+def print_response_cache_stats(model):
+    """
+    Prints the cache statistics of a model returned by enable_response_cache
+    (nothing when caching was not enabled for it).
+    """
+    if isinstance(model.cache, ResponseCache):
+        model.cache.print_stats()
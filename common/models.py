@@ -0,0 +1,321 @@
+import atexit
+import importlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+
+
+# ---------------------------------------------------------
+# Model Configuration
+# ---------------------------------------------------------
+
+# Chat model used by every script
+CHAT_MODEL = "llama-3.1-8b-instant"
+DEFAULT_TEMPERATURE = 0.7
+
+# IMPORTANT:
+# The embedding model MUST be the same for ingestion and retrieval
+# (every Chroma DB in rag/db was built with these settings).
+EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+ENCODE_KWARGS = {"normalize_embeddings": True}
+
+# Small local cross-encoder for the optional rerank stage (rag/reranking.py).
+# It outputs raw logits; LazyCrossEncoder maps them to [0, 1] with a sigmoid.
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# Set STARTUP_REPORT=1 to print the import / construction / first-call
+# breakdown when the process exits
+STARTUP_REPORT = os.getenv("STARTUP_REPORT", "0") == "1"
+
+# Set STUB_LLM=1 to get the local FakeLatencyChatModel instead of ChatGroq
+# (no API key or network; STUB_LLM_LATENCY is its time to first token)
+STUB_LLM_RESPONSE = "This is a canned answer from the local stub model."
+
+
+# ---------------------------------------------------------
+# Startup Timings
+# ---------------------------------------------------------
+
+# stage -> seconds, in the order the stages happened
+_timings = {}
+_timings_lock = threading.Lock()
+
+
+def _record(stage, seconds):
+    with _timings_lock:
+        _timings[stage] = _timings.get(stage, 0.0) + seconds
+
+
+def _timed_import(module_name, attribute):
+    start = time.perf_counter()
+    value = getattr(importlib.import_module(module_name), attribute)
+    _record(f"import {module_name}", time.perf_counter() - start)
+    return value
+
+
+@contextmanager
+def timed(stage):
+    """
+    Adds the duration of the `with` block to the startup report under `stage`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(stage, time.perf_counter() - start)
+
+
+def startup_timings():
+    """
+    Returns:
+        Copy of the recorded {stage: seconds}
+    """
+    with _timings_lock:
+        return dict(_timings)
+
+
+def print_startup_report():
+    """
+    Prints how long each import, model construction and first call took.
+    """
+    timings = startup_timings()
+    if not timings:
+        return
+    print("\n--- Startup Report ---")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<45} {seconds * 1000:>8.0f} ms")
+
+
+if STARTUP_REPORT:
+    atexit.register(print_startup_report)
+
+
+class _FirstCallTimer(BaseCallbackHandler):
+    """
+    Records the latency of the first chat model call (connection setup
+    included) under `stage`; later calls are ignored.
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.done = False
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        if not self.done:
+            self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._started.pop(run_id, None)
+        if start is not None and not self.done:
+            self.done = True
+            _record(self.stage, time.perf_counter() - start)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+
+# ---------------------------------------------------------
+# Chat Model Factory
+# ---------------------------------------------------------
+
+# (temperature, sorted kwargs) -> ChatGroq
+_chat_models = {}
+_factory_lock = threading.Lock()
+
+
+def get_chat_model(temperature=DEFAULT_TEMPERATURE, **kwargs):
+    """
+    Returns the process-wide ChatGroq for these settings.
+
+    langchain_groq is imported and the client built on the first call;
+    later calls with the same settings reuse the instance (and its HTTP
+    connection pool). The API key defaults to GROQ_API_KEY. With
+    STUB_LLM=1 the local FakeLatencyChatModel is returned instead.
+
+    Inputs:
+        temperature -> sampling temperature
+        kwargs      -> any other ChatGroq field (model, api_key, ...)
+    """
+    kwargs.setdefault("model", CHAT_MODEL)
+    key = (temperature, tuple(sorted(kwargs.items())))
+
+    with _factory_lock:
+        if key not in _chat_models and os.getenv("STUB_LLM", "0") == "1":
+            from common.fake_chat_model import FakeLatencyChatModel
+
+            _chat_models[key] = FakeLatencyChatModel(
+                response=STUB_LLM_RESPONSE,
+                first_token_seconds=float(os.getenv("STUB_LLM_LATENCY", "0.2")),
+                callbacks=[_FirstCallTimer("first chat call (stub)")]
+            )
+        if key not in _chat_models:
+            ChatGroq = _timed_import("langchain_groq", "ChatGroq")
+            start = time.perf_counter()
+            _chat_models[key] = ChatGroq(
+                temperature=temperature,
+                callbacks=[_FirstCallTimer(f"first chat call ({kwargs['model']})")],
+                **kwargs
+            )
+            _record("construct ChatGroq", time.perf_counter() - start)
+        return _chat_models[key]
+
+
+# ---------------------------------------------------------
+# Embedding Model Factory
+# ---------------------------------------------------------
+
+def build_embeddings():
+    """
+    Imports and builds the HuggingFace embedding model (loads the
+    sentence-transformers weights). Module-level, so it can be handed to
+    embedding worker processes as a picklable factory.
+    """
+    HuggingFaceEmbeddings = _timed_import("langchain_community.embeddings", "HuggingFaceEmbeddings")
+    start = time.perf_counter()
+    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL, encode_kwargs=ENCODE_KWARGS)
+    _record("load embedding model", time.perf_counter() - start)
+    return embeddings
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    Embeddings that build the wrapped model on the first embed call.
+
+    Scripts can create their vector store and retriever at startup and
+    only pay for the model load when something is actually embedded.
+    `model_name` and `encode_kwargs` are known up front, so wrappers such
+    as CachedEmbeddings can namespace their cache without loading it.
+    """
+
+    def __init__(self, factory=build_embeddings, model_name=EMBEDDING_MODEL, encode_kwargs=None):
+        self.factory = factory
+        self.model_name = model_name
+        self.encode_kwargs = encode_kwargs if encode_kwargs is not None else ENCODE_KWARGS
+        self._model = None
+        self._first_call = True
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = self.factory()
+            return self._model
+
+    def _embed(self, method, payload):
+        model = self.model
+        if not self._first_call:
+            return getattr(model, method)(payload)
+
+        start = time.perf_counter()
+        result = getattr(model, method)(payload)
+        if self._first_call:
+            self._first_call = False
+            _record(f"first {method} call", time.perf_counter() - start)
+        return result
+
+    def embed_documents(self, texts):
+        return self._embed("embed_documents", texts)
+
+    def embed_query(self, text):
+        return self._embed("embed_query", text)
+
+
+_embeddings = None
+
+
+def get_embeddings():
+    """
+    Returns the process-wide LazyEmbeddings for EMBEDDING_MODEL.
+    """
+    global _embeddings
+    with _factory_lock:
+        if _embeddings is None:
+            _embeddings = LazyEmbeddings()
+        return _embeddings
+
+
+# ---------------------------------------------------------
+# Rerank Model Factory
+# ---------------------------------------------------------
+
+class LazyCrossEncoder:
+    """
+    sentence-transformers CrossEncoder built on the first predict call,
+    so scripts with reranking turned off never import or load it.
+    """
+
+    def __init__(self, model_name=RERANK_MODEL):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                CrossEncoder = _timed_import("sentence_transformers", "CrossEncoder")
+                start = time.perf_counter()
+                self._model = CrossEncoder(self.model_name)
+                _record("load rerank model", time.perf_counter() - start)
+            return self._model
+
+    def predict(self, pairs, batch_size=32):
+        """
+        Relevance of each (query, passage) pair, in [0, 1].
+
+        ms-marco cross-encoders return unbounded logits (roughly -11 to
+        +11); the sigmoid keeps the order and makes 0.5 the point where the
+        model rates a passage as relevant as not.
+        """
+        # Already loaded by sentence_transformers
+        import numpy as np
+
+        logits = np.asarray(
+            self.model.predict(pairs, batch_size=batch_size, show_progress_bar=False), dtype=np.float64
+        )
+        return 1.0 / (1.0 + np.exp(-logits))
+
+
+_cross_encoder = None
+
+
+def get_cross_encoder():
+    """
+    Returns the process-wide LazyCrossEncoder for RERANK_MODEL.
+    """
+    global _cross_encoder
+    with _factory_lock:
+        if _cross_encoder is None:
+            _cross_encoder = LazyCrossEncoder()
+        return _cross_encoder
+
+
+# ---------------------------------------------------------
+# Background Warm-Up
+# ---------------------------------------------------------
+
+def warm_up(chat=False, embeddings=False):
+    """
+    Imports and builds the requested models on a daemon thread, so the
+    work overlaps with the rest of the script's startup (opening Chroma,
+    waiting for the first user input). get_chat_model / the first embed
+    call pick up the warmed instances, or wait for them if still loading.
+
+    Returns:
+        The started thread
+    """
+    def load():
+        if chat:
+            get_chat_model()
+        if embeddings:
+            get_embeddings().model
+
+    thread = threading.Thread(target=load, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,160 @@
+from string import Formatter
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.prompt_values import ChatPromptValue
+from langchain_core.runnables import Runnable, RunnableConfig, ensure_config
+
+
+# ---------------------------------------------------------
+# Message Roles
+# ---------------------------------------------------------
+
+# Same role names ChatPromptTemplate.from_messages accepts
+MESSAGE_TYPES = {
+    "system": SystemMessage,
+    "human": HumanMessage,
+    "user": HumanMessage,
+    "ai": AIMessage,
+    "assistant": AIMessage,
+}
+
+_formatter = Formatter()
+
+
+def parse_template(text):
+    """
+    Splits an f-string style template into literal text and placeholders,
+    once, so formatting never has to scan the string again.
+
+    Raises:
+        ValueError for malformed templates (unbalanced braces) and for
+        placeholders that are not plain names, e.g. "{user.name}" or "{0}"
+
+    Returns:
+        (parts, names): parts is a list of (literal, name, format_spec,
+        conversion) like string.Formatter.parse, names the placeholders
+    """
+    parts, names = [], []
+    for literal, name, format_spec, conversion in _formatter.parse(text):
+        if name is not None:
+            if not name.isidentifier():
+                raise ValueError(
+                    f"Unsupported placeholder {{{name}}} in prompt template: {text!r}"
+                )
+            if name not in names:
+                names.append(name)
+        parts.append((literal, name, format_spec or "", conversion))
+    return parts, names
+
+
+def _render(parts, values):
+    out = []
+    for literal, name, format_spec, conversion in parts:
+        out.append(literal)
+        if name is None:
+            continue
+        value = values[name]
+        if conversion == "r":
+            value = repr(value)
+        elif conversion == "s":
+            value = str(value)
+        elif conversion == "a":
+            value = ascii(value)
+        out.append(value if type(value) is str and not format_spec else format(value, format_spec))
+    return "".join(out)
+
+
+# ---------------------------------------------------------
+# Compiled Prompt
+# ---------------------------------------------------------
+
+class CompiledPrompt(Runnable):
+    """
+    Chat prompt parsed once, formatted without re-tokenizing placeholders.
+
+    Formatting produces the same messages as the equivalent
+    ChatPromptTemplate, and it composes into chains the same way
+    (`compiled | model | StrOutputParser()`). Only plain f-string
+    placeholders are supported; templates needing more (partials, message
+    placeholders, jinja2) should stay ChatPromptTemplates.
+    """
+
+    def __init__(self, messages):
+        self._messages = []
+        names = []
+        for message in messages:
+            role, text = ("human", message) if isinstance(message, str) else message
+            if role not in MESSAGE_TYPES:
+                raise ValueError(f"Unsupported message role {role!r} in prompt template.")
+            parts, message_names = parse_template(text)
+            self._messages.append((MESSAGE_TYPES[role], parts))
+            names.extend(name for name in message_names if name not in names)
+        self.input_variables = names
+
+    def _check_inputs(self, values):
+        missing = [name for name in self.input_variables if name not in values]
+        if missing:
+            raise KeyError(
+                f"Input to CompiledPrompt is missing variables {missing}. "
+                f"Expected: {self.input_variables} Received: {list(values)}"
+            )
+
+    def format_messages(self, **kwargs):
+        """
+        Returns the formatted messages (SystemMessage / HumanMessage / AIMessage).
+        """
+        self._check_inputs(kwargs)
+        return [message_type(content=_render(parts, kwargs)) for message_type, parts in self._messages]
+
+    def format_prompt(self, **kwargs):
+        """
+        Returns a ChatPromptValue, like ChatPromptTemplate.format_prompt.
+        """
+        return ChatPromptValue(messages=self.format_messages(**kwargs))
+
+    def invoke(self, input: dict, config: Optional[RunnableConfig] = None, **kwargs: Any) -> ChatPromptValue:
+        # Reported as a step only when a handler is attached (e.g. the stage
+        # tracer); otherwise no callback manager is built
+        callbacks = ensure_config(config).get("callbacks")
+        if getattr(callbacks, "handlers", callbacks):
+            return self._call_with_config(lambda values: self.format_prompt(**values), input, config, run_type="prompt")
+        return self.format_prompt(**input)
+
+
+# ---------------------------------------------------------
+# Registry (cached by template text)
+# ---------------------------------------------------------
+
+_registry = {}
+
+
+def _normalize_messages(messages):
+    # Bare strings are human messages, like in ChatPromptTemplate.from_messages
+    return tuple(
+        ("human", message) if isinstance(message, str) else tuple(message)
+        for message in messages
+    )
+
+
+def compile_messages(messages):
+    """
+    Returns the CompiledPrompt for a list of (role, template) messages,
+    parsing and validating it only the first time this text is seen.
+    """
+    key = _normalize_messages(messages)
+    compiled = _registry.get(key)
+    if compiled is None:
+        compiled = _registry.setdefault(key, CompiledPrompt(key))
+    return compiled
+
+
+def compile_template(template):
+    """
+    Single human-message prompt, the equivalent of ChatPromptTemplate.from_template.
+    """
+    return compile_messages([("human", template)])
+
+
+def registry_size():
+    return len(_registry)
@@ -0,0 +1,378 @@
+import atexit
+import csv
+import json
+import os
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage
+from langchain_core.prompt_values import PromptValue
+
+
+# ---------------------------------------------------------
+# Tracing Configuration
+# ---------------------------------------------------------
+
+# Set STAGE_TRACE=<file.json|file.csv> to trace every step of the chains;
+# a summary is printed and the records are exported when the process exits
+STAGE_TRACE = os.getenv("STAGE_TRACE")
+
+# Joins the step names of nested runs into one stage key
+STAGE_SEPARATOR = " > "
+
+CSV_FIELDS = [
+    "stage", "name", "kind", "depth", "started_at", "seconds", "first_token_seconds",
+    "input_chars", "output_chars", "input_tokens", "output_tokens", "items", "status",
+]
+
+
+def payload_chars(value):
+    """
+    Approximate size of a step's input or output in characters: text of
+    strings, messages, prompts and documents, summed over containers.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, BaseMessage):
+        return payload_chars(value.content)
+    if isinstance(value, Document):
+        return len(value.page_content)
+    if isinstance(value, PromptValue):
+        return payload_chars(value.to_messages())
+    if isinstance(value, dict):
+        return sum(payload_chars(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(payload_chars(item) for item in value)
+    return len(str(value))
+
+
+def percentile(sorted_values, q):
+    """
+    Linear-interpolated percentile (q in 0..100) of an ascending list.
+    """
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _token_usage(response):
+    """
+    (input tokens, output tokens) reported by the provider, or (None, None).
+    """
+    input_tokens = output_tokens = None
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens = (input_tokens or 0) + usage.get("input_tokens", 0)
+                output_tokens = (output_tokens or 0) + usage.get("output_tokens", 0)
+    if input_tokens is None and response.llm_output:
+        usage = response.llm_output.get("token_usage") or {}
+        input_tokens = usage.get("prompt_tokens")
+        output_tokens = usage.get("completion_tokens")
+    return input_tokens, output_tokens
+
+
+# ---------------------------------------------------------
+# Tracing Callback Handler
+# ---------------------------------------------------------
+
+class StageTracer(BaseCallbackHandler):
+    """
+    Callback handler that records one entry per Runnable step.
+
+    Pass it in the config of any invoke / stream / batch call
+    (RunnableSequence, RunnableParallel, RunnableBranch, RunnableLambda,
+    prompts, chat models and retrievers all report through callbacks).
+    Every step gets wall time, input/output size in characters, and for
+    chat models the time to first token and the token counts reported by
+    the provider. Nested steps are keyed by their path from the outermost
+    run, e.g. "RunnableSequence > RunnableParallel<context,input> > CachedRetriever",
+    so the same step in different chains stays separate.
+
+    Work that does not emit callbacks (embedding calls) can be added with
+    `record`, see TracedEmbeddings.
+    """
+
+    # Called in the calling thread / event loop, so timings are not delayed
+    run_inline = True
+
+    def __init__(self):
+        self.records = []
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, parent_run_id, kind, name, payload):
+        with self._lock:
+            parent = self._open.get(parent_run_id)
+            record = {
+                "stage": parent["stage"] + STAGE_SEPARATOR + name if parent else name,
+                "name": name,
+                "kind": kind,
+                "depth": parent["depth"] + 1 if parent else 0,
+                "started_at": time.time(),
+                "seconds": None,
+                "first_token_seconds": None,
+                "input_chars": payload_chars(payload),
+                "output_chars": None,
+                "input_tokens": None,
+                "output_tokens": None,
+                "items": None,
+                "status": "running",
+                "_start": time.perf_counter(),
+            }
+            self._open[run_id] = record
+
+    def _end(self, run_id, output=None, status="ok", **fields):
+        with self._lock:
+            record = self._open.pop(run_id, None)
+            if record is None:
+                return
+            record["seconds"] = time.perf_counter() - record.pop("_start")
+            record["output_chars"] = payload_chars(output)
+            record["status"] = status
+            record.update(fields)
+            self.records.append(record)
+
+    @staticmethod
+    def _name(serialized, kwargs, default):
+        serialized = serialized or {}
+        return kwargs.get("name") or serialized.get("name") or (serialized.get("id") or [default])[-1]
+
+    # Chains (sequences, parallels, branches, lambdas, prompts, parsers)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "chain", self._name(serialized, kwargs, "chain"), inputs)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id, outputs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, status=f"error: {type(error).__name__}")
+
+    # Chat models
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "llm", self._name(serialized, kwargs, "chat_model"), messages)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "llm", self._name(serialized, kwargs, "llm"), prompts)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            record = self._open.get(run_id)
+            if record is not None and record["first_token_seconds"] is None:
+                record["first_token_seconds"] = time.perf_counter() - record["_start"]
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        input_tokens, output_tokens = _token_usage(response)
+        outputs = [generation.text for generations in response.generations for generation in generations]
+        self._end(run_id, outputs, input_tokens=input_tokens, output_tokens=output_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, status=f"error: {type(error).__name__}")
+
+    # Retrievers
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "retriever", self._name(serialized, kwargs, "retriever"), query)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id, documents, items=len(documents))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, status=f"error: {type(error).__name__}")
+
+    # Work without callbacks
+
+    def record(self, stage, seconds, kind="custom", **fields):
+        """
+        Adds a finished step that was timed outside LangChain's callbacks.
+        """
+        record = {field: None for field in CSV_FIELDS}
+        record.update({
+            "stage": stage, "name": stage, "kind": kind, "depth": 0,
+            "started_at": time.time() - seconds, "seconds": seconds, "status": "ok",
+        })
+        record.update(fields)
+        with self._lock:
+            self.records.append(record)
+
+    # Aggregation / export
+
+    def summary(self):
+        """
+        Per-stage aggregates over every recorded run, in tree order: each
+        stage follows its parent, siblings in the order they first started.
+
+        Returns:
+            List of dicts with count, p50/p95/max/mean seconds, mean time
+            to first token, mean input/output characters and token totals
+        """
+        with self._lock:
+            records = list(self.records)
+
+        stages = {}
+        for record in records:
+            stages.setdefault(record["stage"], []).append(record)
+
+        first_started = {stage: min(run["started_at"] for run in runs) for stage, runs in stages.items()}
+
+        def tree_position(stage):
+            names = stage.split(STAGE_SEPARATOR)
+            prefixes = (STAGE_SEPARATOR.join(names[:i]) for i in range(1, len(names) + 1))
+            return tuple(first_started.get(prefix, first_started[stage]) for prefix in prefixes)
+
+        summary = []
+        for stage in sorted(stages, key=tree_position):
+            runs = stages[stage]
+            seconds = sorted(run["seconds"] for run in runs)
+            first_tokens = [run["first_token_seconds"] for run in runs if run["first_token_seconds"] is not None]
+            input_tokens = [run["input_tokens"] for run in runs if run["input_tokens"] is not None]
+            output_tokens = [run["output_tokens"] for run in runs if run["output_tokens"] is not None]
+            summary.append({
+                "stage": stage,
+                "name": runs[0]["name"],
+                "kind": runs[0]["kind"],
+                "depth": runs[0]["depth"],
+                "count": len(runs),
+                "errors": sum(1 for run in runs if run["status"] != "ok"),
+                "p50_seconds": percentile(seconds, 50),
+                "p95_seconds": percentile(seconds, 95),
+                "max_seconds": seconds[-1],
+                "mean_seconds": sum(seconds) / len(seconds),
+                "mean_first_token_seconds": sum(first_tokens) / len(first_tokens) if first_tokens else None,
+                "mean_input_chars": sum(run["input_chars"] or 0 for run in runs) / len(runs),
+                "mean_output_chars": sum(run["output_chars"] or 0 for run in runs) / len(runs),
+                "input_tokens": sum(input_tokens) if input_tokens else None,
+                "output_tokens": sum(output_tokens) if output_tokens else None,
+            })
+        return summary
+
+    def print_summary(self):
+        """
+        Prints the per-stage table, nested steps indented under their parent.
+        """
+        summary = self.summary()
+        if not summary:
+            return
+
+        print(f"\n--- Stage Timings ({len(self.records)} steps) ---")
+        print(f"{'stage':<48} {'n':>4} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'in/out chars':>14} {'tokens in/out':>14}")
+        for stage in summary:
+            label = ("  " * stage["depth"] + stage["name"])[:48]
+            chars = f"{stage['mean_input_chars']:.0f}/{stage['mean_output_chars']:.0f}"
+            tokens = "-"
+            if stage["input_tokens"] is not None:
+                tokens = f"{stage['input_tokens']}/{stage['output_tokens']}"
+            print(
+                f"{label:<48} {stage['count']:>4} {stage['p50_seconds'] * 1000:>8.1f} "
+                f"{stage['p95_seconds'] * 1000:>8.1f} {stage['max_seconds'] * 1000:>8.1f} "
+                f"{chars:>14} {tokens:>14}"
+            )
+
+    def export(self, path):
+        """
+        Writes the records to `path`: one row per step for .csv, otherwise
+        JSON with the per-stage summary and every record.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            records = list(self.records)
+
+        if path.lower().endswith(".csv"):
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(records)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"summary": self.summary(), "records": records}, f, indent=2)
+
+
+class TracedEmbeddings(Embeddings):
+    """
+    Times every embedding call of the wrapped model into a StageTracer
+    ("embed_query" / "embed_documents"); embedding models do not emit
+    LangChain callbacks. Other attributes (model_name, encode_kwargs, ...)
+    are passed through, so embedding caches can wrap this object.
+    """
+
+    def __init__(self, embeddings, tracer):
+        self.embeddings = embeddings
+        self.tracer = tracer
+
+    def __getattr__(self, name):
+        embeddings = self.__dict__.get("embeddings")
+        if embeddings is None:
+            raise AttributeError(name)
+        return getattr(embeddings, name)
+
+    def embed_documents(self, texts):
+        start = time.perf_counter()
+        vectors = self.embeddings.embed_documents(texts)
+        self.tracer.record(
+            "embed_documents", time.perf_counter() - start,
+            kind="embedding", input_chars=payload_chars(texts), items=len(texts)
+        )
+        return vectors
+
+    def embed_query(self, text):
+        start = time.perf_counter()
+        vector = self.embeddings.embed_query(text)
+        self.tracer.record(
+            "embed_query", time.perf_counter() - start,
+            kind="embedding", input_chars=len(text), items=1
+        )
+        return vector
+
+
+# ---------------------------------------------------------
+# Opt-In Helpers (STAGE_TRACE)
+# ---------------------------------------------------------
+
+_tracer = None
+
+
+def get_tracer():
+    """
+    The process-wide StageTracer when STAGE_TRACE is set, otherwise None.
+    On first use it registers the summary and export to run at exit.
+    """
+    global _tracer
+    if STAGE_TRACE and _tracer is None:
+        _tracer = StageTracer()
+
+        def report():
+            _tracer.print_summary()
+            _tracer.export(STAGE_TRACE)
+            print(f"Stage trace written to {STAGE_TRACE}")
+
+        atexit.register(report)
+    return _tracer
+
+
+def trace_config():
+    """
+    Runnable config that attaches the tracer, or {} when tracing is off:
+    chain.invoke(inputs, config=trace_config()).
+    """
+    tracer = get_tracer()
+    return {"callbacks": [tracer]} if tracer else {}
+
+
+def trace_embeddings(embeddings):
+    """
+    Wraps `embeddings` in TracedEmbeddings when tracing is on.
+    """
+    tracer = get_tracer()
+    return TracedEmbeddings(embeddings, tracer) if tracer else embeddings
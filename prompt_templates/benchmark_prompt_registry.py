@@ -0,0 +1,105 @@
+import argparse
+import os
+import sys
+import time
+
+from langchain_core.prompts import ChatPromptTemplate
+
+# shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.prompt_registry import compile_messages
+
+
+# ---------------------------------------------------------
+# Templates used in chains_* and prompt_templates/*
+# ---------------------------------------------------------
+
+TEMPLATES = {
+    "joke (from_template)": (
+        [("human", "Tell me {number} jokes about {topic}.")],
+        {"number": 3, "topic": "cat"},
+    ),
+    "comedian (basic/extended)": (
+        [
+            ("system", "You are a comedian who tells jokes about {topic}."),
+            ("human", "Tell me {joke_count} jokes."),
+        ],
+        {"topic": "lawyers", "joke_count": 3},
+    ),
+    "features (parallel)": (
+        [
+            ("system", "You are an expert {product_category} viewer."),
+            ("human", "List me the features of {first_product} and {second_product}."),
+        ],
+        {"product_category": "Car", "first_product": "Tesla", "second_product": "BYD"},
+    ),
+    "pros/cons (parallel)": (
+        [
+            ("system", "You are an expert {product_category} reviewer"),
+            (
+                "human",
+                "Given these products features: {products_features}, give me 3 {consideration} of buying {product_name}.",
+            ),
+        ],
+        {
+            "product_category": "Car",
+            "products_features": "Electric drivetrain, autopilot, large touchscreen. " * 20,
+            "consideration": "pros",
+            "product_name": "Tesla",
+        },
+    ),
+    "classification (branching)": (
+        [
+            ("system", "You are a helpful assistent."),
+            ("human", "Classify the sentiment of this feedback as positive, negative, neutral, or escalate: {feedback}."),
+        ],
+        {"feedback": "The product is terrible. It broke after just one use and the quality is very poor."},
+    ),
+}
+
+
+# ---------------------------------------------------------
+# Formatting Strategies
+# ---------------------------------------------------------
+
+def per_call(messages, values):
+    # What extract_products_arguments used to do: build, then format
+    return ChatPromptTemplate.from_messages(messages).format_prompt(**values)
+
+
+def measure(format_fn, iterations):
+    """
+    Returns:
+        Prompts formatted per second
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        format_fn()
+    return iterations / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure prompt formatting throughput: per-call template, precompiled template and prompt registry."
+    )
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"Iterations per template: {args.iterations}\n")
+    print(f"{'template':>27} | {'per call/s':>10} | {'template/s':>10} | {'registry/s':>10} | {'vs per call':>11}")
+
+    for name, (messages, values) in TEMPLATES.items():
+        template = ChatPromptTemplate.from_messages(messages)
+        compiled = compile_messages(messages)
+
+        # The registry must produce exactly what ChatPromptTemplate produces
+        assert compiled.format_prompt(**values) == template.format_prompt(**values), name
+
+        per_call_rate = measure(lambda: per_call(messages, values), args.iterations)
+        template_rate = measure(lambda: template.format_prompt(**values), args.iterations)
+        registry_rate = measure(lambda: compile_messages(messages).format_prompt(**values), args.iterations)
+
+        print(
+            f"{name:>27} | {per_call_rate:>10.0f} | {template_rate:>10.0f} | "
+            f"{registry_rate:>10.0f} | {registry_rate / per_call_rate:>10.1f}x"
+        )
@@ -1,12 +1,17 @@
+import os
+import sys
 
-from langchain_core.prompts import ChatPromptTemplate
+# shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.prompt_registry import compile_messages, compile_template
 # PART 1: Create a ChatPromptTemplate using a template string
 
 # Define a text template with a placeholder `{topic}`, this placeholder fiiled later with the actual value when invoked.
 template = "Tell me a joke about {topic}."
 
-# Create a ChatPromptTemplate object from the template string 
-prompt_template = ChatPromptTemplate.from_template(template)
+# Compile the template string once (prompt registry, equivalent to ChatPromptTemplate.from_template);
+# compiling the same text again returns the cached prompt instead of re-parsing it
+prompt_template = compile_template(template)
 
 print("---- Prompt from template ----")
 # Invoke the prompt_template by passing a dictionary 
@@ -15,7 +20,7 @@ print(prompt)
 # PART 2: Prompt with Multiple Placeholders
 
 template = "Tell me {number} jokes about {topic}."
-prompt_template = ChatPromptTemplate.from_template(template)
+prompt_template = compile_template(template)
 
 print("---- Prompt from template ----")
 prompt = prompt_template.invoke({"number": 3, "topic": "cat"})
@@ -28,10 +33,10 @@ messages = [
     ("human", "Tell me {joke_count} jokes."), # Human message gives the user’s instruction
 ]
 
-# Create a ChatPromptTemplate from the list of messages.
-# LangChain will recognize placeholders like {topic} and {joke_count}
-# and let you fill them later using a dictionary.
-prompt_template = ChatPromptTemplate.from_messages(messages)
+# Compile the list of messages (equivalent to ChatPromptTemplate.from_messages).
+# The placeholders like {topic} and {joke_count} are found once here
+# and filled later using a dictionary.
+prompt_template = compile_messages(messages)
 
 print("---- Prompt from template ----")
 prompt = prompt_template.invoke({"topic": "lawyers", "joke_count": 3})
@@ -1,24 +1,27 @@
 
 from dotenv import load_dotenv
 import os
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
+import sys
+
+# shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.prompt_registry import compile_messages, compile_template
+from common.models import get_chat_model
+from common.llm_cache import enable_response_cache, print_response_cache_stats
 load_dotenv()
-api_key = os.getenv("GROQ_API_KEY")
-
-# Use the updated model
-model = ChatGroq(
-    api_key=api_key,
-    model="llama-3.1-8b-instant", 
-    temperature=0.7 # temperature controls the randomness or creativity of the model’s responses
-)
+
+# Use the updated model (llama-3.1-8b-instant, temperature 0.7; shared ChatGroq built by common/models.py)
+model = get_chat_model()
+# responses are cached (memory + SQLite) for temperature-0 models; LLM_CACHE=1 also replays sampled answers
+model = enable_response_cache(model, cacheable=os.getenv("LLM_CACHE") == "1")
 # PART 1: Create a ChatPromptTemplate using a template string
 
 # Define a text template with a placeholder `{topic}`, this placeholder fiiled later with the actual value when invoked.
 template = "Tell me a joke about {topic}."
 
-# Create a ChatPromptTemplate object from the template string 
-prompt_template = ChatPromptTemplate.from_template(template)
+# Compile the template string once (prompt registry, equivalent to ChatPromptTemplate.from_template);
+# compiling the same text again returns the cached prompt instead of re-parsing it
+prompt_template = compile_template(template)
 
 print("---- Prompt from template ----")
 # Invoke the prompt_template by passing a dictionary 
@@ -29,7 +32,7 @@ print(result.content)
 # PART 2: Prompt with Multiple Placeholders
 
 template = "Tell me {number} jokes about {topic}."
-prompt_template = ChatPromptTemplate.from_template(template)
+prompt_template = compile_template(template)
 
 print("---- Prompt from template ----")
 prompt = prompt_template.invoke({"number": 3, "topic": "cat"})
@@ -44,13 +47,16 @@ messages = [
     ("human", "Tell me {joke_count} jokes."), # Human message gives the user’s instruction
 ]
 
-# Create a ChatPromptTemplate from the list of messages.
-# LangChain will recognize placeholders like {topic} and {joke_count}
-# and let you fill them later using a dictionary.
-prompt_template = ChatPromptTemplate.from_messages(messages)
+# Compile the list of messages (equivalent to ChatPromptTemplate.from_messages).
+# The placeholders like {topic} and {joke_count} are found once here
+# and filled later using a dictionary.
+prompt_template = compile_messages(messages)
 
 print("---- Prompt from template ----")
 prompt = prompt_template.invoke({"topic": "lawyers", "joke_count": 3})
 # imvole the model for answer the prompt
 result = model.invoke(prompt)
-print(result.content)
\ No newline at end of file
+print(result.content)
+
+# cache hits/misses and the latency they saved (printed only when the cache is enabled)
+print_response_cache_stats(model)
@@ -0,0 +1,94 @@
+import time
+
+from langchain_core.messages import AIMessage
+
+
+# ---------------------------------------------------------
+# Streaming Console Output
+# ---------------------------------------------------------
+
+def _chunk_text(chunk):
+    # Chains stream message chunks, AsyncContextualRAG streams plain text
+    return chunk if isinstance(chunk, str) else chunk.content
+
+
+class StreamPrinter:
+    """
+    Prints answer tokens as they arrive and measures the turn.
+
+    Create it right before the stream is consumed: the clock starts in
+    the constructor, so time-to-first-token includes every stage that
+    runs before the first token (rewrite, retrieval, prompt building).
+    """
+
+    def __init__(self, prefix="\nAI: "):
+        self.prefix = prefix
+        self.start = time.perf_counter()
+        self.first_token_seconds = None
+        self.parts = []
+
+    def write(self, chunk):
+        text = _chunk_text(chunk)
+        if not text:
+            return
+        if self.first_token_seconds is None:
+            self.first_token_seconds = time.perf_counter() - self.start
+            print(self.prefix, end="", flush=True)
+        self.parts.append(text)
+        print(text, end="", flush=True)
+
+    def finish(self):
+        """
+        Ends the printed line.
+
+        Returns:
+            (AIMessage assembled from the stream, timings dict)
+        """
+        total_seconds = time.perf_counter() - self.start
+        if self.first_token_seconds is None:
+            print(self.prefix, end="")
+        print("\n")
+
+        timings = {
+            "first_token_seconds": self.first_token_seconds,
+            "total_seconds": total_seconds,
+        }
+        return AIMessage(content="".join(self.parts)), timings
+
+
+def print_stream(chunks, prefix="\nAI: "):
+    """
+    Prints a synchronous stream of chunks (e.g. rag_chain.stream(...)).
+
+    Returns:
+        (AIMessage, timings dict)
+    """
+    printer = StreamPrinter(prefix)
+    for chunk in chunks:
+        printer.write(chunk)
+    return printer.finish()
+
+
+async def aprint_stream(chunks, prefix="\nAI: "):
+    """
+    Prints an async stream of chunks (e.g. rag_chain.astream(...)).
+
+    Returns:
+        (AIMessage, timings dict)
+    """
+    printer = StreamPrinter(prefix)
+    async for chunk in chunks:
+        printer.write(chunk)
+    return printer.finish()
+
+
+def print_turn_timings(timings):
+    """
+    Prints time-to-first-token and total time of one turn.
+    """
+    first_token = timings["first_token_seconds"]
+    first_token = "n/a" if first_token is None else f"{first_token * 1000:.0f} ms"
+    print(
+        f"[timing] first token: {first_token}, "
+        f"total: {timings['total_seconds'] * 1000:.0f} ms"
+    )
@@ -0,0 +1,200 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from contextual_prompts import contextualize_prompt, qa_prompt
+from rewrite_cache import CachedQuestionRewriter
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.chat_history import DEFAULT_MAX_HISTORY_TOKENS, TokenBudgetHistory
+
+
+# ---------------------------------------------------------
+# Serving Configuration
+# ---------------------------------------------------------
+
+# Outbound LLM calls (rewrite + answer) allowed in flight at once,
+# across all sessions served by one process
+DEFAULT_MAX_CONCURRENT_LLM_CALLS = 32
+
+# Summary updates running at once, across all sessions (older turns are
+# folded into each session's rolling summary on these threads)
+DEFAULT_SUMMARY_WORKERS = 4
+
+# Marks the end of an answer in the queue between producer and reader
+_END_OF_ANSWER = object()
+
+
+# ---------------------------------------------------------
+# Session Store
+# ---------------------------------------------------------
+
+class SessionStore:
+    """
+    In-memory chat histories, one TokenBudgetHistory per session ID (same
+    token budget and rolling summary as the terminal chat).
+
+    Summary updates of all sessions share one small thread pool. Each
+    session also has a lock: turns of one conversation are answered in
+    order, while different sessions run concurrently. Histories are only
+    touched from the event loop, the pool only runs the summary calls.
+    """
+
+    def __init__(
+        self,
+        summarizer_llm,
+        max_history_tokens=DEFAULT_MAX_HISTORY_TOKENS,
+        summary_workers=DEFAULT_SUMMARY_WORKERS,
+    ):
+        self.summarizer_llm = summarizer_llm
+        self.max_history_tokens = max_history_tokens
+        self._executor = ThreadPoolExecutor(max_workers=summary_workers, thread_name_prefix="session-summary")
+        self._histories = {}
+        self._locks = {}
+
+    def __len__(self):
+        return len(self._histories)
+
+    def history(self, session_id):
+        history = self._histories.get(session_id)
+        if history is None:
+            history = self._histories[session_id] = TokenBudgetHistory(
+                self.summarizer_llm,
+                max_tokens=self.max_history_tokens,
+                executor=self._executor,
+            )
+        return history
+
+    def lock(self, session_id):
+        return self._locks.setdefault(session_id, asyncio.Lock())
+
+    def append_turn(self, session_id, question, answer):
+        """
+        Records one exchange; the history enforces its token budget.
+        """
+        self.history(session_id).add_messages(
+            HumanMessage(content=question),
+            AIMessage(content=answer)
+        )
+
+    def drop(self, session_id):
+        self._histories.pop(session_id, None)
+        self._locks.pop(session_id, None)
+
+    def close(self):
+        """
+        Waits for running summary updates and stops the summary threads.
+        """
+        self._executor.shutdown(wait=True)
+
+
+# ---------------------------------------------------------
+# Async Contextual RAG
+# ---------------------------------------------------------
+
+class AsyncContextualRAG:
+    """
+    asyncio-native version of the contextual RAG chain in
+    rag_with_contectualMemory.py, for serving many sessions per process.
+
+    Every stage awaits instead of blocking: the rewrite uses llm.ainvoke
+    (skipped without history, memoized otherwise), retrieval uses
+    retriever.ainvoke and the answer is produced with llm.astream. Rewrite
+    and answer calls share one semaphore, so at most
+    `max_concurrent_llm_calls` requests are in flight towards the LLM
+    provider no matter how many sessions are active.
+
+    Each answer is produced by its own task and handed to the reader
+    through a queue. Neither the session lock nor an LLM slot is held
+    while the reader is consuming text, so a slow reader or an abandoned
+    stream cannot starve other sessions, and the turn is still recorded.
+    """
+
+    def __init__(
+        self,
+        llm,
+        retriever,
+        max_concurrent_llm_calls=DEFAULT_MAX_CONCURRENT_LLM_CALLS,
+        max_history_tokens=DEFAULT_MAX_HISTORY_TOKENS,
+    ):
+        self.llm = llm
+        self.retriever = retriever
+        self.sessions = SessionStore(llm, max_history_tokens)
+        self.rewriter = CachedQuestionRewriter(arewrite_fn=self._rewrite_question)
+        self._llm_slots = asyncio.Semaphore(max_concurrent_llm_calls)
+        # Running answer tasks (referenced so they are not garbage collected)
+        self._answers = set()
+
+    async def _rewrite_question(self, inputs):
+        prompt = contextualize_prompt.format(
+            input=inputs["input"],
+            chat_history=inputs["chat_history"]
+        )
+        async with self._llm_slots:
+            return (await self.llm.ainvoke(prompt)).content
+
+    async def _answer(self, session_id, question, queue):
+        """
+        Produces one answer into `queue` (text, then _END_OF_ANSWER, or the
+        exception that stopped it) and records the turn in the session.
+        """
+        try:
+            async with self.sessions.lock(session_id):
+                chat_history = self.sessions.history(session_id).messages()
+
+                standalone_question = await self.rewriter.ainvoke(
+                    {"input": question, "chat_history": chat_history}
+                )
+                context = await self.retriever.ainvoke(standalone_question)
+
+                messages = qa_prompt.format_messages(
+                    context=context,
+                    input=question,
+                    chat_history=chat_history
+                )
+
+                parts = []
+                async with self._llm_slots:
+                    async for chunk in self.llm.astream(messages):
+                        if chunk.content:
+                            parts.append(chunk.content)
+                            queue.put_nowait(chunk.content)
+
+                self.sessions.append_turn(session_id, question, "".join(parts))
+        except Exception as error:
+            queue.put_nowait(error)
+        finally:
+            queue.put_nowait(_END_OF_ANSWER)
+
+    async def astream(self, session_id, question):
+        """
+        Answers `question` in the context of a session, yielding answer
+        text as the LLM produces it. The exchange is added to the
+        session history once the answer is complete, even if the reader
+        stops early.
+        """
+        queue = asyncio.Queue()
+        task = asyncio.create_task(self._answer(session_id, question, queue))
+        self._answers.add(task)
+        task.add_done_callback(self._answers.discard)
+
+        while (item := await queue.get()) is not _END_OF_ANSWER:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def close(self):
+        self.sessions.close()
+
+    async def ainvoke(self, session_id, question):
+        """
+        Answers `question` in the context of a session and returns the full answer.
+        """
+        parts = []
+        async for text in self.astream(session_id, question):
+            parts.append(text)
+        return "".join(parts)
@@ -1,16 +1,20 @@
 import os
+import sys
 
-# Splits text into semantically meaningful chunks using a recursive strategy
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-
-# Loads plain text files and wraps them into LangChain Document objects
-from langchain_community.document_loaders import TextLoader
+# Streams text files in bounded blocks and splits them with the same
+# recursive strategy as RecursiveCharacterTextSplitter
+from streaming_ingestion import DEFAULT_UPSERT_BATCH_SIZE, StreamingTextSplitter, batched
 
 # Chroma vector database for embedding storage and similarity search
 from langchain_community.vectorstores import Chroma
 
-# HuggingFace embedding model wrapper
-from langchain_community.embeddings import HuggingFaceEmbeddings
+# Shared embedding model, imported and loaded on first use
+# (helpers live in common/ at the repository root)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.models import get_embeddings
+
+# Disk-backed cache so chunks embedded in earlier runs are not recomputed
+from embedding_cache import CachedEmbeddings
 
 
 # ---------------------------------------------------------
@@ -39,40 +43,42 @@ if not os.path.exists(persistent_directory):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"The file {file_path} does not exist.")
 
-    # Load the text file into LangChain Document objects
-    loader = TextLoader(file_path, encoding="utf-8")
-    documents = loader.load()
+    # Initialize embedding model (wrapped in the shared embedding cache)
+    embeddings = CachedEmbeddings(get_embeddings())
+
+    # Create the Chroma vector store
+    db = Chroma(
+        embedding_function=embeddings,
+        persist_directory=persistent_directory
+    )
 
-    # Split documents into overlapping chunks
-    text_splitter = RecursiveCharacterTextSplitter(
+    # Stream the file in bounded blocks and split it into overlapping chunks
+    # (same chunks as RecursiveCharacterTextSplitter, without loading the file)
+    text_splitter = StreamingTextSplitter(
         chunk_size=1000,
         chunk_overlap=200
     )
-    docs = text_splitter.split_documents(documents)
+    docs = text_splitter.iter_file_documents(file_path, metadata={"source": file_path})
 
-    # Basic sanity check
-    print(f"Number of document chunks: {len(docs)}")
-    print(f"Sample chunk:\n{docs[0].page_content}\n")
+    # Embed and store the chunks batch by batch
+    chunk_count = 0
+    for batch in batched(docs, DEFAULT_UPSERT_BATCH_SIZE):
+        # Attach a unique chunk ID to each document
+        for doc in batch:
+            doc.metadata["chunk_id"] = chunk_count
+            chunk_count += 1
 
-    # Attach a unique chunk ID to each document
-    for i, doc in enumerate(docs):
-        doc.metadata["chunk_id"] = i
+        # Basic sanity check
+        if batch[0].metadata["chunk_id"] == 0:
+            print(f"Sample chunk:\n{batch[0].page_content}\n")
 
-    # Initialize embedding model
-    embeddings = HuggingFaceEmbeddings(
-        model_name="BAAI/bge-small-en-v1.5",
-        encode_kwargs={"normalize_embeddings": True}
-    )
+        db.add_documents(batch)
 
-    # Create and persist the Chroma vector store
-    db = Chroma.from_documents(
-        documents=docs,
-        embedding=embeddings,
-        persist_directory=persistent_directory
-    )
+    print(f"Number of document chunks: {chunk_count}")
 
     db.persist()
     print("Vector store created and persisted successfully.")
+    embeddings.print_stats()
 
 else:
     print("Vector store already exists. Skipping initialization.")
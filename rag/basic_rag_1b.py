@@ -1,6 +1,14 @@
 import os
+import sys
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from numpy_vector_store import load_or_export
+from reranking import DEFAULT_LATENCY_BUDGET_MS, RerankingRetriever
+from retrieval_cache import CachedRetriever, QueryEmbeddingCache, collection_version
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.models import get_cross_encoder, get_embeddings, warm_up
+from common.tracing import trace_config, trace_embeddings
 
 
 # ---------------------------------------------------------
@@ -13,6 +21,20 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 # Location of the persisted Chroma vector database
 persistent_directory = os.path.join(current_dir, "db", "chroma_db")
 
+# In-process copy of the same vectors used with VECTOR_STORE=numpy or
+# VECTOR_STORE=numpy-int8 (exported again whenever Chroma changes)
+numpy_directory = os.path.join(current_dir, "db", "numpy_db")
+
+# Set RERANK=1 to replace the score threshold with a cross-encoder rerank
+# of the top RERANK_CANDIDATES chunks, capped at RERANK_BUDGET_MS of
+# scoring per query. RERANK_MIN_SCORE optionally drops weak chunks; scores
+# are sigmoid-scaled cross-encoder logits in [0, 1] (0.5 = logit 0), not the
+# 0-1 vector relevance of the score threshold.
+RERANK = os.getenv("RERANK", "0") == "1"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "10"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", str(DEFAULT_LATENCY_BUDGET_MS)))
+RERANK_MIN_SCORE = float(os.environ["RERANK_MIN_SCORE"]) if os.getenv("RERANK_MIN_SCORE") else None
+
 
 # ---------------------------------------------------------
 # Safety Check
@@ -29,20 +51,35 @@ if not os.path.exists(persistent_directory):
 # Embedding Model (Must Match Ingestion)
 # ---------------------------------------------------------
 
-embeddings = HuggingFaceEmbeddings(
-    model_name="BAAI/bge-small-en-v1.5",
-    encode_kwargs={"normalize_embeddings": True}
-)
+# The shared bge-small model (common/models.py) loads on a background
+# thread while Chroma is opened below; the first query waits for it.
+warm_up(embeddings=True)
+
+# Wrapped so the retrieval cache and Chroma share one embedding per query
+# (with STAGE_TRACE=<file> the model calls are timed as their own stage)
+embeddings = QueryEmbeddingCache(trace_embeddings(get_embeddings()))
 
 
 # ---------------------------------------------------------
 # Load Existing Vector Store
 # ---------------------------------------------------------
 
-db = Chroma(
-    persist_directory=persistent_directory,
-    embedding_function=embeddings
-)
+# VECTOR_STORE=numpy answers queries with one matrix-vector product over
+# a memory-mapped matrix instead of Chroma's client and HNSW index
+vector_store = os.getenv("VECTOR_STORE", "chroma")
+
+if vector_store in ("numpy", "numpy-int8"):
+    db = load_or_export(
+        os.path.join(numpy_directory, vector_store),
+        persistent_directory,
+        embeddings,
+        quantize=vector_store == "numpy-int8"
+    )
+else:
+    db = Chroma(
+        persist_directory=persistent_directory,
+        embedding_function=embeddings
+    )
 
 
 # ---------------------------------------------------------
@@ -56,7 +93,7 @@ query = "Who is Odysseus' wife?"
 # Retriever Configuration
 # ---------------------------------------------------------
 
-retriever = db.as_retriever(
+threshold_retriever = db.as_retriever(
     search_type="similarity_score_threshold",
     search_kwargs={
         "k": 3,                # Maximum number of results
@@ -64,8 +101,34 @@ retriever = db.as_retriever(
     },
 )
 
+if RERANK:
+    # Candidates without a threshold; the cross-encoder picks the best 3.
+    # Candidates the latency budget leaves unscored must still pass the
+    # threshold retriever.
+    base_retriever = RerankingRetriever(
+        retriever=db.as_retriever(
+            search_type="similarity",
+            search_kwargs={"k": RERANK_CANDIDATES}
+        ),
+        scorer=get_cross_encoder(),
+        k=3,
+        min_score=RERANK_MIN_SCORE,
+        latency_budget_ms=RERANK_BUDGET_MS,
+        fallback_retriever=threshold_retriever
+    )
+else:
+    base_retriever = threshold_retriever
+
+# Repeated or near-duplicate queries are answered from the cache;
+# it is dropped when the collection size changes (re-ingestion).
+retriever = CachedRetriever(
+    retriever=base_retriever,
+    embeddings=embeddings,
+    version_fn=lambda: collection_version(db)
+)
+
 # Execute similarity search
-relevant_docs = retriever.invoke(query)
+relevant_docs = retriever.invoke(query, config=trace_config())
 
 
 # ---------------------------------------------------------
@@ -83,3 +146,6 @@ else:
         # Print metadata if available
         if doc.metadata:
             print(f"Source: {doc.metadata.get('source', 'Unknown')}\n")
+
+if RERANK:
+    base_retriever.print_stats()
@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.fake_chat_model import FakeLatencyChatModel
+
+from async_rag_chat import DEFAULT_MAX_CONCURRENT_LLM_CALLS, AsyncContextualRAG
+
+
+# ---------------------------------------------------------
+# Benchmark Configuration
+# ---------------------------------------------------------
+
+# Canned answer streamed by the fake chat model
+FAKE_ANSWER = (
+    "Juliet stabbed herself with Romeo's dagger after waking in the tomb "
+    "and finding him dead beside her."
+)
+
+# Follow-up questions asked by every simulated session, in order
+QUESTIONS = [
+    "How did Juliet die?",
+    "Why was she in the tomb?",
+    "Who gave her the potion?",
+    "What happened to Romeo?",
+]
+
+
+# ---------------------------------------------------------
+# Local Fakes (no network, no vector store)
+# ---------------------------------------------------------
+
+class FakeLatencyRetriever(BaseRetriever):
+    """
+    Retriever that waits `latency_seconds` and returns a fixed chunk.
+    """
+
+    latency_seconds: float = 0.01
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        time.sleep(self.latency_seconds)
+        return [Document(page_content=FAKE_ANSWER, metadata={"source": "romeo_and_juliet.txt"})]
+
+    async def _aget_relevant_documents(self, query, *, run_manager):
+        await asyncio.sleep(self.latency_seconds)
+        return [Document(page_content=FAKE_ANSWER, metadata={"source": "romeo_and_juliet.txt"})]
+
+
+# ---------------------------------------------------------
+# Load Generator
+# ---------------------------------------------------------
+
+async def run_session(rag, session_id, turns, latencies):
+    for question in QUESTIONS[:turns]:
+        start = time.perf_counter()
+        await rag.ainvoke(session_id, question)
+        latencies.append(time.perf_counter() - start)
+    rag.sessions.drop(session_id)
+
+
+async def run_benchmark(sessions, turns, max_concurrent_llm_calls, llm_latency, retrieval_latency):
+    """
+    Runs `sessions` concurrent conversations of `turns` questions each.
+
+    Returns:
+        (sessions per second, list of per-turn latencies in seconds)
+    """
+    rag = AsyncContextualRAG(
+        FakeLatencyChatModel(response=FAKE_ANSWER, first_token_seconds=llm_latency),
+        FakeLatencyRetriever(latency_seconds=retrieval_latency),
+        max_concurrent_llm_calls=max_concurrent_llm_calls
+    )
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_session(rag, f"session-{i}", turns, latencies)
+        for i in range(sessions)
+    ))
+    elapsed = time.perf_counter() - start
+
+    return sessions / elapsed, latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure sessions/sec of the async contextual RAG chat against a fake chat model."
+    )
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--turns", type=int, default=len(QUESTIONS), choices=range(1, len(QUESTIONS) + 1))
+    parser.add_argument("--max-llm-calls", type=int, default=DEFAULT_MAX_CONCURRENT_LLM_CALLS)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake time to first token (s)")
+    parser.add_argument("--retrieval-latency", type=float, default=0.01, help="Fake retrieval time (s)")
+    args = parser.parse_args()
+
+    print(
+        f"Turns per session: {args.turns}, LLM call limit: {args.max_llm_calls}, "
+        f"LLM latency: {args.llm_latency}s, retrieval latency: {args.retrieval_latency}s\n"
+    )
+
+    print(f"{'sessions':>8} | {'sessions/sec':>12} | {'p50 turn':>9} | {'p95 turn':>9}")
+    for sessions in args.sessions:
+        throughput, latencies = asyncio.run(run_benchmark(
+            sessions,
+            args.turns,
+            args.max_llm_calls,
+            args.llm_latency,
+            args.retrieval_latency
+        ))
+        p50 = statistics.median(latencies)
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else p50
+        print(f"{sessions:>8} | {throughput:>12.1f} | {p50 * 1000:>7.0f}ms | {p95 * 1000:>7.0f}ms")
@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+from mmr import MMRRetriever, mmr_select
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# ---------------------------------------------------------
+# Benchmark Configuration
+# ---------------------------------------------------------
+
+DEFAULT_FETCH_KS = [10, 20, 50, 100, 200, 500]
+DEFAULT_K = 3
+DEFAULT_LAMBDA = 0.5
+
+# Synthetic mode: corpus size and dimension of bge-small
+SYNTHETIC_CHUNKS = 5000
+SYNTHETIC_DIM = 384
+
+
+def _median_ms(fn, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1000
+
+
+# ---------------------------------------------------------
+# Re-Ranking Only (same candidates for both implementations)
+# ---------------------------------------------------------
+
+def benchmark_selection(query_vectors, corpus, fetch_ks, k, repeats):
+    """
+    Times langchain_core's maximal_marginal_relevance against mmr_select
+    on the fetch_k nearest corpus vectors of each query, and checks that
+    both pick the same chunks.
+
+    Returns:
+        {fetch_k: {"langchain_ms", "vectorized_ms", "agreement"}}
+    """
+    results = {}
+    for fetch_k in fetch_ks:
+        langchain_ms, vectorized_ms, agreement = [], [], []
+        for query in query_vectors:
+            top = np.argsort(-(corpus @ query))[:fetch_k]
+            candidates = corpus[top]
+            candidate_list = candidates.tolist()
+
+            expected = maximal_marginal_relevance(query, candidate_list, lambda_mult=DEFAULT_LAMBDA, k=k)
+            agreement.append(expected == mmr_select(query, candidates, k, DEFAULT_LAMBDA))
+
+            langchain_ms.append(_median_ms(
+                lambda: maximal_marginal_relevance(query, candidate_list, lambda_mult=DEFAULT_LAMBDA, k=k), repeats
+            ))
+            vectorized_ms.append(_median_ms(lambda: mmr_select(query, candidates, k, DEFAULT_LAMBDA), repeats))
+
+        results[fetch_k] = {
+            "langchain_ms": statistics.median(langchain_ms),
+            "vectorized_ms": statistics.median(vectorized_ms),
+            "agreement": sum(agreement) / len(agreement),
+        }
+    return results
+
+
+# ---------------------------------------------------------
+# End to End (Chroma store of rag_with_metadata.py)
+# ---------------------------------------------------------
+
+def benchmark_retrievers(db, query_vectors, fetch_ks, k, repeats):
+    """
+    Times Chroma's own MMR search against MMRRetriever, from query vector
+    to documents. MMRRetriever is measured once with an empty vector
+    cache (first pass) and then warm.
+
+    Returns:
+        {fetch_k: {"chroma_ms", "cold_ms", "warm_ms"}}
+    """
+    results = {}
+    for fetch_k in fetch_ks:
+        chroma_ms, cold_ms, warm_ms = [], [], []
+        retriever = MMRRetriever(vectorstore=db, k=k, fetch_k=fetch_k, lambda_mult=DEFAULT_LAMBDA)
+        for query in query_vectors:
+            query_list = query.tolist()
+            chroma_ms.append(_median_ms(
+                lambda: db.max_marginal_relevance_search_by_vector(
+                    query_list, k=k, fetch_k=fetch_k, lambda_mult=DEFAULT_LAMBDA
+                ), repeats
+            ))
+            cold_ms.append(_median_ms(lambda: retriever.search_by_vector(query), 1))
+            warm_ms.append(_median_ms(lambda: retriever.search_by_vector(query), repeats))
+
+        results[fetch_k] = {
+            "chroma_ms": statistics.median(chroma_ms),
+            "cold_ms": statistics.median(cold_ms),
+            "warm_ms": statistics.median(warm_ms),
+        }
+    return results
+
+
+def _normalized(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure MMR latency as fetch_k grows: langchain's loop vs the vectorized re-ranking."
+    )
+    parser.add_argument("--fetch-k", type=int, nargs="*", default=DEFAULT_FETCH_KS)
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per query, the median is kept")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="random unit vectors instead of the Chroma store (no model or DB needed)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    db = None
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        corpus = _normalized(rng.standard_normal((SYNTHETIC_CHUNKS, SYNTHETIC_DIM)))
+        query_vectors = _normalized(rng.standard_normal((20, SYNTHETIC_DIM)))
+        source = f"synthetic ({SYNTHETIC_CHUNKS} x {SYNTHETIC_DIM})"
+    else:
+        # Imported here so --synthetic runs without Chroma or the model
+        from benchmark_retrieval import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, load_questions, open_store
+        from common.models import get_embeddings
+
+        embeddings = get_embeddings()
+        db, source = open_store(embeddings, DEFAULT_CHUNK_SIZE, DEFAULT_CHUNK_OVERLAP)
+        corpus = _normalized(db.get(include=["embeddings"])["embeddings"])
+        query_vectors = _normalized([embeddings.embed_query(item["question"]) for item in load_questions()])
+
+    fetch_ks = [fetch_k for fetch_k in args.fetch_k if fetch_k <= len(corpus)]
+    print(f"\nCandidates from: {source}, queries: {len(query_vectors)}, k: {args.k}")
+
+    selection = benchmark_selection(query_vectors, corpus, fetch_ks, args.k, args.repeats)
+    print(f"\nRe-ranking only (median per query)\n{'fetch_k':>7} | {'langchain ms':>12} | {'vectorized ms':>13} | {'speedup':>7} | {'same picks':>10}")
+    for fetch_k, result in selection.items():
+        print(
+            f"{fetch_k:>7} | {result['langchain_ms']:>12.3f} | {result['vectorized_ms']:>13.3f} | "
+            f"{result['langchain_ms'] / result['vectorized_ms']:>6.1f}x | {result['agreement']:>10.0%}"
+        )
+
+    end_to_end = {}
+    if db is not None:
+        end_to_end = benchmark_retrievers(db, query_vectors, fetch_ks, args.k, args.repeats)
+        print(f"\nEnd to end, query vector -> documents\n{'fetch_k':>7} | {'Chroma mmr ms':>13} | {'MMRRetriever cold ms':>20} | {'warm ms':>7}")
+        for fetch_k, result in end_to_end.items():
+            print(f"{fetch_k:>7} | {result['chroma_ms']:>13.2f} | {result['cold_ms']:>20.2f} | {result['warm_ms']:>7.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "source": source,
+                "k": args.k,
+                "selection": selection,
+                "end_to_end": end_to_end,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
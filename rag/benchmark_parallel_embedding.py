@@ -0,0 +1,87 @@
+import argparse
+import os
+import time
+from functools import partial
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from parallel_embedding import DEFAULT_BATCH_SIZE, EmbeddingPool
+from streaming_ingestion import StreamingTextSplitter, batched
+
+
+# ---------------------------------------------------------
+# Benchmark Configuration
+# ---------------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BOOKS_DIR = os.path.join(BASE_DIR, "books")
+
+EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+ENCODE_KWARGS = {"normalize_embeddings": True}
+
+
+def load_book_chunks(limit=None):
+    """
+    Splits every bundled book with the same settings as the ingestion scripts.
+    """
+    text_splitter = StreamingTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200
+    )
+
+    texts = []
+    for book_file in sorted(os.listdir(BOOKS_DIR)):
+        if book_file.endswith(".txt"):
+            chunks = text_splitter.iter_file_documents(os.path.join(BOOKS_DIR, book_file))
+            texts.extend(chunk.page_content for chunk in chunks)
+
+    return texts[:limit] if limit else texts
+
+
+def run_benchmark(texts, workers, batch_size):
+    """
+    Embeds all texts with the given worker count.
+
+    Returns:
+        Throughput in chunks per second (worker start-up and model load included)
+    """
+    embeddings_factory = partial(
+        HuggingFaceEmbeddings,
+        model_name=EMBEDDING_MODEL,
+        encode_kwargs=ENCODE_KWARGS
+    )
+
+    start = time.perf_counter()
+    embedded = 0
+    with EmbeddingPool(embeddings_factory, workers) as pool:
+        for _, vectors in pool.map_batches((None, batch) for batch in batched(texts, batch_size)):
+            embedded += len(vectors)
+    elapsed = time.perf_counter() - start
+
+    return embedded / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure embedding throughput (chunks/sec) for different worker counts."
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--limit", type=int, default=None, help="Only embed the first N chunks")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="Worker counts to compare (default: 1 2 4 and the CPU count)"
+    )
+    args = parser.parse_args()
+
+    texts = load_book_chunks(args.limit)
+    print(f"Chunks to embed: {len(texts)} (batch size {args.batch_size})\n")
+
+    print(f"{'workers':>8} | {'chunks/sec':>10} | {'speedup':>7}")
+    baseline = None
+    for workers in args.workers:
+        throughput = run_benchmark(texts, workers, args.batch_size)
+        baseline = baseline or throughput
+        print(f"{workers:>8} | {throughput:>10.1f} | {throughput / baseline:>6.2f}x")
@@ -0,0 +1,344 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from functools import partial
+
+# Fully offline: the embedding model is loaded from the local HuggingFace
+# cache (it is downloaded by the first ingestion run) and Chroma does not
+# send telemetry
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+import numpy as np
+from langchain_community.vectorstores import Chroma
+
+from embedding_cache import CachedEmbeddings
+from hybrid_retrieval import BM25_INDEX_DIR, BM25Index, HybridRetriever, fetch_chroma_documents, sync_bm25_index
+from incremental_ingestion import incremental_ingest, print_ingestion_report
+from reranking import RerankingRetriever
+from retrieval_cache import DEFAULT_DISTANCE_TOLERANCE, QueryEmbeddingCache, query_terms
+from streaming_ingestion import StreamingTextSplitter
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.models import get_cross_encoder, get_embeddings
+
+
+# ---------------------------------------------------------
+# Benchmark Configuration
+# ---------------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BOOKS_DIR = os.path.join(BASE_DIR, "books")
+DB_DIR = os.path.join(BASE_DIR, "db")
+
+# Labelled questions: {"question", "source" (book file), "evidence" (passages)}
+QUESTIONS_PATH = os.path.join(BASE_DIR, "retrieval_questions.jsonl")
+
+# Store built by rag_with_metadata.py (all books, 1000 / 200 chunks)
+DEFAULT_STORE = os.path.join(DB_DIR, "chroma_db_with_metadata")
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHUNK_OVERLAP = 200
+
+
+def _as_retriever(search_type, **search_kwargs):
+    return lambda db: db.as_retriever(search_type=search_type, search_kwargs=search_kwargs)
+
+
+def _hybrid(k):
+    """
+    Vector top-k fused with BM25 keyword hits; the keyword index is kept
+    next to the store's ingestion manifest (built when missing or stale).
+    """
+    def factory(db):
+        index_dir = os.path.join(db._persist_directory, BM25_INDEX_DIR)
+        sync_bm25_index(db, os.path.join(db._persist_directory, "ingest_manifest.json"), index_dir)
+        return HybridRetriever(
+            vector_retriever=db.as_retriever(search_type="similarity", search_kwargs={"k": k}),
+            keyword_index=BM25Index.load(index_dir),
+            documents_fn=partial(fetch_chroma_documents, db),
+            k=k,
+        )
+    return factory
+
+
+def _reranked(k, candidates):
+    """
+    Similarity top `candidates` reranked by the cross-encoder. Scores are
+    not cached, so every timed pass pays for the full rerank.
+    """
+    def factory(db):
+        return RerankingRetriever(
+            retriever=db.as_retriever(search_type="similarity", search_kwargs={"k": candidates}),
+            scorer=get_cross_encoder(),
+            k=k,
+            max_cached_scores=0,
+        )
+    return factory
+
+
+# Retriever configurations: name -> (k, factory(db) -> retriever).
+# The first three are the settings of the RAG scripts.
+RETRIEVER_CONFIGS = {
+    "basic_rag_1b": (3, _as_retriever("similarity_score_threshold", k=3, score_threshold=0.4)),
+    "rag_with_metadata": (3, _as_retriever("similarity_score_threshold", k=3, score_threshold=0.5)),
+    "contextual_mmr": (3, _as_retriever("mmr", k=3, fetch_k=10)),
+    "similarity_k3": (3, _as_retriever("similarity", k=3)),
+    "similarity_k5": (5, _as_retriever("similarity", k=5)),
+    "mmr_k5_fetch20": (5, _as_retriever("mmr", k=5, fetch_k=20)),
+    "hybrid_k3": (3, _hybrid(3)),
+    "hybrid_k5": (5, _hybrid(5)),
+    "rerank_k3_from10": (3, _reranked(3, 10)),
+}
+
+
+# ---------------------------------------------------------
+# Question Set
+# ---------------------------------------------------------
+
+def _collapse(text):
+    return " ".join(text.split()).lower()
+
+
+def load_questions(path=QUESTIONS_PATH, books_dir=BOOKS_DIR):
+    """
+    Loads the labelled questions and checks that every evidence passage
+    occurs exactly once in its book (after collapsing whitespace and case,
+    as is_relevant compares). A missing passage would make a label
+    impossible after a book edit; a repeated one would count chunks from
+    unrelated scenes as relevant.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+
+    books = {}
+    for item in questions:
+        if item["source"] not in books:
+            with open(os.path.join(books_dir, item["source"]), "r", encoding="utf-8") as f:
+                books[item["source"]] = _collapse(f.read())
+        for evidence in item["evidence"]:
+            occurrences = books[item["source"]].count(_collapse(evidence))
+            if occurrences != 1:
+                raise ValueError(
+                    f"Evidence {evidence!r} occurs {occurrences} times in {item['source']}, expected exactly once."
+                )
+    return questions
+
+
+def is_relevant(doc, item):
+    """
+    A chunk answers a question when it comes from the labelled book and
+    contains one of its evidence passages (whitespace-insensitive).
+    Labels therefore survive re-chunking with another chunk size.
+    """
+    if doc.metadata.get("source") != item["source"]:
+        return False
+    text = _collapse(doc.page_content)
+    return any(_collapse(evidence) in text for evidence in item["evidence"])
+
+
+# ---------------------------------------------------------
+# Vector Store
+# ---------------------------------------------------------
+
+def open_store(query_embeddings, chunk_size, chunk_overlap):
+    """
+    Opens the Chroma store to benchmark.
+
+    The default chunking uses the store of rag_with_metadata.py as is.
+    Any other chunking gets its own store under db/, synced with the
+    books (chunk vectors come from the shared on-disk embedding cache
+    whenever the same text was embedded before).
+    """
+    if (chunk_size, chunk_overlap) == (DEFAULT_CHUNK_SIZE, DEFAULT_CHUNK_OVERLAP):
+        if not os.path.exists(DEFAULT_STORE):
+            raise FileNotFoundError(
+                "Chroma DB not found. Please run rag_with_metadata.py first."
+            )
+        return Chroma(persist_directory=DEFAULT_STORE, embedding_function=query_embeddings), DEFAULT_STORE
+
+    persist_directory = os.path.join(DB_DIR, f"benchmark_chunks_{chunk_size}_{chunk_overlap}")
+    db = Chroma(persist_directory=persist_directory, embedding_function=query_embeddings)
+    stats = incremental_ingest(
+        db=db,
+        books_dir=BOOKS_DIR,
+        manifest_path=os.path.join(persist_directory, "ingest_manifest.json"),
+        text_splitter=StreamingTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap),
+    )
+    print_ingestion_report(stats)
+    return db, persist_directory
+
+
+# ---------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------
+
+def evaluate(retriever, k, questions, repeats):
+    """
+    Runs every question through `retriever`.
+
+    One untimed pass collects the rankings (and embeds each question once
+    into the shared query cache); then `repeats` timed passes measure the
+    search itself.
+
+    Returns:
+        Dict with queries/sec, p50/p95 latency, recall@k, MRR, mean
+        number of returned chunks and the questions without a hit
+    """
+    reciprocal_ranks = []
+    returned = []
+    misses = []
+    for item in questions:
+        docs = retriever.invoke(item["question"])
+        returned.append(len(docs))
+        rank = next((i for i, doc in enumerate(docs[:k], start=1) if is_relevant(doc, item)), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        if rank is None:
+            misses.append(item["question"])
+
+    latencies = []
+    for _ in range(repeats):
+        for item in questions:
+            start = time.perf_counter()
+            retriever.invoke(item["question"])
+            latencies.append(time.perf_counter() - start)
+
+    return {
+        "k": k,
+        "queries_per_second": len(latencies) / sum(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": (statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]) * 1000,
+        "recall_at_k": sum(1 for rr in reciprocal_ranks if rr) / len(questions),
+        "mrr": sum(reciprocal_ranks) / len(questions),
+        "mean_returned": sum(returned) / len(returned),
+        "misses": misses,
+    }
+
+
+def measure_query_embedding(embeddings, questions):
+    """
+    Mean time to embed one question (done once per question per run; the
+    timed retrieval passes reuse the cached vectors).
+    """
+    embeddings.embed_query("warm-up")
+    start = time.perf_counter()
+    for item in questions:
+        embeddings.embed_query(item["question"])
+    return (time.perf_counter() - start) / len(questions) * 1000
+
+
+def check_cache_tolerance(embeddings, questions, tolerance=DEFAULT_DISTANCE_TOLERANCE):
+    """
+    Near-duplicate check for the semantic tier of CachedRetriever. Every
+    labelled question asks for something else, so any pair within
+    `tolerance` cosine distance would share cached results unless their
+    content terms differ.
+
+    Returns:
+        Dict with the smallest pairwise distance, the pairs within the
+        tolerance and those the term check would still let through
+    """
+    texts = [item["question"] for item in questions]
+    vectors = np.asarray([embeddings.embed_query(text) for text in texts], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    distances = 1.0 - vectors @ vectors.T
+
+    close, shared = [], []
+    for i in range(len(texts)):
+        for j in range(i + 1, len(texts)):
+            if distances[i, j] <= tolerance:
+                pair = (texts[i], texts[j], float(distances[i, j]))
+                close.append(pair)
+                if query_terms(texts[i]) == query_terms(texts[j]):
+                    shared.append(pair)
+
+    upper = distances[np.triu_indices(len(texts), k=1)]
+    return {
+        "tolerance": tolerance,
+        "min_distance": float(upper.min()) if len(upper) else None,
+        "within_tolerance": close,
+        "shared_results": shared,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure retrieval speed and quality on the bundled books for several retriever configurations."
+    )
+    parser.add_argument("--configs", nargs="*", choices=sorted(RETRIEVER_CONFIGS), help="subset of the named configurations")
+    parser.add_argument("--search-type", choices=["similarity", "similarity_score_threshold", "mmr"],
+                        help="also benchmark a custom configuration with these settings")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--score-threshold", type=float, default=0.4)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=DEFAULT_CHUNK_OVERLAP)
+    parser.add_argument("--repeats", type=int, default=5, help="timed passes over the question set")
+    parser.add_argument("--show-misses", action="store_true", help="list the questions without a relevant chunk")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    configs = {name: RETRIEVER_CONFIGS[name] for name in (args.configs or RETRIEVER_CONFIGS)}
+    if args.search_type:
+        search_kwargs = {"k": args.k}
+        if args.search_type == "mmr":
+            search_kwargs["fetch_k"] = args.fetch_k
+        if args.search_type == "similarity_score_threshold":
+            search_kwargs["score_threshold"] = args.score_threshold
+        configs["custom"] = (args.k, _as_retriever(args.search_type, **search_kwargs))
+
+    questions = load_questions()
+    embeddings = CachedEmbeddings(get_embeddings())
+    query_embeddings = QueryEmbeddingCache(embeddings)
+
+    db, store = open_store(query_embeddings, args.chunk_size, args.chunk_overlap)
+    embed_ms = measure_query_embedding(query_embeddings, questions)
+
+    tolerance = check_cache_tolerance(query_embeddings, questions)
+
+    print(f"\nStore: {store} ({db._collection.count()} chunks)")
+    print(f"Questions: {len(questions)}, timed passes: {args.repeats}, query embedding: {embed_ms:.1f} ms (excluded below)")
+    print(
+        f"Cache tolerance {tolerance['tolerance']}: closest question pair at {tolerance['min_distance']:.3f}, "
+        f"{len(tolerance['within_tolerance'])} pairs within it, "
+        f"{len(tolerance['shared_results'])} would share results"
+    )
+    for first, second, distance in tolerance["shared_results"]:
+        print(f"  ! {distance:.3f}: {first!r} / {second!r}")
+    print()
+    print(f"{'config':>18} | {'k':>2} | {'queries/s':>9} | {'p50 ms':>7} | {'p95 ms':>7} | {'recall@k':>8} | {'MRR':>5} | {'returned':>8}")
+
+    results = {}
+    for name, (k, factory) in configs.items():
+        result = evaluate(factory(db), k, questions, args.repeats)
+        results[name] = result
+        print(
+            f"{name:>18} | {k:>2} | {result['queries_per_second']:>9.1f} | {result['p50_ms']:>7.2f} | "
+            f"{result['p95_ms']:>7.2f} | {result['recall_at_k']:>8.2f} | {result['mrr']:>5.2f} | "
+            f"{result['mean_returned']:>8.1f}"
+        )
+
+    if args.show_misses:
+        for name, result in results.items():
+            print(f"\nMissed by {name}:")
+            for question in result["misses"]:
+                print(f"  - {question}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "store": store,
+                "chunk_size": args.chunk_size,
+                "chunk_overlap": args.chunk_overlap,
+                "questions": len(questions),
+                "query_embedding_ms": embed_ms,
+                "cache_tolerance": tolerance,
+                "results": results,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
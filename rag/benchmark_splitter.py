@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import time
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from fast_splitter import FastRecursiveCharacterTextSplitter
+from streaming_ingestion import StreamingTextSplitter, iter_file_blocks
+
+
+# ---------------------------------------------------------
+# Benchmark Configuration
+# ---------------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BOOKS_DIR = os.path.join(BASE_DIR, "books")
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+
+def load_books():
+    """
+    Reads every bundled book the same way TextLoader does.
+    """
+    books = {}
+    for book_file in sorted(os.listdir(BOOKS_DIR)):
+        if book_file.endswith(".txt"):
+            with open(os.path.join(BOOKS_DIR, book_file), encoding="utf-8") as f:
+                books[book_file] = f.read()
+    return books
+
+
+def best_time(split, texts, repeats):
+    """
+    Returns the fastest of `repeats` runs splitting all texts.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for text in texts:
+            split(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check that the fast splitters match RecursiveCharacterTextSplitter "
+                    "on the bundled books and compare their throughput."
+    )
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    books = load_books()
+
+    reference = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    fast = FastRecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    streaming = StreamingTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    # ---------------------------------------------------------
+    # Identity Check (byte-for-byte, per book)
+    # ---------------------------------------------------------
+
+    print("--- Identity check ---")
+    mismatches = 0
+    for book_file, text in books.items():
+        expected = reference.split_text(text)
+        candidates = {
+            "fast": fast.split_text(text),
+            "streaming": list(streaming.split_blocks(iter_file_blocks(os.path.join(BOOKS_DIR, book_file)))),
+        }
+        for name, chunks in candidates.items():
+            if chunks != expected:
+                mismatches += 1
+                print(f"MISMATCH {name:>9} {book_file}: {len(chunks)} chunks vs {len(expected)}")
+        print(f"{book_file}: {len(expected)} chunks")
+
+    if mismatches:
+        sys.exit(1)
+    print("All splitters produce identical chunks.\n")
+
+    # ---------------------------------------------------------
+    # Throughput
+    # ---------------------------------------------------------
+
+    texts = list(books.values())
+    megabytes = sum(len(text.encode("utf-8")) for text in texts) / 1e6
+
+    def split_streaming(text):
+        # Feed the in-memory text in 64K blocks to isolate splitting cost
+        blocks = (text[i:i + 65536] for i in range(0, len(text), 65536))
+        for _ in streaming.split_blocks(blocks):
+            pass
+
+    baseline = best_time(reference.split_text, texts, args.repeats)
+
+    print(f"--- Throughput ({megabytes:.1f} MB, best of {args.repeats}) ---")
+    print(f"{'splitter':>14} | {'ms':>8} | {'MB/s':>7} | {'speedup':>7}")
+    for name, split in [
+        ("recursive", reference.split_text),
+        ("fast", fast.split_text),
+        ("streaming", split_streaming),
+    ]:
+        elapsed = baseline if name == "recursive" else best_time(split, texts, args.repeats)
+        print(f"{name:>14} | {elapsed * 1000:>8.2f} | {megabytes / elapsed:>7.1f} | {baseline / elapsed:>6.2f}x")
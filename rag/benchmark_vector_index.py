@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmark_retrieval import (
+    DEFAULT_CHUNK_OVERLAP,
+    DEFAULT_CHUNK_SIZE,
+    RETRIEVER_CONFIGS,
+    evaluate,
+    load_questions,
+    measure_query_embedding,
+    open_store,
+)
+from embedding_cache import CachedEmbeddings
+from numpy_vector_store import NumpyVectorStore
+from retrieval_cache import QueryEmbeddingCache
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.models import get_embeddings
+
+
+# Hybrid configurations read the Chroma store's BM25 index, which the
+# NumPy stores do not have
+VECTOR_CONFIGS = [name for name in RETRIEVER_CONFIGS if not name.startswith("hybrid")]
+
+
+# ---------------------------------------------------------
+# Vector Store Variants
+# ---------------------------------------------------------
+
+def export_numpy_stores(db, query_embeddings, directory):
+    """
+    Copies the Chroma collection into a float32 and an int8 NumPy store,
+    saves both and reopens them memory-mapped, as basic_rag_1b.py does.
+
+    Returns:
+        {store name: (store, seconds to open)}
+    """
+    stores = {}
+    for name, quantize in (("numpy-f32", False), ("numpy-int8", True)):
+        path = os.path.join(directory, name)
+        NumpyVectorStore.from_chroma(db, query_embeddings, quantize=quantize).save(path)
+        start = time.perf_counter()
+        stores[name] = (NumpyVectorStore.load(path, query_embeddings), time.perf_counter() - start)
+    return stores
+
+
+def ranking_overlap(reference, candidate, questions, k):
+    """
+    Mean share of the reference top-k chunk texts that the candidate
+    store also returns (1.0 = identical result sets).
+    """
+    overlaps = []
+    for item in questions:
+        expected = {doc.page_content for doc in reference.similarity_search(item["question"], k=k)}
+        found = {doc.page_content for doc in candidate.similarity_search(item["question"], k=k)}
+        overlaps.append(len(expected & found) / len(expected) if expected else 1.0)
+    return sum(overlaps) / len(overlaps)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare Chroma with the in-process NumPy vector store (float32 and int8) on the bundled books."
+    )
+    parser.add_argument("--configs", nargs="*", choices=sorted(VECTOR_CONFIGS), help="subset of the named configurations")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=DEFAULT_CHUNK_OVERLAP)
+    parser.add_argument("--repeats", type=int, default=5, help="timed passes over the question set")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    configs = {name: RETRIEVER_CONFIGS[name] for name in (args.configs or VECTOR_CONFIGS)}
+    questions = load_questions()
+    embeddings = CachedEmbeddings(get_embeddings())
+    query_embeddings = QueryEmbeddingCache(embeddings)
+
+    start = time.perf_counter()
+    db, store = open_store(query_embeddings, args.chunk_size, args.chunk_overlap)
+    stores = {"chroma": (db, time.perf_counter() - start)}
+    embed_ms = measure_query_embedding(query_embeddings, questions)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stores.update(export_numpy_stores(db, query_embeddings, tmp))
+
+        print(f"\nStore: {store} ({len(stores['numpy-f32'][0])} chunks)")
+        print(f"Questions: {len(questions)}, timed passes: {args.repeats}, query embedding: {embed_ms:.1f} ms (excluded below)\n")
+        for name, (vector_store, open_seconds) in stores.items():
+            overlap = ranking_overlap(db, vector_store, questions, k=5) if name != "chroma" else 1.0
+            print(f"{name:>10}: opened in {open_seconds * 1000:.1f} ms, top-5 overlap with Chroma {overlap:.2f}")
+
+        print(f"\n{'config':>18} | {'store':>10} | {'queries/s':>9} | {'p50 ms':>7} | {'p95 ms':>7} | {'recall@k':>8} | {'MRR':>5} | {'speedup':>7}")
+
+        results = {}
+        for name, (k, factory) in configs.items():
+            results[name] = {}
+            for store_name, (vector_store, _) in stores.items():
+                result = evaluate(factory(vector_store), k, questions, args.repeats)
+                results[name][store_name] = result
+                speedup = result["queries_per_second"] / results[name]["chroma"]["queries_per_second"]
+                print(
+                    f"{name:>18} | {store_name:>10} | {result['queries_per_second']:>9.1f} | "
+                    f"{result['p50_ms']:>7.2f} | {result['p95_ms']:>7.2f} | {result['recall_at_k']:>8.2f} | "
+                    f"{result['mrr']:>5.2f} | {speedup:>6.1f}x"
+                )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "store": store,
+                "chunk_size": args.chunk_size,
+                "chunk_overlap": args.chunk_overlap,
+                "questions": len(questions),
+                "query_embedding_ms": embed_ms,
+                "open_ms": {name: seconds * 1000 for name, (_, seconds) in stores.items()},
+                "results": results,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
@@ -0,0 +1,44 @@
+# Prompt templates and placeholders
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+
+# =========================================================
+# QUESTION CONTEXTUALIZATION (HISTORY AWARENESS)
+# =========================================================
+
+# Prompt that instructs the LLM to rewrite a follow-up question
+# into a standalone query using the conversation history.
+contextualize_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "Given a chat history and the latest user question, "
+            "rewrite the question into a standalone question that "
+            "can be understood without the chat history. "
+            "Do NOT answer the question."
+        ),
+        MessagesPlaceholder("chat_history"),
+        ("human", "{input}")
+    ]
+)
+
+
+# =========================================================
+# QUESTION ANSWERING PROMPT
+# =========================================================
+
+# Prompt instructing the LLM to answer strictly using retrieved context.
+# This reduces hallucination and enforces grounded answers.
+qa_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You are a question-answering assistant. "
+            "Use ONLY the retrieved context to answer the question. "
+            "If the answer is not present, say you do not know. "
+            "Use a maximum of three sentences.\n\n{context}"
+        ),
+        MessagesPlaceholder("chat_history"),
+        ("human", "{input}")
+    ]
+)
@@ -0,0 +1,295 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+# ---------------------------------------------------------
+# Cache Configuration
+# ---------------------------------------------------------
+
+# Shared by every ingestion script, so vectors computed for one DB
+# directory are reused when building another one.
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "db", "embedding_cache"
+)
+
+# Number of vectors kept in the in-memory LRU front
+DEFAULT_MAX_MEMORY_ITEMS = 10_000
+
+VECTORS_FILE = "vectors.f32"
+KEYS_FILE = "keys.txt"
+META_FILE = "meta.json"
+
+
+def text_sha256(text):
+    """
+    Returns the hex SHA-256 digest of a chunk's text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------
+# On-Disk Vector Store (float32, memory-mapped)
+# ---------------------------------------------------------
+
+class EmbeddingDiskStore:
+    """
+    Append-only store of float32 vectors for one (model, normalize) pair.
+
+    Layout of the store directory:
+        vectors.f32 -> raw float32 rows, one row per cached text
+        keys.txt    -> one text hash per line, line N describes row N
+        meta.json   -> model name, normalize flag and vector dimension
+
+    Vectors are read back through a read-only memory map, so opening a
+    large cache costs almost nothing until rows are actually used.
+    Only one process should write to a store at a time.
+    """
+
+    def __init__(self, store_dir, model_name, normalize):
+        self.store_dir = store_dir
+        self.model_name = model_name
+        self.normalize = normalize
+
+        self.vectors_path = os.path.join(store_dir, VECTORS_FILE)
+        self.keys_path = os.path.join(store_dir, KEYS_FILE)
+        self.meta_path = os.path.join(store_dir, META_FILE)
+
+        self.dim = None
+        self.rows = {}
+        self._mmap = None
+
+        os.makedirs(store_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "r", encoding="utf-8") as f:
+                for row, line in enumerate(f):
+                    self.rows[line.strip()] = row
+
+        if self.dim is None:
+            return
+
+        # Vectors are written before their keys. Drop any trailing rows
+        # left behind by an interrupted write so appends stay aligned.
+        expected_size = len(self.rows) * self.dim * 4
+        if os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path) > expected_size:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(expected_size)
+
+    def _vectors(self):
+        # Re-map lazily whenever rows were appended since the last read
+        if self._mmap is None or self._mmap.shape[0] != len(self.rows):
+            self._mmap = np.memmap(
+                self.vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(len(self.rows), self.dim)
+            )
+        return self._mmap
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, key):
+        """
+        Returns the cached vector for `key` as a float32 array, or None.
+        """
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        return np.array(self._vectors()[row])
+
+    def append(self, keys, vectors):
+        """
+        Appends new vectors (shape: len(keys) x dim) to the store.
+
+        Keys already stored (or repeated within the call) are skipped, so
+        every row of vectors.f32 keeps matching its line in keys.txt.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+        new_keys, new_rows = {}, []
+        for row, key in enumerate(keys):
+            if key not in self.rows and key not in new_keys:
+                new_keys[key] = None
+                new_rows.append(row)
+        if not new_keys:
+            return
+        keys, vectors = list(new_keys), vectors[new_rows]
+
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "model_name": self.model_name,
+                        "normalize": self.normalize,
+                        "dim": self.dim,
+                    },
+                    f,
+                    indent=2
+                )
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dimension {vectors.shape[1]} does not match "
+                f"cached dimension {self.dim}."
+            )
+
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+
+        with open(self.keys_path, "a", encoding="utf-8") as f:
+            for key in keys:
+                self.rows[key] = len(self.rows)
+                f.write(key + "\n")
+
+
+# ---------------------------------------------------------
+# Caching Embeddings Wrapper
+# ---------------------------------------------------------
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings object and caches document vectors on disk.
+
+    Cache entries are keyed by (model name, normalize flag, text hash):
+    each (model name, normalize flag) pair gets its own disk store, and
+    inside it rows are addressed by the SHA-256 of the chunk text.
+    Recently used vectors are also kept in a bounded in-memory LRU.
+
+    Queries are not cached here and go straight to the wrapped model.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        cache_dir=DEFAULT_CACHE_DIR,
+        max_memory_items=DEFAULT_MAX_MEMORY_ITEMS,
+        model_name=None,
+        normalize=None,
+    ):
+        self.embeddings = embeddings
+
+        # HuggingFaceEmbeddings exposes both settings; allow overrides for others
+        self.model_name = model_name or getattr(embeddings, "model_name", type(embeddings).__name__)
+        if normalize is None:
+            encode_kwargs = getattr(embeddings, "encode_kwargs", None) or {}
+            normalize = bool(encode_kwargs.get("normalize_embeddings", False))
+        self.normalize = normalize
+
+        namespace = hashlib.sha256(
+            f"{self.model_name}|normalize={self.normalize}".encode("utf-8")
+        ).hexdigest()[:16]
+        self.store = EmbeddingDiskStore(
+            os.path.join(cache_dir, namespace),
+            self.model_name,
+            self.normalize
+        )
+
+        self.max_memory_items = max_memory_items
+        self._memory = OrderedDict()
+
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def lookup(self, text):
+        """
+        Returns the cached vector for `text` (memory first, then disk),
+        or None when it has never been embedded.
+        """
+        key = text_sha256(text)
+
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return vector
+
+        vector = self.store.get(key)
+        if vector is not None:
+            self._remember(key, vector)
+            self.stats["disk_hits"] += 1
+        return vector
+
+    def put(self, texts, vectors):
+        """
+        Stores freshly computed vectors for `texts`. Texts that are already
+        cached (or repeated within the call) are stored only once.
+
+        Returns:
+            The vectors as a float32 array
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        new_keys, new_rows = [], []
+        for row, text in enumerate(texts):
+            key = text_sha256(text)
+            self._remember(key, vectors[row])
+            if key not in self.store and key not in new_keys:
+                new_keys.append(key)
+                new_rows.append(row)
+
+        if new_keys:
+            self.store.append(new_keys, vectors[new_rows])
+            self.stats["misses"] += len(new_keys)
+        return vectors
+
+    def embed_documents(self, texts):
+        """
+        Returns vectors for `texts`, computing only the ones not cached yet.
+        """
+        vectors = [None] * len(texts)
+        missing = OrderedDict()  # text -> [positions]
+
+        for i, text in enumerate(texts):
+            vector = self.lookup(text)
+            if vector is not None:
+                vectors[i] = vector
+            else:
+                # Duplicate texts inside one batch are embedded only once
+                missing.setdefault(text, []).append(i)
+
+        if missing:
+            missing_texts = list(missing)
+            computed = self.put(
+                missing_texts,
+                self.embeddings.embed_documents(missing_texts)
+            )
+            for text, vector in zip(missing_texts, computed):
+                for i in missing[text]:
+                    vectors[i] = vector
+
+        return [vector.tolist() for vector in vectors]
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    def print_stats(self):
+        """
+        Prints how many vectors were served from memory, disk or the model.
+        """
+        print("\n--- Embedding Cache ---")
+        print(
+            f"Memory hits: {self.stats['memory_hits']}, "
+            f"disk hits: {self.stats['disk_hits']}, "
+            f"computed: {self.stats['misses']} "
+            f"(cache size: {len(self.store)})"
+        )
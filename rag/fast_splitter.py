@@ -0,0 +1,207 @@
+import re
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+import numpy as np
+from langchain_text_splitters import TextSplitter
+
+
+# ---------------------------------------------------------
+# Splitter Configuration
+# ---------------------------------------------------------
+
+# Same separators, in the same order, as RecursiveCharacterTextSplitter
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+# ---------------------------------------------------------
+# Precomputed Separator Offsets
+# ---------------------------------------------------------
+
+class SeparatorOffsets:
+    """
+    Start offsets of every separator match in a text, computed once.
+
+    One- and two-character separators are located with vectorized NumPy
+    comparisons over the text's code points; longer separators use one
+    regex scan. Either way the offsets are the leftmost, non-overlapping
+    matches that re.split finds. Offsets are computed lazily, per
+    separator, on first use.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self._codes = None
+        self._offsets = {}
+
+    def _code_points(self):
+        if self._codes is None:
+            self._codes = np.frombuffer(self.text.encode("utf-32-le"), dtype=np.uint32)
+        return self._codes
+
+    def get(self, separator):
+        offsets = self._offsets.get(separator)
+        if offsets is None:
+            if len(separator) == 1:
+                offsets = np.flatnonzero(self._code_points() == ord(separator)).tolist()
+            elif len(separator) == 2:
+                offsets = self._two_char_offsets(separator).tolist()
+            else:
+                offsets = [m.start() for m in re.finditer(re.escape(separator), self.text)]
+            self._offsets[separator] = offsets
+        return offsets
+
+    def _two_char_offsets(self, separator):
+        codes = self._code_points()
+        first, second = ord(separator[0]), ord(separator[1])
+        candidates = np.flatnonzero((codes[:-1] == first) & (codes[1:] == second))
+        if first != second or len(candidates) == 0:
+            return candidates
+
+        # "\n\n\n\n" has candidates at 0, 1 and 2, but a left-to-right scan
+        # only matches at 0 and 2: inside every run of consecutive
+        # candidates, keep every other one.
+        index = np.arange(len(candidates))
+        run_start = np.zeros(len(candidates), dtype=np.int64)
+        breaks = np.flatnonzero(np.diff(candidates) != 1) + 1
+        run_start[breaks] = breaks
+        run_start = np.maximum.accumulate(run_start)
+        return candidates[(index - run_start) % 2 == 0]
+
+    def between(self, separator, start, end):
+        """
+        Returns the match offsets that lie fully inside text[start:end].
+        """
+        offsets = self.get(separator)
+        lo = bisect_left(offsets, start)
+        hi = bisect_left(offsets, end - len(separator) + 1, lo)
+        return offsets[lo:hi]
+
+    def any_between(self, separator, start, end):
+        offsets = self.get(separator)
+        i = bisect_left(offsets, start)
+        return i < len(offsets) and offsets[i] <= end - len(separator)
+
+
+# ---------------------------------------------------------
+# Fast Recursive Splitter
+# ---------------------------------------------------------
+
+class FastRecursiveCharacterTextSplitter(TextSplitter):
+    """
+    Drop-in replacement for RecursiveCharacterTextSplitter with the default
+    separators (keep_separator=True, strip_whitespace=True, len as length).
+
+    Instead of re-splitting and re-joining substrings at every separator
+    level, separator offsets are computed once for the whole text and the
+    recursion and greedy merge run on (start, end) index ranges. Because
+    merged splits are always contiguous, a chunk is a single slice of the
+    original text, and the merge jumps from one chunk boundary to the next
+    with binary searches over prefix sums of the split lengths instead of
+    re-measuring and re-joining strings split by split. The chunks
+    are identical to the recursive splitter's.
+    """
+
+    def __init__(self, chunk_size=1000, chunk_overlap=200, add_start_index=False):
+        super().__init__(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            keep_separator=True,
+            add_start_index=add_start_index
+        )
+        self._separators = list(DEFAULT_SEPARATORS)
+
+    def split_text(self, text):
+        return self._split_text(text, self._separators)
+
+    def _split_text(self, text, separators):
+        """
+        Same contract as RecursiveCharacterTextSplitter._split_text.
+        """
+        chunks = []
+        self._split_range(text, 0, len(text), separators, SeparatorOffsets(text), chunks)
+        return chunks
+
+    def _split_range(self, text, start, end, separators, offsets, chunks):
+        # Pick the first separator that occurs in this range
+        separator = separators[-1]
+        new_separators = []
+        for i, candidate in enumerate(separators):
+            if not candidate:
+                separator = candidate
+                break
+            if offsets.any_between(candidate, start, end):
+                separator = candidate
+                new_separators = separators[i + 1:]
+                break
+
+        # Split boundaries: the separator is kept at the start of each split
+        if separator:
+            bounds = [start, *offsets.between(separator, start, end), end]
+        else:
+            bounds = range(start, end + 1)
+
+        # Splits at least chunk_size long are recursed into; the runs of
+        # short splits between them are merged
+        chunk_size = self._chunk_size
+        run_start = start
+        run_lengths = []
+        for split_start, split_end in zip(bounds, bounds[1:]):
+            split_len = split_end - split_start
+            if split_len == 0:
+                continue
+            if split_len < chunk_size:
+                if not run_lengths:
+                    run_start = split_start
+                run_lengths.append(split_len)
+                continue
+
+            if run_lengths:
+                self._merge_ranges(text, run_start, run_lengths, chunks)
+                run_lengths = []
+            if not new_separators:
+                chunks.append(text[split_start:split_end])
+            else:
+                self._split_range(text, split_start, split_end, new_separators, offsets, chunks)
+
+        if run_lengths:
+            self._merge_ranges(text, run_start, run_lengths, chunks)
+
+    def _merge_ranges(self, text, base, lengths, chunks):
+        """
+        TextSplitter._merge_splits over a run of contiguous splits that
+        starts at text offset `base`.
+
+        With prefix[i] = total length of the first i splits, the current
+        chunk splits[first:last] has length prefix[last] - prefix[first],
+        so every greedy step is a binary search instead of a loop.
+        """
+        chunk_size = self._chunk_size
+        chunk_overlap = self._chunk_overlap
+
+        prefix = [0, *accumulate(lengths)]
+        count = len(lengths)
+
+        def emit(first, last):
+            chunk = text[base + prefix[first]:base + prefix[last]].strip()
+            if chunk:
+                chunks.append(chunk)
+
+        first = 0
+        while True:
+            # First split that no longer fits into the current chunk
+            last = bisect_right(prefix, prefix[first] + chunk_size) - 1
+            if last >= count:
+                break
+
+            emit(first, last)
+
+            # Drop leading splits until at most the overlap is left and the
+            # next split fits (or the chunk is empty)
+            first = max(
+                first,
+                bisect_left(prefix, prefix[last] - chunk_overlap),
+                min(last, bisect_left(prefix, prefix[last + 1] - chunk_size)),
+            )
+
+        emit(first, count)
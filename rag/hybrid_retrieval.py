@@ -0,0 +1,340 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+from collections import Counter
+from typing import Any, Callable
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from incremental_ingestion import load_manifest, save_manifest
+
+
+# ---------------------------------------------------------
+# BM25 Configuration
+# ---------------------------------------------------------
+
+# Bump this whenever the index layout or the tokenizer changes
+BM25_INDEX_VERSION = 1
+
+# Okapi BM25 parameters (term frequency saturation, length normalization)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Reciprocal rank fusion constant: 1 / (RRF_K + rank)
+DEFAULT_RRF_K = 60
+
+# Index directory, next to the ingestion manifest of a Chroma store
+BM25_INDEX_DIR = "bm25_index"
+
+# Points at the current index generation: {"version", "generation", "sources": {source: file_hash}}
+CURRENT_FILE = "current.json"
+
+# Per-source term counts, reused for books whose file hash is unchanged
+SOURCE_STATS_DIR = "sources"
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Lower-cased word tokens; curly apostrophes split words like straight
+    ones ("Romeo’s" -> "romeo", "s").
+    """
+    return TOKEN_PATTERN.findall(text.casefold())
+
+
+def _source_stats_path(index_dir, source, file_hash):
+    name = f"{hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]}-{file_hash[:12]}.json"
+    return os.path.join(index_dir, SOURCE_STATS_DIR, name)
+
+
+# ---------------------------------------------------------
+# Index Build (after ingestion)
+# ---------------------------------------------------------
+
+def _source_stats(db, index_dir, source, entry):
+    """
+    Term counts of every chunk of one book, tokenized once per file hash.
+
+    Returns:
+        {"ids": [...], "lengths": [...], "terms": [{term: count}, ...]}
+    """
+    path = _source_stats_path(index_dir, source, entry["file_hash"])
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    data = db.get(ids=entry["chunks"], include=["documents"])
+    stats = {"ids": [], "lengths": [], "terms": []}
+    for chunk_id, text in zip(data["ids"], data["documents"]):
+        tokens = tokenize(text)
+        stats["ids"].append(chunk_id)
+        stats["lengths"].append(len(tokens))
+        stats["terms"].append(dict(Counter(tokens)))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stats, f)
+    return stats
+
+
+def sync_bm25_index(db, manifest_path, index_dir):
+    """
+    Builds the BM25 inverted index of a Chroma collection maintained by
+    incremental_ingest, if the collection changed since the last build.
+
+    Only books whose file hash changed are read back from Chroma and
+    tokenized. Their term counts are cached per book under sources/. The
+    postings of the whole collection are then recompiled from these
+    counts, which takes a fraction of a second for the bundled books.
+    Each build goes to a new generation directory, and current.json is
+    switched atomically, so open readers are never affected.
+
+    Layout of a generation:
+        terms.json     -> vocabulary, term id = position
+        chunk_ids.json -> chunk id per row
+        offsets.npy    -> postings of term t are [offsets[t], offsets[t + 1])
+        postings.npy   -> int32 chunk rows, grouped by term
+        weights.npy    -> float32 BM25 weight of the term in that chunk
+
+    Returns:
+        Dict with index statistics
+    """
+    manifest = load_manifest(manifest_path)
+    if manifest is None:
+        raise FileNotFoundError(f"No ingestion manifest at {manifest_path}. Run the ingestion first.")
+
+    sources = {source: entry["file_hash"] for source, entry in manifest["files"].items()}
+    current = _load_current(index_dir)
+    if current is not None and current["sources"] == sources:
+        return {"rebuilt": False, "chunks": current["chunks"], "terms": current["terms"]}
+
+    ids, lengths, chunk_terms = [], [], []
+    for source, entry in sorted(manifest["files"].items()):
+        stats = _source_stats(db, index_dir, source, entry)
+        ids.extend(stats["ids"])
+        lengths.extend(stats["lengths"])
+        chunk_terms.extend(stats["terms"])
+
+    vocabulary = sorted({term for terms in chunk_terms for term in terms})
+    term_ids = {term: i for i, term in enumerate(vocabulary)}
+
+    # Postings as parallel arrays, then grouped by term with one stable sort
+    rows, term_column, counts = [], [], []
+    for row, terms in enumerate(chunk_terms):
+        for term, count in terms.items():
+            rows.append(row)
+            term_column.append(term_ids[term])
+            counts.append(count)
+    rows = np.asarray(rows, dtype=np.int32)
+    term_column = np.asarray(term_column, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.float32)
+
+    order = np.argsort(term_column, kind="stable")
+    rows, term_column, counts = rows[order], term_column[order], counts[order]
+    document_frequency = np.bincount(term_column, minlength=len(vocabulary))
+    offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    np.cumsum(document_frequency, out=offsets[1:])
+
+    # Precomputed BM25 weight per posting: idf * saturated, length-normalized tf
+    lengths = np.asarray(lengths, dtype=np.float32)
+    average_length = float(lengths.mean()) if len(lengths) else 0.0
+    idf = np.log((len(ids) - document_frequency + 0.5) / (document_frequency + 0.5) + 1).astype(np.float32)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[rows] / max(average_length, 1e-9))
+    weights = idf[term_column] * counts * (BM25_K1 + 1) / (counts + norm)
+
+    generation = (current["generation"] + 1) if current is not None else 1
+    generation_dir = os.path.join(index_dir, f"generation_{generation}")
+    os.makedirs(generation_dir, exist_ok=True)
+    with open(os.path.join(generation_dir, "terms.json"), "w", encoding="utf-8") as f:
+        json.dump(vocabulary, f)
+    with open(os.path.join(generation_dir, "chunk_ids.json"), "w", encoding="utf-8") as f:
+        json.dump(ids, f)
+    np.save(os.path.join(generation_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(generation_dir, "postings.npy"), rows)
+    np.save(os.path.join(generation_dir, "weights.npy"), weights.astype(np.float32))
+
+    save_manifest(os.path.join(index_dir, CURRENT_FILE), {
+        "version": BM25_INDEX_VERSION,
+        "generation": generation,
+        "sources": sources,
+        "chunks": len(ids),
+        "terms": len(vocabulary),
+    })
+
+    # Older generations and the term counts of replaced books are obsolete
+    if current is not None:
+        shutil.rmtree(os.path.join(index_dir, f"generation_{current['generation']}"), ignore_errors=True)
+    keep = {os.path.basename(_source_stats_path(index_dir, s, h)) for s, h in sources.items()}
+    stats_dir = os.path.join(index_dir, SOURCE_STATS_DIR)
+    for name in os.listdir(stats_dir) if os.path.isdir(stats_dir) else []:
+        if name not in keep:
+            os.remove(os.path.join(index_dir, SOURCE_STATS_DIR, name))
+
+    return {"rebuilt": True, "chunks": len(ids), "terms": len(vocabulary)}
+
+
+def _load_current(index_dir):
+    path = os.path.join(index_dir, CURRENT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        current = json.load(f)
+    return current if current.get("version") == BM25_INDEX_VERSION else None
+
+
+def print_bm25_report(stats):
+    print("\n--- BM25 Keyword Index ---")
+    print(
+        f"{'Rebuilt' if stats['rebuilt'] else 'Up to date'}: "
+        f"{stats['chunks']} chunks, {stats['terms']} terms"
+    )
+
+
+# ---------------------------------------------------------
+# Keyword Search
+# ---------------------------------------------------------
+
+class BM25Index:
+    """
+    Read side of the index written by sync_bm25_index.
+
+    A query only touches the postings of its own terms. The weights are
+    precomputed, so scoring is one vectorized add per query term plus a
+    partial sort. No chunk text is tokenized at query time.
+    """
+
+    def __init__(self, chunk_ids, term_ids, offsets, postings, weights):
+        self.chunk_ids = chunk_ids
+        self.term_ids = term_ids
+        self.offsets = offsets
+        self.postings = postings
+        self.weights = weights
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    @classmethod
+    def load(cls, index_dir):
+        current = _load_current(index_dir)
+        if current is None:
+            raise FileNotFoundError(f"No BM25 index at {index_dir}. Run the ingestion first.")
+
+        generation_dir = os.path.join(index_dir, f"generation_{current['generation']}")
+        with open(os.path.join(generation_dir, "terms.json"), "r", encoding="utf-8") as f:
+            term_ids = {term: i for i, term in enumerate(json.load(f))}
+        with open(os.path.join(generation_dir, "chunk_ids.json"), "r", encoding="utf-8") as f:
+            chunk_ids = json.load(f)
+        return cls(
+            chunk_ids,
+            term_ids,
+            np.load(os.path.join(generation_dir, "offsets.npy")),
+            np.load(os.path.join(generation_dir, "postings.npy")),
+            np.load(os.path.join(generation_dir, "weights.npy")),
+        )
+
+    def search(self, query, k=10):
+        """
+        Returns:
+            [(chunk id, BM25 score)] of the k best matching chunks, best first
+        """
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term, count in Counter(tokenize(query)).items():
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # A term occurs at most once in each chunk's postings
+            scores[self.postings[start:end]] += count * self.weights[start:end]
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.chunk_ids[i], float(scores[i])) for i in top]
+
+
+# ---------------------------------------------------------
+# Hybrid Retrieval (Reciprocal Rank Fusion)
+# ---------------------------------------------------------
+
+def chunk_key(doc):
+    """
+    Chunk id of a retrieved document. Documents without an id get the
+    content-addressed id that incremental_ingest assigns.
+    """
+    if doc.id:
+        return doc.id
+    digest = hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+    return f"{doc.metadata.get('source')}:{digest}"
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=DEFAULT_RRF_K):
+    """
+    Fuses ranked lists of keys: each key scores sum(1 / (rrf_k + rank)).
+
+    Returns:
+        Keys ordered by fused score, best first
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def fetch_chroma_documents(db, ids):
+    """
+    Chunks of a Chroma collection by id, in the order of `ids`.
+    """
+    data = db.get(ids=list(ids), include=["documents", "metadatas"])
+    found = {
+        chunk_id: Document(id=chunk_id, page_content=text, metadata=metadata or {})
+        for chunk_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+    }
+    return [found[chunk_id] for chunk_id in ids if chunk_id in found]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense retriever and BM25 keyword index, fused by reciprocal rank.
+
+    Both rankings are computed for each query. Chunks found only by
+    keyword, such as exact names and rare terms the embedding misses, are
+    fetched by id through `documents_fn` in a single call.
+
+    Inputs:
+        vector_retriever -> e.g. db.as_retriever(...)
+        keyword_index    -> BM25Index of the same collection
+        documents_fn     -> callable(ids) -> Documents, e.g.
+                            partial(fetch_chroma_documents, db)
+        k                -> number of fused results returned
+        keyword_k        -> keyword hits taken into the fusion
+    """
+
+    vector_retriever: BaseRetriever
+    keyword_index: Any
+    documents_fn: Callable
+    k: int = 4
+    keyword_k: int = 10
+    rrf_k: int = DEFAULT_RRF_K
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        vector_docs = self.vector_retriever.invoke(
+            query, config={"callbacks": run_manager.get_child()} if run_manager else None
+        )
+        keyword_ids = [chunk_id for chunk_id, _ in self.keyword_index.search(query, self.keyword_k)]
+
+        docs = {chunk_key(doc): doc for doc in vector_docs}
+        fused = reciprocal_rank_fusion([list(docs), keyword_ids], self.rrf_k)[:self.k]
+
+        missing = [key for key in fused if key not in docs]
+        if missing:
+            docs.update((chunk_key(doc), doc) for doc in self.documents_fn(missing))
+        return [docs[key] for key in fused if key in docs]
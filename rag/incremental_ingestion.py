@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+
+from streaming_ingestion import add_in_batches
+
+
+# ---------------------------------------------------------
+# Manifest Configuration
+# ---------------------------------------------------------
+
+# Bump this whenever the manifest layout or the chunk ID scheme changes,
+# an incompatible manifest is treated like a missing one.
+# Version 2 records the embedding configuration of the stored vectors.
+MANIFEST_VERSION = 2
+
+# Files are hashed in bounded blocks so large books never sit in memory twice
+HASH_BLOCK_SIZE = 1 << 20
+
+
+# ---------------------------------------------------------
+# Hashing Helpers
+# ---------------------------------------------------------
+
+def file_sha256(file_path):
+    """
+    Computes the SHA-256 digest of a file's raw bytes.
+
+    Inputs:
+        file_path -> absolute path of the file to hash
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_chunk_ids(source, chunks):
+    """
+    Pairs the chunks of one file with deterministic, content-addressed IDs.
+
+    The ID is "<source>:<sha256 of chunk text>", so an unchanged chunk keeps
+    its ID across runs even if chunks before it were added or removed.
+    Identical chunks inside the same file get an occurrence suffix.
+
+    Inputs:
+        source -> file name stored in the chunk metadata
+        chunks -> iterable of Document chunks (in file order)
+
+    Yields:
+        (chunk_id, chunk) pairs
+    """
+    seen = {}
+    for chunk in chunks:
+        chunk_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+        occurrence = seen.get(chunk_hash, 0)
+        seen[chunk_hash] = occurrence + 1
+
+        chunk_id = f"{source}:{chunk_hash}"
+        if occurrence:
+            chunk_id = f"{chunk_id}:{occurrence}"
+        yield chunk_id, chunk
+
+
+def embedding_config(embeddings):
+    """
+    Identifies the vectors an embeddings object produces: model name and
+    normalize flag, read the same way CachedEmbeddings namespaces its
+    cache. Wrappers without these attributes (QueryEmbeddingCache,
+    tracing) are looked through via their `embeddings` attribute.
+
+    Returns:
+        {"model_name", "normalize"}
+    """
+    while not hasattr(embeddings, "model_name") and hasattr(embeddings, "embeddings"):
+        embeddings = embeddings.embeddings
+
+    normalize = getattr(embeddings, "normalize", None)
+    if normalize is None:
+        encode_kwargs = getattr(embeddings, "encode_kwargs", None) or {}
+        normalize = bool(encode_kwargs.get("normalize_embeddings", False))
+    return {
+        "model_name": getattr(embeddings, "model_name", type(embeddings).__name__),
+        "normalize": normalize,
+    }
+
+
+# ---------------------------------------------------------
+# Manifest Persistence
+# ---------------------------------------------------------
+
+def load_manifest(manifest_path):
+    """
+    Loads the ingestion manifest.
+
+    Returns:
+        The manifest dict, or None when it is missing or incompatible
+    """
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(manifest_path, manifest):
+    """
+    Atomically writes the manifest (write to a temp file, then rename),
+    so an interrupted run never leaves a half-written manifest behind.
+    """
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+# ---------------------------------------------------------
+# Incremental Ingestion
+# ---------------------------------------------------------
+
+def _delete_ids(db, ids):
+    # Chroma rejects an empty delete request
+    if ids:
+        db.delete(ids=list(ids))
+
+
+def incremental_ingest(db, books_dir, manifest_path, text_splitter, add_documents=None, embeddings=None):
+    """
+    Synchronizes a Chroma collection with the .txt files in `books_dir`.
+
+    Only new or changed chunks are embedded and upserted. Chunks belonging
+    to removed files, or chunks that disappeared from edited files, are
+    deleted. Unchanged files are detected by their content hash and skipped
+    without being split or embedded. Changed files are streamed through
+    load -> split -> embed -> upsert in bounded batches, so no book is ever
+    held in memory as a whole.
+
+    The manifest records the embedding configuration (embedding_config)
+    of the stored vectors. When the model or the normalize flag changes,
+    every chunk is deleted and re-embedded, even for unchanged files.
+
+    Inputs:
+        db            -> Chroma vector store to update
+        books_dir     -> directory containing the .txt books
+        manifest_path -> JSON file holding per-file and per-chunk hashes
+        text_splitter -> StreamingTextSplitter used to chunk changed files
+        add_documents -> optional callable(db, chunks) that embeds and upserts
+                         an iterable of (chunk_id, Document) pairs and returns
+                         how many it added (defaults to add_in_batches)
+        embeddings    -> embeddings producing the vectors (defaults to the
+                         store's embedding function)
+
+    Returns:
+        Dict with ingestion statistics
+    """
+    if not os.path.exists(books_dir):
+        raise FileNotFoundError(
+            f"The directory {books_dir} does not exist."
+        )
+
+    book_files = sorted(
+        f for f in os.listdir(books_dir)
+        if f.endswith(".txt")
+    )
+
+    if not book_files:
+        raise ValueError("No .txt files found in books directory.")
+
+    stats = {
+        "files_total": len(book_files),
+        "files_skipped": 0,
+        "files_updated": 0,
+        "files_removed": 0,
+        "chunks_total": 0,
+        "chunks_skipped": 0,
+        "chunks_added": 0,
+        "chunks_deleted": 0,
+        "embedding_changed": False,
+    }
+
+    embedding = embedding_config(embeddings if embeddings is not None else db.embeddings)
+    manifest = load_manifest(manifest_path)
+
+    if manifest is not None and manifest.get("embedding") != embedding:
+        # Vectors of another model (or normalization) can't be mixed with
+        # new ones, whatever the file hashes say
+        stats["embedding_changed"] = True
+        manifest = None
+
+    if manifest is None:
+        # Collections built before the manifest existed use random UUIDs,
+        # which can't be matched to content. Clear them once and rebuild.
+        legacy_ids = db.get(include=[])["ids"]
+        _delete_ids(db, legacy_ids)
+        stats["chunks_deleted"] += len(legacy_ids)
+        manifest = {"version": MANIFEST_VERSION, "embedding": embedding, "files": {}}
+
+    files = manifest["files"]
+
+    # Drop chunks of books that are no longer on disk
+    for source in sorted(set(files) - set(book_files)):
+        removed_ids = files.pop(source)["chunks"]
+        _delete_ids(db, removed_ids)
+        stats["files_removed"] += 1
+        stats["chunks_deleted"] += len(removed_ids)
+        save_manifest(manifest_path, manifest)
+
+    for book_file in book_files:
+        file_path = os.path.join(books_dir, book_file)
+        file_hash = file_sha256(file_path)
+        entry = files.get(book_file)
+
+        # Unchanged file: nothing to split, embed or delete
+        if entry is not None and entry["file_hash"] == file_hash:
+            stats["files_skipped"] += 1
+            stats["chunks_total"] += len(entry["chunks"])
+            stats["chunks_skipped"] += len(entry["chunks"])
+            continue
+
+        old_ids = set(entry["chunks"]) if entry is not None else set()
+        chunk_ids = []
+
+        def new_chunks():
+            chunks = text_splitter.iter_file_documents(
+                file_path,
+                metadata={
+                    # Attach source metadata for traceability
+                    "source": book_file
+                }
+            )
+            for chunk_id, chunk in iter_chunk_ids(book_file, chunks):
+                chunk_ids.append(chunk_id)
+                # Only chunks whose content hash is not stored yet get embedded
+                if chunk_id not in old_ids:
+                    yield chunk_id, chunk
+
+        if add_documents is None:
+            added = add_in_batches(db, new_chunks())
+        else:
+            added = add_documents(db, new_chunks())
+
+        stale_ids = old_ids - set(chunk_ids)
+        _delete_ids(db, stale_ids)
+
+        files[book_file] = {
+            "file_hash": file_hash,
+            "chunks": chunk_ids,
+        }
+        # Persist after every file so an interrupted run resumes cleanly
+        save_manifest(manifest_path, manifest)
+
+        stats["files_updated"] += 1
+        stats["chunks_total"] += len(chunk_ids)
+        stats["chunks_skipped"] += len(chunk_ids) - added
+        stats["chunks_added"] += added
+        stats["chunks_deleted"] += len(stale_ids)
+
+    return stats
+
+
+def print_ingestion_report(stats):
+    """
+    Prints a short summary of what an incremental ingestion run did.
+    """
+    print("\n--- Incremental Ingestion Report ---")
+    if stats.get("embedding_changed"):
+        print("Embedding model or normalization changed: all chunks were re-embedded")
+    print(
+        f"Files: {stats['files_total']} total, "
+        f"{stats['files_skipped']} unchanged, "
+        f"{stats['files_updated']} new/changed, "
+        f"{stats['files_removed']} removed"
+    )
+    print(
+        f"Chunks: {stats['chunks_total']} total, "
+        f"{stats['chunks_skipped']} skipped, "
+        f"{stats['chunks_added']} embedded, "
+        f"{stats['chunks_deleted']} deleted"
+    )
@@ -0,0 +1,175 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+
+
+# ---------------------------------------------------------
+# MMR Configuration
+# ---------------------------------------------------------
+
+# Chunk vectors remembered by MMRRetriever (~1.5 KB each at 384 dimensions)
+DEFAULT_MAX_CACHED_VECTORS = 20000
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+# ---------------------------------------------------------
+# Vectorized Selection
+# ---------------------------------------------------------
+
+def mmr_select(query_vector, candidate_vectors, k=4, lambda_mult=0.5):
+    """
+    Maximal marginal relevance over a candidate matrix.
+
+    Selects the same indices as langchain_core's maximal_marginal_relevance
+    but computes every similarity up front: one matrix-vector product for
+    query relevance and one matrix product for all candidate pairs. Each
+    of the k steps is then an elementwise max and an argmax over the
+    candidates, so a few hundred candidates take well under a millisecond.
+
+    Inputs:
+        query_vector      -> query embedding
+        candidate_vectors -> (n, dim) candidate embeddings
+        k                 -> number of candidates to select
+        lambda_mult       -> 1 = relevance only, 0 = diversity only
+
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    candidates = _normalize(candidate_vectors)
+    k = min(k, len(candidates))
+    if k <= 0:
+        return []
+
+    relevance = candidates @ _normalize(query_vector).ravel()
+    pairwise = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    # Highest similarity of every candidate to any selected one
+    redundancy = pairwise[selected[0]].copy()
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, pairwise[best], out=redundancy)
+    return selected
+
+
+# ---------------------------------------------------------
+# MMR Retriever
+# ---------------------------------------------------------
+
+class MMRRetriever(BaseRetriever):
+    """
+    MMR retriever for a Chroma store or a NumpyVectorStore, a drop-in
+    replacement for db.as_retriever(search_type="mmr", ...).
+
+    Per query, the fetch_k candidates come from one nearest-neighbour
+    query (texts and metadata only). Their vectors are taken from an LRU
+    cache keyed by chunk id, and the missing ones are fetched in a single
+    batched get. Consecutive questions in a conversation share most of
+    their candidates, so later queries mostly skip the vector transfer.
+    The re-ranking is mmr_select. A NumpyVectorStore hands over its
+    candidate rows directly and bypasses the cache.
+
+    When `version_fn` returns a different token than at the previous call
+    (the collection was re-ingested), the vector cache is dropped.
+    """
+
+    vectorstore: Any
+    k: int = 4
+    fetch_k: int = 20
+    lambda_mult: float = 0.5
+    filter: Optional[dict] = None
+    max_cached_vectors: int = DEFAULT_MAX_CACHED_VECTORS
+    version_fn: Optional[Callable[[], Any]] = None
+
+    # chunk id -> normalized float32 vector
+    _vectors: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _version: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _stats: dict = PrivateAttr(default_factory=lambda: {"cached_vectors": 0, "fetched_vectors": 0})
+
+    @property
+    def stats(self):
+        return dict(self._stats)
+
+    def print_stats(self):
+        """
+        Prints how many candidate vectors came from the cache.
+        """
+        print("\n--- MMR Vector Cache ---")
+        print(
+            f"Cached: {self._stats['cached_vectors']}, "
+            f"fetched: {self._stats['fetched_vectors']} "
+            f"(entries: {len(self._vectors)})"
+        )
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        query_vector = np.asarray(self.vectorstore.embeddings.embed_query(query), dtype=np.float32)
+        return self.search_by_vector(query_vector)
+
+    def search_by_vector(self, query_vector):
+        docs, vectors = self._candidates(query_vector)
+        return [docs[i] for i in mmr_select(query_vector, vectors, self.k, self.lambda_mult)]
+
+    def _candidates(self, query_vector):
+        """
+        Returns:
+            (candidate documents, (n, dim) matrix of their vectors)
+        """
+        if hasattr(self.vectorstore, "search_with_vectors"):
+            return self.vectorstore.search_with_vectors(query_vector, self.fetch_k, self.filter)
+
+        result = self.vectorstore._collection.query(
+            query_embeddings=[query_vector.tolist()],
+            n_results=self.fetch_k,
+            where=self.filter or None,
+            include=["documents", "metadatas"],
+        )
+        ids = result["ids"][0]
+        docs = [
+            Document(id=doc_id, page_content=text, metadata=metadata or {})
+            for doc_id, text, metadata in zip(ids, result["documents"][0], result["metadatas"][0])
+        ]
+        return docs, self._vectors_for(ids)
+
+    def _vectors_for(self, ids):
+        if self.version_fn is not None:
+            version = self.version_fn()
+            with self._lock:
+                if version != self._version:
+                    self._vectors.clear()
+                    self._version = version
+
+        with self._lock:
+            found = {doc_id: self._vectors[doc_id] for doc_id in ids if doc_id in self._vectors}
+        missing = [doc_id for doc_id in ids if doc_id not in found]
+        if missing:
+            # One batched call for every vector not cached yet
+            fetched = self.vectorstore._collection.get(ids=missing, include=["embeddings"])
+            found.update(zip(fetched["ids"], _normalize(fetched["embeddings"])))
+
+        with self._lock:
+            for doc_id in ids:
+                self._vectors[doc_id] = found[doc_id]
+                self._vectors.move_to_end(doc_id)
+            while len(self._vectors) > self.max_cached_vectors:
+                self._vectors.popitem(last=False)
+            self._stats["cached_vectors"] += len(ids) - len(missing)
+            self._stats["fetched_vectors"] += len(missing)
+        return np.stack([found[doc_id] for doc_id in ids]) if ids else np.empty((0, 0), np.float32)
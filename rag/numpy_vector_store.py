@@ -0,0 +1,366 @@
+import json
+import math
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from mmr import mmr_select
+
+
+# ---------------------------------------------------------
+# Index Configuration
+# ---------------------------------------------------------
+
+VECTORS_FILE = "vectors.f32"
+QUANTIZED_FILE = "vectors.i8"
+SCALES_FILE = "scales.f32"
+DOCS_FILE = "docs.jsonl"
+META_FILE = "meta.json"
+
+# Rows dequantized per step when scoring an int8 matrix (bounds the
+# temporary float32 block to ~12 MB at 384 dimensions)
+QUANTIZED_BLOCK_ROWS = 8192
+
+
+def normalize_rows(vectors):
+    """
+    Scales every row to unit length (zero rows are left as they are).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def quantize_int8(vectors):
+    """
+    Symmetric per-row int8 quantization.
+
+    Returns:
+        (int8 matrix, float32 scale per row) with vectors ~= int8 * scale
+    """
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def chroma_relevance(cosine):
+    """
+    Relevance score of the Chroma stores in this repo for normalized
+    vectors (squared L2 distance 2 - 2cos, mapped by LangChain as
+    1 - d / sqrt(2)), clipped to [0, 1], so score_threshold values carry
+    over unchanged from Chroma.
+    """
+    return np.clip(1 - (2 - 2 * cosine) / math.sqrt(2), 0.0, 1.0)
+
+
+# ---------------------------------------------------------
+# In-Process Vector Store
+# ---------------------------------------------------------
+
+class NumpyVectorStore(VectorStore):
+    """
+    Brute-force vector store on a contiguous matrix of normalized vectors.
+
+    A query is one matrix-vector product (cosine similarity, since all
+    rows are unit length) followed by np.argpartition for the top k, with
+    no client round trip and no graph traversal. For a few thousand
+    chunks this is exact and faster than Chroma's HNSW index.
+
+    Vectors are float32, or int8 with a per-row scale (4x smaller,
+    scores within ~1% of float32). Saved stores are opened through a
+    read-only memory map. Supports the `similarity`,
+    `similarity_score_threshold` and `mmr` search types of as_retriever,
+    and equality filters on metadata (filter={"source": "odyssey.txt"}).
+    """
+
+    def __init__(self, embedding, vectors, ids, texts, metadatas, scales=None, source_version=None):
+        self.embedding = embedding
+        self._vectors = vectors
+        self._scales = scales
+        self.ids = list(ids)
+        self.texts = list(texts)
+        self.metadatas = [dict(metadata or {}) for metadata in metadatas]
+        self.source_version = source_version
+
+        # metadata key -> object array of its values, built on first filter
+        self._columns = {}
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    @property
+    def quantized(self):
+        return self._scales is not None
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Scoring
+
+    def _query_vector(self, embedding):
+        return normalize_rows(np.asarray(embedding, dtype=np.float32)[None, :])[0]
+
+    def _scores(self, query_vector):
+        """
+        Cosine similarity of the query with every row.
+        """
+        if not self.quantized:
+            return self._vectors @ query_vector
+
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), QUANTIZED_BLOCK_ROWS):
+            block = self._vectors[start:start + QUANTIZED_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query_vector
+        return scores * self._scales
+
+    def _rows(self, indices):
+        """
+        Float32 vectors of the given rows (dequantized if needed).
+        """
+        rows = np.asarray(self._vectors[indices], dtype=np.float32)
+        if self.quantized:
+            rows *= self._scales[indices][:, None]
+        return rows
+
+    def _filter_mask(self, filter):
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in (filter or {}).items():
+            if key not in self._columns:
+                column = np.empty(len(self), dtype=object)
+                column[:] = [metadata.get(key) for metadata in self.metadatas]
+                self._columns[key] = column
+            mask &= self._columns[key] == value
+        return mask
+
+    def _top_k(self, scores, k, filter=None):
+        """
+        Indices of the k best rows, best first.
+        """
+        if filter:
+            scores = np.where(self._filter_mask(filter), scores, -np.inf)
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return top[np.isfinite(scores[top])]
+
+    def _document(self, i):
+        return Document(id=self.ids[i], page_content=self.texts[i], metadata=dict(self.metadatas[i]))
+
+    def similarity_search_by_vector_with_cosine(self, embedding, k=4, filter=None):
+        """
+        Returns:
+            List of (document, cosine similarity), most similar first
+        """
+        if not len(self):
+            return []
+        scores = self._scores(self._query_vector(embedding))
+        return [(self._document(i), float(scores[i])) for i in self._top_k(scores, k, filter)]
+
+    def search_with_vectors(self, embedding, k=4, filter=None):
+        """
+        Returns:
+            (k most similar documents, (k, dim) float32 matrix of their vectors)
+        """
+        if not len(self):
+            return [], np.empty((0, 0), dtype=np.float32)
+        top = self._top_k(self._scores(self._query_vector(embedding)), k, filter)
+        return [self._document(i) for i in top], self._rows(top)
+
+    # VectorStore interface
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_cosine(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        """
+        Returns (document, distance) pairs with the squared L2 distance
+        Chroma reports, lower is more similar.
+        """
+        results = self.similarity_search_by_vector_with_cosine(self.embedding.embed_query(query), k, filter)
+        return [(doc, max(0.0, 2 - 2 * cosine)) for doc, cosine in results]
+
+    def _similarity_search_with_relevance_scores(self, query, k=4, filter=None, **kwargs):
+        results = self.similarity_search_by_vector_with_cosine(self.embedding.embed_query(query), k, filter)
+        return [(doc, float(chroma_relevance(cosine))) for doc, cosine in results]
+
+    def max_marginal_relevance_search_by_vector(
+        self, embedding, k=4, fetch_k=20, lambda_mult=0.5, filter=None, **kwargs
+    ):
+        docs, vectors = self.search_with_vectors(embedding, fetch_k, filter)
+        return [docs[i] for i in mmr_select(embedding, vectors, k, lambda_mult)]
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, filter=None, **kwargs):
+        return self.max_marginal_relevance_search_by_vector(
+            self.embedding.embed_query(query), k, fetch_k, lambda_mult, filter
+        )
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        """
+        Embeds and appends texts in memory (call save to persist).
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids is not None else [f"{len(self) + i}" for i in range(len(texts))]
+        metadatas = list(metadatas) if metadatas is not None else [{}] * len(texts)
+
+        vectors = normalize_rows(self.embedding.embed_documents(texts))
+        current = self._rows(np.arange(len(self))) if len(self) else np.empty((0, vectors.shape[1]), np.float32)
+        combined = np.vstack([current, vectors])
+        if self.quantized:
+            self._vectors, self._scales = quantize_int8(combined)
+        else:
+            self._vectors = np.ascontiguousarray(combined)
+
+        self.ids.extend(ids)
+        self.texts.extend(texts)
+        self.metadatas.extend(dict(metadata or {}) for metadata in metadatas)
+        self._columns = {}
+        return ids
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, quantize=False, **kwargs):
+        texts = list(texts)
+        vectors = normalize_rows(embedding.embed_documents(texts))
+        ids = list(ids) if ids is not None else [str(i) for i in range(len(texts))]
+        metadatas = list(metadatas) if metadatas is not None else [{}] * len(texts)
+        return cls.from_vectors(embedding, vectors, ids, texts, metadatas, quantize=quantize)
+
+    @classmethod
+    def from_vectors(cls, embedding, vectors, ids, texts, metadatas, quantize=False, source_version=None):
+        """
+        Builds a store from precomputed vectors (normalized here).
+        """
+        vectors = np.ascontiguousarray(normalize_rows(vectors))
+        scales = None
+        if quantize:
+            vectors, scales = quantize_int8(vectors)
+        return cls(embedding, vectors, ids, texts, metadatas, scales=scales, source_version=source_version)
+
+    @classmethod
+    def from_chroma(cls, chroma_db, embedding=None, quantize=False, source_version=None):
+        """
+        Copies every vector, text and metadata of a Chroma collection
+        (nothing is re-embedded).
+        """
+        data = chroma_db.get(include=["embeddings", "documents", "metadatas"])
+        return cls.from_vectors(
+            embedding or chroma_db.embeddings,
+            np.asarray(data["embeddings"], dtype=np.float32),
+            data["ids"],
+            data["documents"],
+            data["metadatas"],
+            quantize=quantize,
+            source_version=source_version,
+        )
+
+    # Persistence
+
+    def save(self, path):
+        """
+        Writes the store to `path`:
+            vectors.f32 / vectors.i8 -> raw row-major matrix
+            scales.f32               -> per-row scales (int8 only)
+            docs.jsonl               -> id, text and metadata per row
+            meta.json                -> dimension, row count, dtype, source version
+        """
+        os.makedirs(path, exist_ok=True)
+        vectors = np.ascontiguousarray(self._vectors)
+        dim = int(vectors.shape[1]) if len(self) else 0
+
+        vectors.tofile(os.path.join(path, QUANTIZED_FILE if self.quantized else VECTORS_FILE))
+        if self.quantized:
+            np.ascontiguousarray(self._scales, dtype=np.float32).tofile(os.path.join(path, SCALES_FILE))
+
+        with open(os.path.join(path, DOCS_FILE), "w", encoding="utf-8") as f:
+            for doc_id, text, metadata in zip(self.ids, self.texts, self.metadatas):
+                f.write(json.dumps({"id": doc_id, "text": text, "metadata": metadata}) + "\n")
+
+        # Written last: a store without meta.json is incomplete
+        with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "model_name": getattr(self.embedding, "model_name", None),
+                "dim": dim,
+                "count": len(self),
+                "quantized": self.quantized,
+                "source_version": self.source_version,
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path, embedding):
+        """
+        Opens a saved store; the matrix is memory-mapped read-only.
+        """
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        ids, texts, metadatas = [], [], []
+        with open(os.path.join(path, DOCS_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                ids.append(record["id"])
+                texts.append(record["text"])
+                metadatas.append(record["metadata"])
+
+        shape = (meta["count"], meta["dim"])
+        scales = None
+        if not meta["count"]:
+            vectors = np.empty(shape, dtype=np.int8 if meta["quantized"] else np.float32)
+            if meta["quantized"]:
+                scales = np.empty(0, dtype=np.float32)
+        elif meta["quantized"]:
+            vectors = np.memmap(os.path.join(path, QUANTIZED_FILE), dtype=np.int8, mode="r", shape=shape)
+            scales = np.fromfile(os.path.join(path, SCALES_FILE), dtype=np.float32)
+        else:
+            vectors = np.memmap(os.path.join(path, VECTORS_FILE), dtype=np.float32, mode="r", shape=shape)
+        return cls(embedding, vectors, ids, texts, metadatas, scales=scales, source_version=meta["source_version"])
+
+
+# ---------------------------------------------------------
+# Chroma Export Helper
+# ---------------------------------------------------------
+
+def chroma_version(chroma_dir):
+    """
+    Version token of a persisted Chroma directory (its SQLite file is
+    rewritten on every change).
+    """
+    try:
+        return os.stat(os.path.join(chroma_dir, "chroma.sqlite3")).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def load_or_export(path, chroma_dir, embedding, quantize=False):
+    """
+    Opens the NumPy copy of a Chroma collection at `path`, exporting it
+    from `chroma_dir` first when it is missing or older than the Chroma
+    store (Chroma is only opened in that case).
+    """
+    version = chroma_version(chroma_dir)
+    meta_path = os.path.join(path, META_FILE)
+    if os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["source_version"] == version and meta["quantized"] == quantize:
+            return NumpyVectorStore.load(path, embedding)
+
+    from langchain_community.vectorstores import Chroma
+
+    store = NumpyVectorStore.from_chroma(
+        Chroma(persist_directory=chroma_dir, embedding_function=embedding),
+        embedding,
+        quantize=quantize,
+        source_version=version,
+    )
+    store.save(path)
+    return NumpyVectorStore.load(path, embedding)
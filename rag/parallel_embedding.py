@@ -0,0 +1,192 @@
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from streaming_ingestion import batched
+
+
+# ---------------------------------------------------------
+# Pipeline Configuration
+# ---------------------------------------------------------
+
+# Number of chunks sent to a worker in one embedding call
+DEFAULT_BATCH_SIZE = 64
+
+# Batches in flight per worker. Keeps every worker busy while bounding
+# how many finished-but-not-yet-upserted vectors sit in memory.
+MAX_PENDING_PER_WORKER = 2
+
+
+# ---------------------------------------------------------
+# Worker Side
+# ---------------------------------------------------------
+
+# Embedding model owned by the current worker process (built once per worker)
+_worker_embeddings = None
+
+
+def _init_worker(embeddings_factory, torch_threads):
+    """
+    Builds the embedding model once per worker process.
+
+    Each worker gets an equal share of the CPU cores for torch, otherwise
+    N workers would each spin up a full-size thread pool and fight over
+    the same cores.
+    """
+    global _worker_embeddings
+
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+    _worker_embeddings = embeddings_factory()
+
+
+def _embed_batch(texts):
+    return _worker_embeddings.embed_documents(texts)
+
+
+# ---------------------------------------------------------
+# Parent Side
+# ---------------------------------------------------------
+
+class EmbeddingPool:
+    """
+    Long-lived set of embedding workers, so the model is loaded once per
+    worker for a whole ingestion run rather than once per file.
+
+    With workers=1 everything runs in the current process. Otherwise a
+    pool of worker processes is used (spawned, so no torch state is
+    inherited from the parent). Use it as a context manager.
+    """
+
+    def __init__(self, embeddings_factory, workers=1):
+        self.embeddings_factory = embeddings_factory
+        self.workers = max(1, workers)
+        self._embeddings = None
+        self._pool = None
+
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(embeddings_factory, max(1, (os.cpu_count() or 1) // self.workers)),
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def map_batches(self, batches):
+        """
+        Embeds a stream of batches and yields them as soon as they are done.
+
+        Batches are pulled from `batches` lazily and only a few per worker
+        are in flight; with several workers they may finish out of order.
+        Only the texts are sent to the workers, payloads stay in this process.
+
+        Inputs:
+            batches -> iterable of (payload, texts); payload is passed through
+
+        Yields:
+            (payload, vectors) with vectors aligned to the batch texts
+        """
+        if self._pool is None:
+            if self._embeddings is None:
+                self._embeddings = self.embeddings_factory()
+            for payload, texts in batches:
+                yield payload, self._embeddings.embed_documents(texts)
+            return
+
+        pending = {}
+        batches = iter(batches)
+        max_pending = self.workers * MAX_PENDING_PER_WORKER
+
+        while True:
+            # Top up the queue of in-flight batches
+            for payload, texts in batches:
+                pending[self._pool.submit(_embed_batch, texts)] = payload
+                if len(pending) >= max_pending:
+                    break
+
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+
+def ingest_documents_parallel(db, chunks, pool, batch_size=DEFAULT_BATCH_SIZE, cache=None):
+    """
+    Embeds chunks with a pool of workers and streams every finished
+    batch straight into the Chroma collection.
+
+    Inputs:
+        db                 -> Chroma vector store receiving the vectors
+        chunks             -> iterable of (chunk_id, Document), consumed lazily
+        pool               -> EmbeddingPool doing the embedding
+        batch_size         -> number of chunks per embedding call
+        cache              -> optional CachedEmbeddings; cached chunks skip the
+                              pool and new vectors are written back to it
+
+    Returns:
+        Number of chunks upserted
+    """
+    upserted = 0
+
+    def upsert(batch, vectors):
+        nonlocal upserted
+        db._collection.upsert(
+            ids=[chunk_id for chunk_id, _ in batch],
+            embeddings=[list(map(float, vector)) for vector in vectors],
+            documents=[doc.page_content for _, doc in batch],
+            metadatas=[doc.metadata or None for _, doc in batch],
+        )
+        upserted += len(batch)
+
+    # Texts submitted for embedding in this run. Identical chunks are
+    # common, and only the batch that submitted a text first writes it to
+    # the cache, whether the earlier batch is still in flight or done.
+    submitted_texts = set()
+
+    def batches_to_embed():
+        for batch in batched(chunks, batch_size):
+            if cache is not None:
+                # Serve what we can from the cache without touching the pool
+                hits, misses = [], []
+                for chunk_id, doc in batch:
+                    vector = cache.lookup(doc.page_content)
+                    if vector is not None:
+                        hits.append((chunk_id, doc, vector))
+                    else:
+                        misses.append((chunk_id, doc))
+
+                if hits:
+                    upsert([(chunk_id, doc) for chunk_id, doc, _ in hits], [v for _, _, v in hits])
+                batch = misses
+
+            if batch:
+                owned = []
+                for row, (_, doc) in enumerate(batch):
+                    if cache is not None and doc.page_content not in submitted_texts:
+                        submitted_texts.add(doc.page_content)
+                        owned.append(row)
+                yield (batch, owned), [doc.page_content for _, doc in batch]
+
+    for (batch, owned), vectors in pool.map_batches(batches_to_embed()):
+        if cache is not None and owned:
+            cache.put([batch[row][1].page_content for row in owned], [vectors[row] for row in owned])
+        upsert(batch, vectors)
+
+    return upserted
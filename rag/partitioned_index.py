@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+from langchain_core.retrievers import BaseRetriever
+
+from incremental_ingestion import load_manifest, save_manifest
+from mmr import mmr_select
+from numpy_vector_store import NumpyVectorStore, chroma_relevance, normalize_rows
+
+
+# ---------------------------------------------------------
+# Partition Configuration
+# ---------------------------------------------------------
+
+# Bump this whenever the partition index layout changes
+PARTITION_INDEX_VERSION = 2
+
+# Lists every partition: {"version", "embedding", "partitions": {source: {"dir", "file_hash", "count"}}}
+PARTITION_INDEX_FILE = "partitions.json"
+
+# Partitions kept open at once (least recently used are closed first)
+DEFAULT_MAX_OPEN_PARTITIONS = 64
+
+
+def _partition_dir(source, file_hash, embedding):
+    # Source names are arbitrary file names; the file hash and embedding
+    # configuration make every rebuilt partition a new directory, so open
+    # memory maps stay valid
+    embedding_hash = hashlib.sha256(json.dumps(embedding, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"{hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]}-{file_hash[:12]}-{embedding_hash[:8]}"
+
+
+def load_partition_index(index_dir):
+    """
+    Returns:
+        The partition index dict (empty when missing or incompatible)
+    """
+    path = os.path.join(index_dir, PARTITION_INDEX_FILE)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") == PARTITION_INDEX_VERSION:
+            return index
+    return {"version": PARTITION_INDEX_VERSION, "embedding": None, "partitions": {}}
+
+
+# ---------------------------------------------------------
+# Partition Sync (after ingestion)
+# ---------------------------------------------------------
+
+def sync_partitions(db, manifest_path, index_dir):
+    """
+    Mirrors a Chroma collection maintained by incremental_ingest into one
+    NumpyVectorStore per source book under `index_dir`.
+
+    The ingestion manifest lists the chunk IDs and the file hash of every
+    book, so only books whose hash changed are exported again, each with a
+    single get by ID (no similarity search, no re-embedding). Partitions of
+    books that left the manifest are deleted, and all partitions are
+    rebuilt when the manifest's embedding configuration changed.
+
+    Returns:
+        Dict with partition statistics
+    """
+    manifest = load_manifest(manifest_path)
+    if manifest is None:
+        raise FileNotFoundError(f"No ingestion manifest at {manifest_path}. Run the ingestion first.")
+
+    index = load_partition_index(index_dir)
+    partitions = index["partitions"]
+    stats = {"partitions_total": len(manifest["files"]), "partitions_updated": 0, "partitions_removed": 0}
+    obsolete_dirs = []
+
+    for source in sorted(set(partitions) - set(manifest["files"])):
+        obsolete_dirs.append(partitions.pop(source)["dir"])
+        stats["partitions_removed"] += 1
+
+    # Vectors of another embedding model: every partition is stale
+    embedding = manifest.get("embedding")
+    if index["embedding"] != embedding:
+        obsolete_dirs.extend(partition["dir"] for partition in partitions.values())
+        partitions.clear()
+        index["embedding"] = embedding
+
+    for source, entry in sorted(manifest["files"].items()):
+        current = partitions.get(source)
+        if current is not None and current["file_hash"] == entry["file_hash"]:
+            continue
+
+        data = db.get(ids=entry["chunks"], include=["embeddings", "documents", "metadatas"])
+        directory = _partition_dir(source, entry["file_hash"], embedding)
+        NumpyVectorStore.from_vectors(
+            db.embeddings,
+            np.asarray(data["embeddings"], dtype=np.float32).reshape(len(data["ids"]), -1),
+            data["ids"],
+            data["documents"],
+            data["metadatas"],
+            source_version=entry["file_hash"],
+        ).save(os.path.join(index_dir, directory))
+
+        if current is not None and current["dir"] != directory:
+            obsolete_dirs.append(current["dir"])
+        partitions[source] = {"dir": directory, "file_hash": entry["file_hash"], "count": len(data["ids"])}
+        stats["partitions_updated"] += 1
+
+    # The index is switched atomically before old partitions are removed
+    save_manifest(os.path.join(index_dir, PARTITION_INDEX_FILE), index)
+    for directory in obsolete_dirs:
+        shutil.rmtree(os.path.join(index_dir, directory), ignore_errors=True)
+    return stats
+
+
+def print_partition_report(stats):
+    print("\n--- Source Partitions ---")
+    print(
+        f"Partitions: {stats['partitions_total']} total, "
+        f"{stats['partitions_updated']} rebuilt, "
+        f"{stats['partitions_removed']} removed"
+    )
+
+
+# ---------------------------------------------------------
+# Partitioned Index
+# ---------------------------------------------------------
+
+class PartitionedIndex:
+    """
+    Read side of the per-source partitions written by sync_partitions.
+
+    Looking up a source is a dict access, and a query scans only the rows
+    of the requested books. Per-book latency therefore depends on the size
+    of that book, not on how many books the collection holds. Partitions
+    are opened (memory-mapped) on first use and at most
+    `max_open_partitions` stay open. When sync_partitions rewrites the
+    index, open partitions are dropped on the next lookup.
+
+    Safe to share between threads.
+    """
+
+    def __init__(self, index_dir, embedding, max_open_partitions=DEFAULT_MAX_OPEN_PARTITIONS):
+        self.index_dir = index_dir
+        self.embedding = embedding
+        self.max_open_partitions = max_open_partitions
+
+        self._partitions = {}
+        self._open = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            version = os.stat(os.path.join(self.index_dir, PARTITION_INDEX_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            version = None
+        if version != self._version:
+            self._partitions = load_partition_index(self.index_dir)["partitions"]
+            self._open.clear()
+            self._version = version
+
+    def sources(self):
+        with self._lock:
+            self._refresh()
+            return sorted(self._partitions)
+
+    def partition(self, source):
+        """
+        Returns:
+            The NumpyVectorStore of one source (KeyError if unknown)
+        """
+        with self._lock:
+            self._refresh()
+            if source in self._open:
+                self._open.move_to_end(source)
+                return self._open[source]
+            if source not in self._partitions:
+                raise KeyError(f"No partition for source {source!r}.")
+
+            store = NumpyVectorStore.load(
+                os.path.join(self.index_dir, self._partitions[source]["dir"]), self.embedding
+            )
+            self._open[source] = store
+            while len(self._open) > self.max_open_partitions:
+                self._open.popitem(last=False)
+            return store
+
+    def search_with_vectors(self, query_vector, sources, k=4):
+        """
+        The k chunks most similar to the query across `sources`.
+
+        Returns:
+            (documents, their vectors, their cosine similarities), best first
+        """
+        query_vector = normalize_rows(np.asarray(query_vector, dtype=np.float32)[None, :])[0]
+        docs, vectors = [], []
+        for source in sources:
+            partition_docs, partition_vectors = self.partition(source).search_with_vectors(query_vector, k)
+            if partition_docs:
+                docs.extend(partition_docs)
+                vectors.append(partition_vectors)
+
+        if not docs:
+            return [], np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=np.float32)
+        vectors = np.vstack(vectors)
+        scores = vectors @ query_vector
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [docs[i] for i in order], vectors[order], scores[order]
+
+
+# ---------------------------------------------------------
+# Source-Scoped Retriever
+# ---------------------------------------------------------
+
+class PartitionedRetriever(BaseRetriever):
+    """
+    Retriever restricted to some source books, searching only their
+    partitions. Scores and search types match db.as_retriever(...) on
+    the combined Chroma collection:
+        "similarity"                 -> top k
+        "similarity_score_threshold" -> top k with relevance >= score_threshold
+        "mmr"                        -> MMR over the fetch_k nearest chunks
+
+    The books can be fixed on the retriever (`sources`) or passed per call:
+        retriever.invoke(query, sources=["romeo_and_juliet.txt"])
+    Without any source, `fallback` (e.g. the unfiltered Chroma retriever)
+    answers the query.
+    """
+
+    index: Any
+    sources: Optional[list] = None
+    search_type: str = "similarity"
+    k: int = 4
+    score_threshold: float = 0.0
+    fetch_k: int = 20
+    lambda_mult: float = 0.5
+    fallback: Optional[BaseRetriever] = None
+
+    def _get_relevant_documents(self, query, *, run_manager=None, sources=None):
+        sources = sources if sources is not None else self.sources
+        if isinstance(sources, str):
+            sources = [sources]
+        if not sources:
+            if self.fallback is None:
+                raise ValueError("No sources given and no fallback retriever configured.")
+            return self.fallback.invoke(query, config={"callbacks": run_manager.get_child()} if run_manager else None)
+
+        query_vector = np.asarray(self.index.embedding.embed_query(query), dtype=np.float32)
+        if self.search_type == "mmr":
+            docs, vectors, _ = self.index.search_with_vectors(query_vector, sources, self.fetch_k)
+            return [docs[i] for i in mmr_select(query_vector, vectors, self.k, self.lambda_mult)]
+
+        docs, _, scores = self.index.search_with_vectors(query_vector, sources, self.k)
+        if self.search_type == "similarity_score_threshold":
+            relevance = chroma_relevance(scores)
+            return [doc for doc, score in zip(docs, relevance) if score >= self.score_threshold]
+        return docs
@@ -1,23 +1,50 @@
+import asyncio
 import os
+import sys
+import time
 from dotenv import load_dotenv
 
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Token-budgeted chat history with a rolling summary
+from common.chat_history import DEFAULT_MAX_HISTORY_TOKENS, TokenBudgetHistory
+
+# Shared chat / embedding models, imported and built on first use
+from common.models import get_chat_model, get_embeddings, warm_up
+
+# Per-step latency / token tracing (STAGE_TRACE=<file.json|file.csv>)
+from common.tracing import trace_config, trace_embeddings
+
 # Vector store integration
 from langchain_community.vectorstores import Chroma
 
-# Groq integrations
-from langchain_groq import ChatGroq
-
 # Message abstractions used for chat history
 from langchain_core.messages import HumanMessage, AIMessage
 
-# Prompt templates and placeholders
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+# Prompt templates for the rewrite and QA stages
+from contextual_prompts import contextualize_prompt, qa_prompt
 
 # Runnable primitives (core LangChain 1.x abstraction)
 from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 
-# Hugging face embedding
-from langchain_community.embeddings import HuggingFaceEmbeddings
+# Vectorized MMR re-ranking with cached candidate vectors
+from mmr import MMRRetriever
+
+# Exact + semantic result cache in front of the retriever
+from retrieval_cache import CachedRetriever, QueryEmbeddingCache, manifest_version
+
+# Skip / memoize the question-rewrite LLM call
+from rewrite_cache import CachedQuestionRewriter
+
+# Optional: rewrite and retrieval on the raw question run concurrently
+from speculative_retrieval import SpeculativeRetriever
+
+# Token streaming to the console with per-turn timings
+from answer_streaming import aprint_stream, print_stream, print_turn_timings
+
+# asyncio serving path (many sessions per process)
+from async_rag_chat import DEFAULT_MAX_CONCURRENT_LLM_CALLS, AsyncContextualRAG
 
 
 # =========================================================
@@ -27,7 +54,6 @@ from langchain_community.embeddings import HuggingFaceEmbeddings
 # Load environment variables from `.env`
 # Required for OPENAI_API_KEY and other secrets
 load_dotenv()
-api_key = os.getenv("GROQ_API_KEY")
 
 # Resolve absolute base directory of the script
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -35,6 +61,32 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Location where the Chroma vector database is persisted
 PERSIST_DIRECTORY = os.path.join(BASE_DIR, "db", "chroma_db_with_metadata")
 
+# Rewritten by rag_with_metadata.py whenever the collection changes
+MANIFEST_PATH = os.path.join(PERSIST_DIRECTORY, "ingest_manifest.json")
+
+# Set SPECULATIVE_RETRIEVAL=1 to start retrieval on the raw question while
+# the rewrite LLM call is in flight (see QUESTION CONTEXTUALIZATION below)
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "0") == "1"
+
+# Set ASYNC_CHAT=1 to run the terminal chat on the asyncio serving path;
+# MAX_CONCURRENT_LLM_CALLS caps outbound LLM requests across sessions
+ASYNC_CHAT = os.getenv("ASYNC_CHAT", "0") == "1"
+MAX_CONCURRENT_LLM_CALLS = int(
+    os.getenv("MAX_CONCURRENT_LLM_CALLS", str(DEFAULT_MAX_CONCURRENT_LLM_CALLS))
+)
+
+# Answers are printed token by token as they arrive; set STREAM_ANSWERS=0
+# to wait for the complete answer instead
+STREAM_ANSWERS = os.getenv("STREAM_ANSWERS", "1") == "1"
+
+# Token budget for the chat history in each prompt; older turns are
+# folded into a summary instead of being dropped
+MAX_HISTORY_TOKENS = int(os.getenv("MAX_HISTORY_TOKENS", str(DEFAULT_MAX_HISTORY_TOKENS)))
+
+# MMR candidate pool size; the vectorized re-ranking keeps a few hundred
+# candidates interactive (see benchmark_mmr.py)
+MMR_FETCH_K = int(os.getenv("MMR_FETCH_K", "10"))
+
 
 # =========================================================
 # EMBEDDING MODEL CONFIGURATION
@@ -44,10 +96,14 @@ PERSIST_DIRECTORY = os.path.join(BASE_DIR, "db", "chroma_db_with_metadata")
 # IMPORTANT:
 # This model MUST match the one used during ingestion,
 # otherwise similarity search results will be invalid.
-embeddings = HuggingFaceEmbeddings(
-    model_name="BAAI/bge-small-en-v1.5",
-    encode_kwargs={"normalize_embeddings": True}
-)
+# Recent query vectors are remembered so the retrieval cache and
+# Chroma embed each rewritten question only once.
+#
+# The shared bge-small model (common/models.py) is loaded on a background
+# thread, so the chat prompt appears right away; the first question waits
+# for the load only if the user answers faster than it finishes.
+warm_up(embeddings=True)
+embeddings = QueryEmbeddingCache(trace_embeddings(get_embeddings()))
 
 
 # =========================================================
@@ -66,17 +122,27 @@ db = Chroma(
 # RETRIEVER CONFIGURATION
 # =========================================================
 
-# Convert the vector store into a retriever object.
-# MMR (Maximal Marginal Relevance) is used to:
+# MMR (Maximal Marginal Relevance) retriever, used to:
 # - Reduce redundancy
 # - Improve diversity of retrieved documents
-retriever = db.as_retriever(
-    search_type="mmr",
-    search_kwargs={
-        "k": 3,                 # Number of final documents returned
-        "fetch_k": 10,          # Initial candidate pool size
-        "score_threshold": 0.3  # Minimum relevance score
-    }
+#
+# Same results as db.as_retriever(search_type="mmr"), but candidate
+# vectors are cached across questions and re-ranked with matrix
+# operations instead of Python loops.
+mmr_retriever = MMRRetriever(
+    vectorstore=db,
+    k=3,                    # Number of final documents returned
+    fetch_k=MMR_FETCH_K,    # Initial candidate pool size
+    version_fn=lambda: manifest_version(MANIFEST_PATH)
+)
+
+# Repeated or near-duplicate questions are served from a result cache
+# (exact match on the normalized question, then embedding similarity).
+# The cache is dropped when the collection is re-ingested.
+retriever = CachedRetriever(
+    retriever=mmr_retriever,
+    embeddings=embeddings,
+    version_fn=lambda: manifest_version(MANIFEST_PATH)
 )
 
 
@@ -87,32 +153,16 @@ retriever = db.as_retriever(
 # Chat-based LLM used for:
 # 1. Question rewriting (history awareness)
 # 2. Final answer generation
-llm = ChatGroq(
-    api_key=api_key,
-    model="llama-3.1-8b-instant", 
-    temperature=0.7 # temperature controls the randomness or creativity of the model’s responses
-)
+# (llama-3.1-8b-instant, temperature 0.7; shared ChatGroq from common/models.py)
+llm = get_chat_model()
 
 
 # =========================================================
 # QUESTION CONTEXTUALIZATION (HISTORY AWARENESS)
 # =========================================================
 
-# Prompt that instructs the LLM to rewrite a follow-up question
-# into a standalone query using the conversation history.
-contextualize_prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            "Given a chat history and the latest user question, "
-            "rewrite the question into a standalone question that "
-            "can be understood without the chat history. "
-            "Do NOT answer the question."
-        ),
-        MessagesPlaceholder("chat_history"),
-        ("human", "{input}")
-    ]
-)
+# Prompts are shared with the async serving path (async_rag_chat.py),
+# see contextual_prompts.py.
 
 def rewrite_question(inputs: dict) -> str:
     """
@@ -133,34 +183,31 @@ def rewrite_question(inputs: dict) -> str:
     return llm.invoke(prompt).content
 
 
-# History-aware retriever pipeline:
-# 1. Rewrite the question
-# 2. Run vector similarity search
-history_aware_retriever = (
-    RunnableLambda(rewrite_question)
-    | retriever
-)
+# The rewrite is skipped when there is no chat history (the question is
+# already standalone) and memoized on (recent history, question).
+cached_rewrite_question = CachedQuestionRewriter(rewrite_question)
 
 
-# =========================================================
-# QUESTION ANSWERING PROMPT
-# =========================================================
-
-# Prompt instructing the LLM to answer strictly using retrieved context.
-# This reduces hallucination and enforces grounded answers.
-qa_prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            "You are a question-answering assistant. "
-            "Use ONLY the retrieved context to answer the question. "
-            "If the answer is not present, say you do not know. "
-            "Use a maximum of three sentences.\n\n{context}"
-        ),
-        MessagesPlaceholder("chat_history"),
-        ("human", "{input}")
-    ]
-)
+# History-aware retriever pipeline:
+# 1. Rewrite the question (skipped / cached when possible)
+# 2. Run vector similarity search
+#
+# In speculative mode both steps overlap: retrieval on the raw question
+# starts together with the rewrite, and its results are kept when the
+# rewritten question turns out to be equivalent.
+speculative_retriever = None
+if SPECULATIVE_RETRIEVAL:
+    speculative_retriever = SpeculativeRetriever(
+        cached_rewrite_question,
+        retriever,
+        embeddings=embeddings
+    )
+    history_aware_retriever = RunnableLambda(speculative_retriever)
+else:
+    history_aware_retriever = (
+        RunnableLambda(cached_rewrite_question)
+        | retriever
+    )
 
 
 # =========================================================
@@ -195,42 +242,106 @@ def continual_chat():
     Starts an interactive terminal-based chat session with:
     - History-aware retrieval
     - Vector search grounding
-    - Controlled context growth
+    - Controlled context growth (token budget + rolling summary)
     """
 
     print("Start chatting with the AI (type 'exit' to stop).\n")
 
-    # Stores conversation messages as structured objects
-    chat_history = []
-
-    # Limit chat history size to avoid prompt bloat
-    MAX_HISTORY = 10
+    # Stores conversation messages as structured objects. Recent turns are
+    # kept verbatim within MAX_HISTORY_TOKENS; older ones are summarized
+    # by the LLM in the background.
+    history = TokenBudgetHistory(llm, max_tokens=MAX_HISTORY_TOKENS)
 
     while True:
         user_input = input("You: ").strip()
 
         if user_input.lower() == "exit":
             print("Conversation ended.")
+            history.close()
+            cached_rewrite_question.print_stats()
+            if speculative_retriever is not None:
+                speculative_retriever.print_stats()
+                speculative_retriever.close()
+            retriever.print_stats()
+            mmr_retriever.print_stats()
             break
 
+        chain_input = {
+            "input": user_input,
+            "chat_history": history.messages()
+        }
+
         # Execute the RAG pipeline
-        result = rag_chain.invoke(
-            {
-                "input": user_input,
-                "chat_history": chat_history
+        if STREAM_ANSWERS:
+            # Tokens are printed as they arrive; the full message is
+            # assembled from the stream for the chat history
+            result, timings = print_stream(rag_chain.stream(chain_input, config=trace_config()))
+        else:
+            start = time.perf_counter()
+            result = rag_chain.invoke(chain_input, config=trace_config())
+            timings = {
+                "first_token_seconds": None,
+                "total_seconds": time.perf_counter() - start
             }
-        )
+            print(f"\nAI: {result.content}\n")
 
         answer = result.content
-        print(f"\nAI: {answer}\n")
 
-        # Update conversation history
-        chat_history.append(HumanMessage(content=user_input))
-        chat_history.append(AIMessage(content=answer))
+        # Per-turn latency: time to first token and total time
+        print_turn_timings(timings)
+
+        # Per-turn rewrite metrics (LLM call made, skipped or cached)
+        cached_rewrite_question.print_turn_stats()
+        if speculative_retriever is not None:
+            speculative_retriever.print_turn_stats()
+
+        # Update conversation history (may start a summary update)
+        history.add_messages(
+            HumanMessage(content=user_input),
+            AIMessage(content=answer)
+        )
+
+        # Prompt tokens used by the history vs. the untrimmed history
+        history.print_report()
+
+
+# =========================================================
+# ASYNC CHAT LOOP
+# =========================================================
+
+async def async_continual_chat(session_id="terminal"):
+    """
+    Terminal chat on top of AsyncContextualRAG, the same serving path a
+    web front end would use for many concurrent sessions. The answer is
+    printed as it streams in, followed by the turn timings.
+    """
+    # With STAGE_TRACE set, the rewrite, retrieval and answer calls are traced
+    rag = AsyncContextualRAG(
+        llm.with_config(trace_config()),
+        retriever.with_config(trace_config()),
+        max_concurrent_llm_calls=MAX_CONCURRENT_LLM_CALLS,
+        max_history_tokens=MAX_HISTORY_TOKENS
+    )
+
+    print("Start chatting with the AI (type 'exit' to stop).\n")
+
+    while True:
+        # input() blocks, so read it off the event loop
+        user_input = (await asyncio.to_thread(input, "You: ")).strip()
+
+        if user_input.lower() == "exit":
+            print("Conversation ended.")
+            rag.close()
+            rag.rewriter.print_stats()
+            retriever.print_stats()
+            mmr_retriever.print_stats()
+            break
+
+        _, timings = await aprint_stream(rag.astream(session_id, user_input))
+        print_turn_timings(timings)
 
-        # Trim old messages to maintain context window
-        if len(chat_history) > MAX_HISTORY:
-            chat_history = chat_history[-MAX_HISTORY:]
+        # Prompt tokens used by the history vs. the untrimmed history
+        rag.sessions.history(session_id).print_report()
 
 
 # =========================================================
@@ -238,4 +349,7 @@ def continual_chat():
 # =========================================================
 
 if __name__ == "__main__":
-    continual_chat()
+    if ASYNC_CHAT:
+        asyncio.run(async_continual_chat())
+    else:
+        continual_chat()
@@ -1,8 +1,27 @@
 import os
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
+import sys
+from functools import partial
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from embedding_cache import CachedEmbeddings
+from hybrid_retrieval import (
+    BM25_INDEX_DIR,
+    BM25Index,
+    HybridRetriever,
+    fetch_chroma_documents,
+    print_bm25_report,
+    sync_bm25_index,
+)
+from incremental_ingestion import incremental_ingest, print_ingestion_report
+from parallel_embedding import DEFAULT_BATCH_SIZE, EmbeddingPool, ingest_documents_parallel
+from partitioned_index import PartitionedIndex, PartitionedRetriever, print_partition_report, sync_partitions
+from reranking import DEFAULT_LATENCY_BUDGET_MS, RerankingRetriever
+from retrieval_cache import CachedRetriever, QueryEmbeddingCache, manifest_version
+from streaming_ingestion import StreamingTextSplitter
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.models import build_embeddings, get_cross_encoder, get_embeddings
+from common.tracing import trace_config, trace_embeddings
 
 # ---------------------------------------------------------
 # Path Configuration
@@ -18,8 +37,32 @@ BOOKS_DIR = os.path.join(BASE_DIR, "books")
 DB_DIR = os.path.join(BASE_DIR, "db")
 PERSIST_DIRECTORY = os.path.join(DB_DIR, "chroma_db_with_metadata")
 
-print(f"Books directory: {BOOKS_DIR}")
-print(f"Persistent directory: {PERSIST_DIRECTORY}")
+# Per-file and per-chunk content hashes of what is already in the DB
+MANIFEST_PATH = os.path.join(PERSIST_DIRECTORY, "ingest_manifest.json")
+
+# One vector partition per book, mirrored from the DB after ingestion
+PARTITIONS_DIRECTORY = os.path.join(DB_DIR, "partitions_with_metadata")
+
+# BM25 keyword index of the same chunks, rebuilt after ingestion
+BM25_DIRECTORY = os.path.join(PERSIST_DIRECTORY, BM25_INDEX_DIR)
+
+# Set HYBRID_RETRIEVAL=1 to fuse the vector search with BM25 keyword
+# search (reciprocal rank fusion), so exact names and rare terms are found
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "0") == "1"
+
+# Set RERANK=1 to replace the score threshold with a cross-encoder rerank
+# of the top RERANK_CANDIDATES chunks, capped at RERANK_BUDGET_MS of
+# scoring per query. RERANK_MIN_SCORE optionally drops weak chunks; scores
+# are sigmoid-scaled cross-encoder logits in [0, 1] (0.5 = logit 0), not the
+# 0-1 vector relevance of the score threshold.
+RERANK = os.getenv("RERANK", "0") == "1"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "10"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", str(DEFAULT_LATENCY_BUDGET_MS)))
+RERANK_MIN_SCORE = float(os.environ["RERANK_MIN_SCORE"]) if os.getenv("RERANK_MIN_SCORE") else None
+
+# Comma-separated book files to scope the example query to, e.g.
+# BOOK_SOURCES=romeo_and_juliet.txt (empty = search every book)
+BOOK_SOURCES = [s for s in os.getenv("BOOK_SOURCES", "").split(",") if s]
 
 
 # ---------------------------------------------------------
@@ -28,110 +71,184 @@ print(f"Persistent directory: {PERSIST_DIRECTORY}")
 
 # IMPORTANT:
 # This embedding model MUST be the same for ingestion and retrieval
-embeddings = HuggingFaceEmbeddings(
-    model_name="BAAI/bge-small-en-v1.5"
-)
+# (rag_with_contectualMemory.py queries this DB with normalized embeddings).
+# Both scripts use EMBEDDING_MODEL from common/models.py.
+
+# Number of embedding worker processes and chunks per embedding call.
+# With 1 worker, chunks are embedded in this process.
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", str(DEFAULT_BATCH_SIZE)))
+
+# Picklable constructor used by the embedding worker processes
+embeddings_factory = build_embeddings
 
 
 # ---------------------------------------------------------
-# INGESTION: Create Vector Store (Run Once)
+# INGESTION: Incremental, Content-Hashed Sync
 # ---------------------------------------------------------
 
-if not os.path.exists(PERSIST_DIRECTORY):
-    print("\nPersistent directory does not exist. Initializing vector store...")
+def ingest(db, embeddings):
+    """
+    Syncs the vector store with the books directory.
+
+    Only new or changed chunks are embedded; chunks of removed or edited
+    books are deleted. An unchanged corpus is detected by file hash and skipped.
+    Books are streamed in bounded blocks, so peak memory does not depend on
+    the size of the corpus.
+    """
+    # Split documents into chunks (same output as RecursiveCharacterTextSplitter)
+    text_splitter = StreamingTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200
+    )
 
-    # Validate books directory
-    if not os.path.exists(BOOKS_DIR):
-        raise FileNotFoundError(
-            f"The directory {BOOKS_DIR} does not exist."
+    print("\n--- Syncing vector store with books directory ---")
+
+    # Embed new chunks with a pool of workers, streaming each finished
+    # batch into Chroma. The cache still serves previously embedded text.
+    with EmbeddingPool(embeddings_factory, EMBED_WORKERS) as pool:
+        add_documents = None
+        if EMBED_WORKERS > 1:
+            add_documents = partial(
+                ingest_documents_parallel,
+                pool=pool,
+                batch_size=EMBED_BATCH_SIZE,
+                cache=embeddings
+            )
+
+        stats = incremental_ingest(
+            db=db,
+            books_dir=BOOKS_DIR,
+            manifest_path=MANIFEST_PATH,
+            text_splitter=text_splitter,
+            add_documents=add_documents
         )
 
-    # Collect all .txt files
-    book_files = [
-        f for f in os.listdir(BOOKS_DIR)
-        if f.endswith(".txt")
-    ]
+    print_ingestion_report(stats)
+    embeddings.print_stats()
+
+    # Per-book partitions, so filtered queries never scan other books
+    print_partition_report(sync_partitions(db, MANIFEST_PATH, PARTITIONS_DIRECTORY))
 
-    if not book_files:
-        raise ValueError("No .txt files found in books directory.")
+    # Keyword statistics for hybrid retrieval, tokenized once per book version
+    print_bm25_report(sync_bm25_index(db, MANIFEST_PATH, BM25_DIRECTORY))
 
-    documents = []
 
-    # Load each book and attach metadata
-    for book_file in book_files:
-        file_path = os.path.join(BOOKS_DIR, book_file)
+# ---------------------------------------------------------
+# RETRIEVAL: Query the Vector Store
+# ---------------------------------------------------------
 
-        loader = TextLoader(file_path, encoding="utf-8")
-        book_docs = loader.load()
+def build_retriever(db, query_embeddings, sources=None):
+    """
+    Thresholded similarity retriever behind an exact + semantic result cache.
+
+    With `sources` (book file names), only the partitions of those books
+    are searched instead of the whole collection, so the latency of a
+    per-book query does not grow with the number of books. Otherwise,
+    with HYBRID_RETRIEVAL=1, BM25 keyword hits are fused into the results.
+    With RERANK=1, a cross-encoder reranks the candidates instead of the
+    score threshold deciding what is kept.
+
+    The cache is dropped whenever ingestion rewrites the manifest, i.e.
+    whenever chunks were added to or deleted from the collection.
+    """
+    def vector_retriever(search_type, k):
+        if sources:
+            return PartitionedRetriever(
+                index=PartitionedIndex(PARTITIONS_DIRECTORY, query_embeddings),
+                sources=list(sources),
+                search_type=search_type,
+                k=k,
+                score_threshold=0.5
+            )
+        search_kwargs = {"k": k}
+        if search_type == "similarity_score_threshold":
+            search_kwargs["score_threshold"] = 0.5
+        return db.as_retriever(search_type=search_type, search_kwargs=search_kwargs)
+
+    # With RERANK=1 the first stage returns unthresholded candidates
+    if RERANK:
+        retriever = vector_retriever("similarity", RERANK_CANDIDATES)
+    else:
+        retriever = vector_retriever("similarity_score_threshold", 3)
+
+    if HYBRID_RETRIEVAL and not sources:
+        retriever = HybridRetriever(
+            vector_retriever=retriever,
+            keyword_index=BM25Index.load(BM25_DIRECTORY),
+            documents_fn=partial(fetch_chroma_documents, db),
+            k=RERANK_CANDIDATES if RERANK else 3
+        )
 
-        for doc in book_docs:
-            # Attach source metadata for traceability
-            doc.metadata = {
-                "source": book_file
-            }
-            documents.append(doc)
+    if RERANK:
+        # Candidates the budget left unscored must still pass the threshold
+        retriever = RerankingRetriever(
+            retriever=retriever,
+            scorer=get_cross_encoder(),
+            k=3,
+            min_score=RERANK_MIN_SCORE,
+            latency_budget_ms=RERANK_BUDGET_MS,
+            fallback_retriever=vector_retriever("similarity_score_threshold", RERANK_CANDIDATES)
+        )
 
-    # Split documents into chunks
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
+    return CachedRetriever(
+        retriever=retriever,
+        embeddings=query_embeddings,
+        version_fn=lambda: manifest_version(MANIFEST_PATH)
     )
 
-    docs = text_splitter.split_documents(documents)
 
-    print("\n--- Document Chunking Info ---")
-    print(f"Total chunks created: {len(docs)}")
+def query_books(retriever, query):
+    """
+    Runs a (cached) similarity search and prints the matching chunks.
+    """
+    # Execute retrieval
+    relevant_docs = retriever.invoke(query, config=trace_config())
 
-    # Create and persist Chroma vector store
-    print("\n--- Creating and persisting vector store ---")
-    db = Chroma.from_documents(
-        documents=docs,
-        embedding=embeddings,
-        persist_directory=PERSIST_DIRECTORY
-    )
-    db.persist()
+    # ---------------------------------------------------------
+    # Display Results
+    # ---------------------------------------------------------
 
-    print("--- Vector store created successfully ---")
+    print("\n--- Relevant Documents ---")
 
-else:
-    print("\nVector store already exists. Skipping ingestion.")
+    if not relevant_docs:
+        print("No relevant documents found. Try lowering the score threshold.")
+    else:
+        for i, doc in enumerate(relevant_docs, start=1):
+            print(f"Document {i}:\n{doc.page_content}\n")
+            print(f"Source: {doc.metadata.get('source', 'Unknown')}\n")
 
 
 # ---------------------------------------------------------
-# RETRIEVAL: Load Vector Store and Query
+# APPLICATION ENTRY POINT
 # ---------------------------------------------------------
 
-# Load existing Chroma DB
-db = Chroma(
-    persist_directory=PERSIST_DIRECTORY,
-    embedding_function=embeddings
-)
-
-# User query
-query = "How did Juliet die?"
+# The entry point is guarded because embedding workers are spawned
+# processes that re-import this module.
+if __name__ == "__main__":
+    print(f"Books directory: {BOOKS_DIR}")
+    print(f"Persistent directory: {PERSIST_DIRECTORY}")
 
-# Configure retriever
-retriever = db.as_retriever(
-    search_type="similarity_score_threshold",
-    search_kwargs={
-        "k": 3,
-        "score_threshold": 0.5
-    }
-)
+    # Chunk vectors are served from the shared on-disk embedding cache when
+    # the same text was embedded before, by this script or basic_rag_1a.py.
+    # The model itself is loaded only when a chunk or query misses the cache.
+    embeddings = CachedEmbeddings(trace_embeddings(get_embeddings()))
 
-# Execute retrieval
-relevant_docs = retriever.invoke(query)
+    # Recent query vectors are shared between the retrieval cache and Chroma
+    query_embeddings = QueryEmbeddingCache(embeddings)
 
+    # Load (or create) the Chroma DB
+    db = Chroma(
+        persist_directory=PERSIST_DIRECTORY,
+        embedding_function=query_embeddings
+    )
 
-# ---------------------------------------------------------
-# Display Results
-# ---------------------------------------------------------
+    ingest(db, embeddings)
 
-print("\n--- Relevant Documents ---")
+    # User query
+    retriever = build_retriever(db, query_embeddings, sources=BOOK_SOURCES)
+    query_books(retriever, "How did Juliet die?")
 
-if not relevant_docs:
-    print("No relevant documents found. Try lowering the score threshold.")
-else:
-    for i, doc in enumerate(relevant_docs, start=1):
-        print(f"Document {i}:\n{doc.page_content}\n")
-        print(f"Source: {doc.metadata.get('source', 'Unknown')}\n")
+    # Scored / cached candidates and the latency the rerank stage adds
+    if RERANK:
+        retriever.retriever.print_stats()
@@ -0,0 +1,251 @@
+import hashlib
+import statistics
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+
+from hybrid_retrieval import chunk_key
+from retrieval_cache import normalize_query
+
+
+# ---------------------------------------------------------
+# Rerank Configuration
+# ---------------------------------------------------------
+
+# Cached (query, chunk) scores (least recently used are evicted first)
+DEFAULT_MAX_CACHED_SCORES = 10000
+
+# Scoring time allowed per query; candidates beyond it keep retriever order
+DEFAULT_LATENCY_BUDGET_MS = 100.0
+
+# Hard cap on candidates scored per query (also used before the first timing)
+DEFAULT_MAX_CANDIDATES = 20
+
+# Candidates scored per query even when the estimate says none fit, so the
+# cost model keeps being measured (and recovers after a slow period)
+MIN_SCORED_PER_QUERY = 1
+
+# Pairs per cross-encoder forward pass
+DEFAULT_BATCH_SIZE = 32
+
+# Weight of the newest batch in the fixed + per-pair cost estimate
+COST_SMOOTHING = 0.3
+
+# Latest per-query timings kept for the p50 / p95 report
+LATENCY_WINDOW = 1000
+
+
+def _query_hash(query):
+    return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()[:16]
+
+
+def _p95(values):
+    if not values:
+        return 0.0
+    return statistics.quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+
+
+# ---------------------------------------------------------
+# Reranking Retriever
+# ---------------------------------------------------------
+
+class RerankingRetriever(BaseRetriever):
+    """
+    Cross-encoder rerank stage behind a candidate retriever.
+
+    The wrapped retriever returns candidates (e.g. similarity top 10,
+    without a score threshold). Each candidate is paired with the query
+    and scored by `scorer` (LazyCrossEncoder from common/models.py, scores
+    in [0, 1]). The best `k` with score >= `min_score` are returned.
+
+    Cost is bounded per query:
+    - Scores are cached per (query hash, chunk id), and cached pairs cost
+      nothing.
+    - The uncached candidates, in retriever order, are scored in one batch
+      limited to what fits into `latency_budget_ms` (at most
+      `max_candidates`, at least MIN_SCORED_PER_QUERY). Batch cost is
+      modelled as fixed overhead + per-pair time, fitted on the measured
+      batches with exponential forgetting. The first batch is not used,
+      because it includes the model load.
+    - Candidates that were not scored only fill the result when fewer than
+      `k` candidates were scored. If `fallback_retriever` is given (the
+      thresholded retriever the rerank stage replaces), they must also be
+      among its results, so weak chunks are still filtered out.
+
+    print_stats reports the p50 / p95 latency of retrieval alone and with
+    the rerank stage. Safe to share between threads.
+    """
+
+    retriever: BaseRetriever
+    scorer: Any
+    k: int = 3
+    min_score: Optional[float] = None
+    latency_budget_ms: float = DEFAULT_LATENCY_BUDGET_MS
+    max_candidates: int = DEFAULT_MAX_CANDIDATES
+    batch_size: int = DEFAULT_BATCH_SIZE
+    max_cached_scores: int = DEFAULT_MAX_CACHED_SCORES
+    fallback_retriever: Optional[BaseRetriever] = None
+
+    # (query hash, chunk id) -> score
+    _scores: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    # Exponentially weighted sums over batches of (1, pairs, seconds, pairs², pairs * seconds)
+    _cost_sums: dict = PrivateAttr(
+        default_factory=lambda: {"weight": 0.0, "n": 0.0, "t": 0.0, "nn": 0.0, "nt": 0.0}
+    )
+    _scored_batches: int = PrivateAttr(default=0)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _stats: dict = PrivateAttr(
+        default_factory=lambda: {"queries": 0, "scored": 0, "cached": 0, "over_budget": 0}
+    )
+    # per query: (retrieval seconds, rerank seconds)
+    _latencies: list = PrivateAttr(default_factory=list)
+
+    @property
+    def stats(self):
+        return dict(self._stats)
+
+    def _observe_cost(self, pairs, seconds):
+        sums = self._cost_sums
+        for key in sums:
+            sums[key] *= 1 - COST_SMOOTHING
+        sums["weight"] += 1
+        sums["n"] += pairs
+        sums["t"] += seconds
+        sums["nn"] += pairs * pairs
+        sums["nt"] += pairs * seconds
+
+    def cost_model(self):
+        """
+        Returns:
+            (fixed seconds per batch, seconds per pair), or None before the
+            first usable measurement
+        """
+        sums = self._cost_sums
+        if not sums["weight"]:
+            return None
+        mean_n = sums["n"] / sums["weight"]
+        mean_t = sums["t"] / sums["weight"]
+        variance = sums["nn"] / sums["weight"] - mean_n * mean_n
+
+        # Least-squares line through the (pairs, seconds) measurements; with
+        # a single batch size seen so far, all time is counted per pair
+        if variance > 1e-9:
+            per_pair = (sums["nt"] / sums["weight"] - mean_n * mean_t) / variance
+            if per_pair > 0:
+                return max(0.0, mean_t - per_pair * mean_n), per_pair
+        return 0.0, mean_t / mean_n
+
+    def _budget(self, uncached):
+        """
+        Number of uncached candidates that fit into the latency budget.
+        """
+        limit = self.max_candidates
+        model = self.cost_model()
+        if model is not None:
+            fixed, per_pair = model
+            limit = min(limit, int((self.latency_budget_ms / 1000 - fixed) / per_pair))
+        return min(uncached, max(MIN_SCORED_PER_QUERY, limit))
+
+    def _score(self, query, docs):
+        """
+        Scores `docs` (cache first, then one batch within the budget).
+
+        Returns:
+            Score per document, None for those left out by the budget
+        """
+        query_hash = _query_hash(query)
+        keys = [(query_hash, chunk_key(doc)) for doc in docs]
+
+        with self._lock:
+            scores = [self._scores.get(key) for key in keys]
+            uncached = [i for i, score in enumerate(scores) if score is None]
+            to_score = uncached[:self._budget(len(uncached))]
+            self._stats["cached"] += len(docs) - len(uncached)
+            self._stats["over_budget"] += len(uncached) - len(to_score)
+
+        if to_score:
+            start = time.perf_counter()
+            batch = self.scorer.predict(
+                [(query, docs[i].page_content) for i in to_score], batch_size=self.batch_size
+            )
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._scored_batches += 1
+                if self._scored_batches > 1:
+                    self._observe_cost(len(to_score), elapsed)
+                for i, score in zip(to_score, batch):
+                    scores[i] = float(score)
+                    self._scores[keys[i]] = scores[i]
+                    self._scores.move_to_end(keys[i])
+                while len(self._scores) > self.max_cached_scores:
+                    self._scores.popitem(last=False)
+                self._stats["scored"] += len(to_score)
+        return scores
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        start = time.perf_counter()
+        docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()} if run_manager else None)
+        retrieved = time.perf_counter()
+
+        scores = self._score(query, docs)
+        scored = sorted(
+            (i for i, score in enumerate(scores) if score is not None),
+            key=lambda i: scores[i],
+            reverse=True,
+        )
+        ranked = [docs[i] for i in scored if self.min_score is None or scores[i] >= self.min_score]
+        if len(scored) < self.k:
+            unscored = [doc for doc, score in zip(docs, scores) if score is None]
+            if unscored and self.fallback_retriever is not None:
+                passing = {chunk_key(doc) for doc in self.fallback_retriever.invoke(query)}
+                unscored = [doc for doc in unscored if chunk_key(doc) in passing]
+            ranked += unscored
+        finished = time.perf_counter()
+
+        with self._lock:
+            self._stats["queries"] += 1
+            self._latencies.append((retrieved - start, finished - retrieved))
+            del self._latencies[:-LATENCY_WINDOW]
+        return ranked[:self.k]
+
+    def latency_report(self):
+        """
+        Returns:
+            Dict with p50 / p95 ms of retrieval alone and with the rerank
+            stage, and the p95 the rerank stage adds
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+        retrieval = [r * 1000 for r, _ in latencies]
+        total = [(r + s) * 1000 for r, s in latencies]
+        return {
+            "retrieval_p50_ms": statistics.median(retrieval) if retrieval else 0.0,
+            "retrieval_p95_ms": _p95(retrieval),
+            "total_p50_ms": statistics.median(total) if total else 0.0,
+            "total_p95_ms": _p95(total),
+            "added_p95_ms": _p95(total) - _p95(retrieval),
+        }
+
+    def print_stats(self):
+        """
+        Prints how many candidates were scored, cached or over budget, and
+        what the rerank stage adds to the latency.
+        """
+        report = self.latency_report()
+        print("\n--- Rerank Stage ---")
+        print(
+            f"Queries: {self._stats['queries']}, "
+            f"scored: {self._stats['scored']}, "
+            f"cached: {self._stats['cached']}, "
+            f"over budget: {self._stats['over_budget']}"
+        )
+        print(
+            f"Retrieval p50 / p95: {report['retrieval_p50_ms']:.1f} / {report['retrieval_p95_ms']:.1f} ms, "
+            f"with rerank: {report['total_p50_ms']:.1f} / {report['total_p95_ms']:.1f} ms "
+            f"(p95 +{report['added_p95_ms']:.1f} ms)"
+        )
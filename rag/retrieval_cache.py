@@ -0,0 +1,305 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+
+
+# ---------------------------------------------------------
+# Cache Configuration
+# ---------------------------------------------------------
+
+# Maximum number of cached queries (least recently used are evicted first)
+DEFAULT_MAX_ENTRIES = 256
+
+# Seconds after which a cached result is considered stale
+DEFAULT_TTL_SECONDS = 600
+
+# Maximum cosine distance for two query embeddings to share results; the
+# queries must also have the same content terms (see query_terms), since
+# "How did Mercutio die?" and "How did Tybalt die?" are closer than that.
+# benchmark_retrieval.py reports the question pairs within this distance.
+DEFAULT_DISTANCE_TOLERANCE = 0.05
+
+# Words ignored when comparing the terms of two queries
+QUERY_STOPWORDS = frozenset("""
+    a about after an and are as at be before by did do does for from had has
+    have he her him his how i in is it its of on or s she that the their them
+    they this to was were what when where which who whom whose why will with
+""".split())
+
+# Number of recent query embeddings remembered by QueryEmbeddingCache
+DEFAULT_QUERY_EMBEDDINGS = 128
+
+
+def normalize_query(query):
+    """
+    Normalizes a query for exact-match lookups: case-folded, whitespace
+    collapsed and surrounding punctuation removed, so "How did Juliet die?"
+    and "how did  juliet die" share an entry.
+    """
+    return " ".join(query.casefold().split()).strip(" ?!.")
+
+
+def query_terms(query):
+    """
+    Content terms of a query: its case-folded words minus QUERY_STOPWORDS.
+    Word order, punctuation and function words do not count, names and
+    other content words do.
+    """
+    return frozenset(re.findall(r"[^\W_]+", query.casefold())) - QUERY_STOPWORDS
+
+
+# ---------------------------------------------------------
+# Collection Version Helpers (cache invalidation)
+# ---------------------------------------------------------
+
+def manifest_version(manifest_path):
+    """
+    Version token for a collection maintained by incremental_ingest: the
+    manifest is rewritten whenever chunks are added or deleted.
+    """
+    try:
+        return os.stat(manifest_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def collection_version(db):
+    """
+    Fallback version token for collections without a manifest (a Chroma
+    store, or any store with a length such as NumpyVectorStore).
+    """
+    collection = getattr(db, "_collection", None)
+    return collection.count() if collection is not None else len(db)
+
+
+# ---------------------------------------------------------
+# Query Embedding Memo
+# ---------------------------------------------------------
+
+class QueryEmbeddingCache(Embeddings):
+    """
+    Remembers the embeddings of recent queries.
+
+    The semantic tier of CachedRetriever embeds every query once; sharing
+    this wrapper with the vector store lets a cache miss reuse that vector
+    instead of embedding the same query a second time. Documents are
+    passed straight through. Safe to share between threads.
+    """
+
+    def __init__(self, embeddings, max_entries=DEFAULT_QUERY_EMBEDDINGS):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _recall(self, text):
+        with self._lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+            return vector
+
+    def _remember(self, text, vector):
+        with self._lock:
+            self._queries[text] = vector
+            while len(self._queries) > self.max_entries:
+                self._queries.popitem(last=False)
+        return vector
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        vector = self._recall(text)
+        if vector is not None:
+            return vector
+        return self._remember(text, self.embeddings.embed_query(text))
+
+    async def aembed_query(self, text):
+        vector = self._recall(text)
+        if vector is not None:
+            return vector
+        return self._remember(text, await self.embeddings.aembed_query(text))
+
+
+# ---------------------------------------------------------
+# Cached Retriever
+# ---------------------------------------------------------
+
+class CachedRetriever(BaseRetriever):
+    """
+    Result cache in front of a retriever, e.g. db.as_retriever(...).
+
+    Lookups go through two tiers:
+    1. Exact: the normalized query string.
+    2. Semantic: the query embedding, within `distance_tolerance` cosine
+       distance of a cached query with the same content terms (skipped
+       when no embeddings are given). The term check keeps queries that
+       differ only in a name ("Mercutio" / "Tybalt") apart, however close
+       their embeddings are.
+
+    Entries expire after `ttl_seconds` and the least recently used are
+    evicted beyond `max_entries`. When `version_fn` returns a different
+    token than at the previous call (the collection was re-ingested), the
+    whole cache is dropped.
+
+    Cache bookkeeping is guarded by a lock, so one instance can serve
+    concurrent queries; the wrapped retriever itself runs outside it.
+    """
+
+    retriever: BaseRetriever
+    embeddings: Optional[Embeddings] = None
+    max_entries: int = DEFAULT_MAX_ENTRIES
+    ttl_seconds: float = DEFAULT_TTL_SECONDS
+    distance_tolerance: float = DEFAULT_DISTANCE_TOLERANCE
+    version_fn: Optional[Callable[[], Any]] = None
+
+    # normalized query -> (created_at, query vector or None, query terms, documents)
+    _entries: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _version: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _stats: dict = PrivateAttr(
+        default_factory=lambda: {
+            "exact_hits": 0, "semantic_hits": 0, "term_mismatches": 0, "misses": 0, "invalidations": 0
+        }
+    )
+
+    @property
+    def stats(self):
+        return dict(self._stats)
+
+    def print_stats(self):
+        """
+        Prints how many queries were served from the cache or the retriever.
+        """
+        print("\n--- Retrieval Cache ---")
+        print(
+            f"Exact hits: {self._stats['exact_hits']}, "
+            f"semantic hits: {self._stats['semantic_hits']} "
+            f"({self._stats['term_mismatches']} rejected for different terms), "
+            f"misses: {self._stats['misses']}, "
+            f"invalidations: {self._stats['invalidations']} "
+            f"(entries: {len(self._entries)})"
+        )
+
+    def invalidate(self):
+        """
+        Drops every cached result.
+        """
+        with self._lock:
+            self._invalidate()
+
+    def _invalidate(self):
+        self._entries.clear()
+        self._stats["invalidations"] += 1
+
+    def _check_version(self):
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            if self._entries:
+                self._invalidate()
+            self._version = version
+
+    def _evict_expired(self, now):
+        expired = [key for key, (created_at, _, _, _) in self._entries.items() if now - created_at > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+    def _lookup_exact(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self._stats["exact_hits"] += 1
+        return list(entry[3])
+
+    def _lookup_semantic(self, vector, terms):
+        candidates = [(key, entry) for key, entry in self._entries.items() if entry[1] is not None]
+        if not candidates:
+            return None
+
+        matrix = np.stack([entry[1] for _, entry in candidates])
+        similarities = matrix @ vector / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector))
+        close = [i for i in np.argsort(-similarities) if 1.0 - similarities[i] <= self.distance_tolerance]
+        match = next((i for i in close if candidates[i][1][2] == terms), None)
+        if match is None:
+            if close:
+                self._stats["term_mismatches"] += 1
+            return None
+
+        key, entry = candidates[match]
+        self._entries.move_to_end(key)
+        self._stats["semantic_hits"] += 1
+        return list(entry[3])
+
+    def _store(self, key, vector, docs, now):
+        with self._lock:
+            self._entries[key] = (now, vector, query_terms(key), list(docs))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _lookup_by_query(self, query):
+        """
+        Version check, TTL eviction and the exact tier, under the lock.
+
+        Returns:
+            (key, now, cached documents or None)
+        """
+        with self._lock:
+            self._check_version()
+            now = time.monotonic()
+            self._evict_expired(now)
+
+            key = normalize_query(query)
+            return key, now, self._lookup_exact(key)
+
+    def _lookup_by_vector(self, vector, query):
+        with self._lock:
+            return self._lookup_semantic(vector, query_terms(query))
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        key, now, docs = self._lookup_by_query(query)
+        if docs is not None:
+            return docs
+
+        vector = None
+        if self.embeddings is not None:
+            vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+            docs = self._lookup_by_vector(vector, query)
+            if docs is not None:
+                return docs
+
+        with self._lock:
+            self._stats["misses"] += 1
+        docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        self._store(key, vector, docs, now)
+        return docs
+
+    async def _aget_relevant_documents(self, query, *, run_manager):
+        key, now, docs = self._lookup_by_query(query)
+        if docs is not None:
+            return docs
+
+        vector = None
+        if self.embeddings is not None:
+            vector = np.asarray(await self.embeddings.aembed_query(query), dtype=np.float32)
+            docs = self._lookup_by_vector(vector, query)
+            if docs is not None:
+                return docs
+
+        with self._lock:
+            self._stats["misses"] += 1
+        docs = await self.retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+        self._store(key, vector, docs, now)
+        return docs
@@ -0,0 +1,168 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+
+# ---------------------------------------------------------
+# Rewrite Cache Configuration
+# ---------------------------------------------------------
+
+# Maximum number of memoized rewrites (least recently used are evicted first)
+DEFAULT_MAX_ENTRIES = 256
+
+# Only the most recent messages are part of the cache key: the rewrite of a
+# follow-up question depends on the last exchanges, not the whole session.
+DEFAULT_HISTORY_WINDOW = 4
+
+
+def history_fingerprint(chat_history, window=DEFAULT_HISTORY_WINDOW):
+    """
+    Hashes the last `window` messages (type and content) of a chat history.
+    """
+    digest = hashlib.sha256()
+    for message in chat_history[-window:]:
+        digest.update(message.type.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(message.content.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# ---------------------------------------------------------
+# Cached Question Rewriter
+# ---------------------------------------------------------
+
+class CachedQuestionRewriter:
+    """
+    Wraps a question-rewrite function with a skip rule and a bounded memo.
+
+    - Without chat history the question is already standalone, so it is
+      returned unchanged and the LLM is not called.
+    - Otherwise rewrites are memoized on (history fingerprint, input),
+      where the fingerprint covers the last `history_window` messages.
+
+    Every call records what happened in `last_turn`; totals, including the
+    latency saved by skipped and cached rewrites, are kept in `stats`.
+    Saved latency is estimated from the average measured rewrite call.
+
+    `rewrite_fn(inputs)` backs plain calls, `arewrite_fn(inputs)` (a
+    coroutine function) backs `ainvoke`; either may be omitted.
+    """
+
+    def __init__(
+        self,
+        rewrite_fn=None,
+        arewrite_fn=None,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        history_window=DEFAULT_HISTORY_WINDOW,
+    ):
+        self.rewrite_fn = rewrite_fn
+        self.arewrite_fn = arewrite_fn
+        self.max_entries = max_entries
+        self.history_window = history_window
+        self._entries = OrderedDict()
+
+        self.stats = {
+            "calls": 0,
+            "skipped": 0,
+            "cache_hits": 0,
+            "call_seconds": 0.0,
+            "saved_seconds": 0.0,
+        }
+        self.last_turn = None
+
+    def _average_call_seconds(self):
+        if not self.stats["calls"]:
+            return 0.0
+        return self.stats["call_seconds"] / self.stats["calls"]
+
+    def _record(self, outcome, seconds, saved_seconds=0.0):
+        self.last_turn = {
+            "outcome": outcome,
+            "seconds": seconds,
+            "saved_seconds": saved_seconds,
+        }
+        self.stats["saved_seconds"] += saved_seconds
+
+    def _lookup(self, inputs):
+        """
+        Returns (key, rewritten question or None); the key is None when
+        the rewrite is skipped.
+        """
+        question = inputs["input"]
+        chat_history = inputs["chat_history"]
+
+        if not chat_history:
+            self.stats["skipped"] += 1
+            self._record("skipped", 0.0, self._average_call_seconds())
+            return None, question
+
+        key = (history_fingerprint(chat_history, self.history_window), question)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            rewritten, call_seconds = entry
+            self._record("cached", 0.0, call_seconds)
+            return key, rewritten
+        return key, None
+
+    def _store(self, key, rewritten, elapsed):
+        self.stats["calls"] += 1
+        self.stats["call_seconds"] += elapsed
+        self._record("called", elapsed)
+
+        self._entries[key] = (rewritten, elapsed)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __call__(self, inputs):
+        key, rewritten = self._lookup(inputs)
+        if rewritten is not None:
+            return rewritten
+
+        start = time.perf_counter()
+        rewritten = self.rewrite_fn(inputs)
+        self._store(key, rewritten, time.perf_counter() - start)
+        return rewritten
+
+    async def ainvoke(self, inputs):
+        """
+        Async variant of calling the rewriter; needs `arewrite_fn`.
+        """
+        key, rewritten = self._lookup(inputs)
+        if rewritten is not None:
+            return rewritten
+
+        start = time.perf_counter()
+        rewritten = await self.arewrite_fn(inputs)
+        self._store(key, rewritten, time.perf_counter() - start)
+        return rewritten
+
+    def print_turn_stats(self):
+        """
+        Prints what the rewrite step did for the most recent question.
+        """
+        if self.last_turn is None:
+            return
+        turn = self.last_turn
+        if turn["outcome"] == "called":
+            print(f"[rewrite] LLM call: {turn['seconds'] * 1000:.0f} ms")
+        else:
+            print(
+                f"[rewrite] {turn['outcome']}: "
+                f"saved ~{turn['saved_seconds'] * 1000:.0f} ms"
+            )
+
+    def print_stats(self):
+        """
+        Prints how many rewrite calls were made, skipped or served from memory.
+        """
+        saved = self.stats["skipped"] + self.stats["cache_hits"]
+        print("\n--- Question Rewrite Cache ---")
+        print(
+            f"LLM calls: {self.stats['calls']}, "
+            f"skipped (no history): {self.stats['skipped']}, "
+            f"cache hits: {self.stats['cache_hits']} "
+            f"({saved} calls and ~{self.stats['saved_seconds']:.2f} s saved)"
+        )
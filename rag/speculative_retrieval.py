@@ -0,0 +1,162 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from retrieval_cache import normalize_query
+
+
+# ---------------------------------------------------------
+# Speculation Configuration
+# ---------------------------------------------------------
+
+# Minimum cosine similarity between the raw and the rewritten question
+# for the speculative results to be reused
+DEFAULT_MIN_SIMILARITY = 0.92
+
+# Speculative retrievals running at once, across all sessions sharing one
+# SpeculativeRetriever
+DEFAULT_MAX_WORKERS = 8
+
+# Speculative retrievals allowed to wait for a worker, per worker; beyond
+# that a turn skips speculation and retrieves after the rewrite
+MAX_QUEUED_PER_WORKER = 1
+
+
+def query_similarity(embeddings, raw_query, rewritten_query):
+    """
+    Cosine similarity of two query embeddings.
+    """
+    raw = np.asarray(embeddings.embed_query(raw_query), dtype=np.float32)
+    rewritten = np.asarray(embeddings.embed_query(rewritten_query), dtype=np.float32)
+    return float(raw @ rewritten / (np.linalg.norm(raw) * np.linalg.norm(rewritten)))
+
+
+# ---------------------------------------------------------
+# Speculative History-Aware Retriever
+# ---------------------------------------------------------
+
+class SpeculativeRetriever:
+    """
+    Runs the question rewrite and a retrieval on the raw question at the
+    same time, instead of rewrite -> retrieve.
+
+    When the rewrite finishes, the speculative results are reused if the
+    rewritten question is equivalent to the raw one: identical after
+    normalization, or (when `embeddings` are given) within
+    `min_similarity` cosine similarity. The embedding comparison stands in
+    for comparing candidate sets: a vector store returns the same
+    neighbours for nearly identical query vectors, and the raw query's
+    vector is already cached by the speculative retrieval. Otherwise the
+    speculative retrieval is cancelled (or its result discarded) and the
+    rewritten question is retrieved as usual.
+
+    Call it with {"input": ..., "chat_history": ...}; it returns the
+    retrieved documents, so it can replace `rewrite | retriever` inside a
+    RunnableLambda. The config RunnableLambda passes in is forwarded to
+    both retrievals, so the speculative one ("speculative_retrieval")
+    shows up in StageTracer and LangSmith traces like any other run.
+
+    Concurrent sessions share `max_workers` threads. When more
+    speculative retrievals are waiting than MAX_QUEUED_PER_WORKER allows,
+    the turn skips speculation instead of queueing behind other sessions.
+    """
+
+    def __init__(
+        self,
+        rewrite_fn,
+        retriever,
+        embeddings=None,
+        min_similarity=DEFAULT_MIN_SIMILARITY,
+        max_workers=DEFAULT_MAX_WORKERS,
+    ):
+        self.rewrite_fn = rewrite_fn
+        self.retriever = retriever
+        self.embeddings = embeddings
+        self.min_similarity = min_similarity
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-retrieval")
+        # Running plus queued speculative retrievals
+        self._slots = threading.BoundedSemaphore(max_workers * (1 + MAX_QUEUED_PER_WORKER))
+        self._lock = threading.Lock()
+
+        self.stats = {"reused": 0, "discarded": 0, "cancelled": 0, "skipped": 0}
+        self.last_turn = None
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def is_equivalent(self, raw_query, rewritten_query):
+        """
+        Decides whether results for `raw_query` can answer `rewritten_query`.
+        """
+        if normalize_query(raw_query) == normalize_query(rewritten_query):
+            return True
+        if self.embeddings is None:
+            return False
+        return query_similarity(self.embeddings, raw_query, rewritten_query) >= self.min_similarity
+
+    def _count(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+        return outcome
+
+    def _speculate(self, raw_query, config):
+        """
+        Starts the speculative retrieval, or returns None when all slots
+        are taken.
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+        speculative = self._executor.submit(
+            self.retriever.invoke, raw_query, {**config, "run_name": "speculative_retrieval"}
+        )
+        speculative.add_done_callback(lambda _: self._slots.release())
+        return speculative
+
+    def __call__(self, inputs, config=None):
+        raw_query = inputs["input"]
+        config = config or {}
+        start = time.perf_counter()
+
+        speculative = self._speculate(raw_query, config)
+        rewritten_query = self.rewrite_fn(inputs)
+
+        if speculative is None:
+            outcome = self._count("skipped")
+            docs = self.retriever.invoke(rewritten_query, config)
+        elif self.is_equivalent(raw_query, rewritten_query):
+            docs = speculative.result()
+            outcome = self._count("reused")
+        else:
+            # A retrieval that has not started yet is dropped; a running one
+            # finishes in the background and only warms the retrieval cache.
+            outcome = self._count("cancelled" if speculative.cancel() else "discarded")
+            docs = self.retriever.invoke(rewritten_query, config)
+
+        self.last_turn = {"outcome": outcome, "seconds": time.perf_counter() - start}
+        return docs
+
+    def print_turn_stats(self):
+        """
+        Prints whether the speculative retrieval was used for the last question.
+        """
+        if self.last_turn is None:
+            return
+        print(
+            f"[speculative retrieval] {self.last_turn['outcome']}: "
+            f"rewrite + retrieval took {self.last_turn['seconds'] * 1000:.0f} ms"
+        )
+
+    def print_stats(self):
+        """
+        Prints how often the speculative results were reused.
+        """
+        print("\n--- Speculative Retrieval ---")
+        print(
+            f"Reused: {self.stats['reused']}, "
+            f"discarded: {self.stats['discarded']}, "
+            f"cancelled: {self.stats['cancelled']}, "
+            f"skipped: {self.stats['skipped']}"
+        )
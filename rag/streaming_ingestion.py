@@ -0,0 +1,252 @@
+import copy
+from itertools import islice
+
+from langchain_core.documents import Document
+
+from fast_splitter import FastRecursiveCharacterTextSplitter
+
+
+# ---------------------------------------------------------
+# Streaming Configuration
+# ---------------------------------------------------------
+
+# Characters read from a file per block
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+# Chunks embedded and upserted per vector store call
+DEFAULT_UPSERT_BATCH_SIZE = 256
+
+
+# ---------------------------------------------------------
+# Bounded Block Reader
+# ---------------------------------------------------------
+
+def iter_file_blocks(file_path, block_size=DEFAULT_BLOCK_SIZE, encoding="utf-8"):
+    """
+    Yields a text file in blocks of at most `block_size` characters.
+
+    The file is opened exactly like TextLoader does (text mode, universal
+    newlines), so the concatenated blocks equal TextLoader's page_content.
+    """
+    with open(file_path, encoding=encoding) as f:
+        for block in iter(lambda: f.read(block_size), ""):
+            yield block
+
+
+def batched(iterable, size):
+    """
+    Groups an iterable into lists of at most `size` items.
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+# ---------------------------------------------------------
+# Streaming Recursive Splitter
+# ---------------------------------------------------------
+
+class StreamingTextSplitter:
+    """
+    Generator-based equivalent of RecursiveCharacterTextSplitter.
+
+    The recursive splitter first cuts the text on "\\n\\n" and then greedily
+    merges the pieces, recursing with the next separator ("\\n", then " ")
+    into pieces that are too long. Both steps only look at neighbouring
+    pieces, so they can run over a stream: every piece is merged as soon as
+    the next separator has been read, and a piece that reaches chunk_size
+    is split on the next separator while it is still being read. Each block
+    is scanned once (plus len(separator) - 1 characters carried over), and
+    memory is bounded by the block size plus about one chunk per separator
+    level, independent of the file and paragraph sizes.
+
+    The output is identical to RecursiveCharacterTextSplitter with the
+    same chunk_size / chunk_overlap and default separators. A text (or a
+    piece) without a given separator is a single piece at that level, which
+    is exactly what the regular splitter's fall-through to the next
+    separator amounts to.
+    """
+
+    def __init__(self, chunk_size=1000, chunk_overlap=200):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._separators = FastRecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )._separators
+
+    @staticmethod
+    def _iter_fragments(blocks, separator):
+        """
+        Re-emits a stream of blocks as text fragments, with None right
+        before every separator match (leftmost, non-overlapping, like
+        re.split). Only the new block and the unmatched tail of the
+        previous one are scanned.
+        """
+        if not separator:
+            # "" splits between every character
+            for block in blocks:
+                for char in block:
+                    yield None
+                    yield char
+            return
+
+        keep = len(separator) - 1
+        tail = ""
+        for block in blocks:
+            text = tail + block
+            emitted = searched = 0
+            while (position := text.find(separator, searched)) != -1:
+                if position > emitted:
+                    yield text[emitted:position]
+                yield None
+                emitted = position
+                searched = position + len(separator)
+
+            # The last len(separator) - 1 characters may start a match
+            # that the next block completes
+            cut = max(searched, len(text) - keep)
+            if cut > emitted:
+                yield text[emitted:cut]
+            tail = text[cut:]
+
+        if tail:
+            yield tail
+
+    def _iter_splits(self, blocks, separator):
+        """
+        Splits a stream of blocks on `separator` (kept at the start of each
+        split, empty splits dropped). Splits shorter than chunk_size are
+        yielded as strings; longer ones as an iterator over their
+        fragments, which must be consumed before the next split.
+        """
+        fragments = self._iter_fragments(blocks, separator)
+        parts, length = [], 0
+        for fragment in fragments:
+            if fragment is None:
+                if length:
+                    yield "".join(parts)
+                parts, length = [], 0
+                continue
+
+            parts.append(fragment)
+            length += len(fragment)
+            if length >= self.chunk_size:
+                long_split = self._rest_of_split(parts, fragments)
+                yield long_split
+                # Skip whatever the consumer left of it
+                for _ in long_split:
+                    pass
+                parts, length = [], 0
+
+        if length:
+            yield "".join(parts)
+
+    @staticmethod
+    def _rest_of_split(parts, fragments):
+        yield from parts
+        for fragment in fragments:
+            if fragment is None:
+                return
+            yield fragment
+
+    def _split_stream(self, blocks, level=0):
+        """
+        Streaming RecursiveCharacterTextSplitter._split_text for the text
+        given as blocks and the separators from `level` on.
+        """
+        last_level = level == len(self._separators) - 1
+        for item in self._merge_stream(self._iter_splits(blocks, self._separators[level])):
+            if isinstance(item, str):
+                yield item
+            elif last_level:
+                # No finer separator left: kept as one oversized chunk
+                yield "".join(item)
+            else:
+                yield from self._split_stream(item, level + 1)
+
+    def _merge_stream(self, splits):
+        """
+        Streaming version of TextSplitter._merge_splits (merge separator is
+        "" because the separator is kept in the splits). Splits too long to
+        merge are passed through, after flushing the current chunk, for
+        _split_stream to recurse into.
+        """
+        current_doc = []
+        total = 0
+
+        def join(parts):
+            text = "".join(parts).strip()
+            return text or None
+
+        for split in splits:
+            # Too long to merge: flush what we have and recurse into it
+            if not isinstance(split, str) or len(split) >= self.chunk_size:
+                if current_doc:
+                    doc = join(current_doc)
+                    if doc is not None:
+                        yield doc
+                    current_doc, total = [], 0
+                yield iter([split]) if isinstance(split, str) else split
+                continue
+
+            split_len = len(split)
+            if total + split_len > self.chunk_size:
+                if current_doc:
+                    doc = join(current_doc)
+                    if doc is not None:
+                        yield doc
+                    # Drop leading pieces until only the overlap is left
+                    while total > self.chunk_overlap or (
+                        total + split_len > self.chunk_size and total > 0
+                    ):
+                        total -= len(current_doc[0])
+                        current_doc = current_doc[1:]
+
+            current_doc.append(split)
+            total += split_len
+
+        if current_doc:
+            doc = join(current_doc)
+            if doc is not None:
+                yield doc
+
+    def split_blocks(self, blocks):
+        """
+        Yields chunk strings for a text given as an iterable of blocks.
+        """
+        yield from self._split_stream(blocks)
+
+    def iter_file_documents(self, file_path, metadata=None, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Streams a text file as chunked Documents, never loading it fully.
+        """
+        metadata = metadata or {}
+        for chunk in self.split_blocks(iter_file_blocks(file_path, block_size)):
+            yield Document(page_content=chunk, metadata=copy.deepcopy(metadata))
+
+
+# ---------------------------------------------------------
+# Streaming Upsert
+# ---------------------------------------------------------
+
+def add_in_batches(db, chunks, batch_size=DEFAULT_UPSERT_BATCH_SIZE):
+    """
+    Embeds and upserts (chunk_id, Document) pairs in bounded batches.
+
+    Inputs:
+        db         -> vector store with add_documents(documents, ids)
+        chunks     -> iterable of (chunk_id, Document), consumed lazily
+        batch_size -> number of chunks embedded per call
+
+    Returns:
+        Number of chunks added
+    """
+    added = 0
+    for batch in batched(chunks, batch_size):
+        db.add_documents(
+            documents=[doc for _, doc in batch],
+            ids=[chunk_id for chunk_id, _ in batch]
+        )
+        added += len(batch)
+    return added